@@ -0,0 +1,64 @@
+"""
+Micro-benchmark de l'extraction de l'image d'un bateau sur une page du musée maritime :
+parseur au fil de l'eau (scraping.extract_figure_image) contre arbre BeautifulSoup complet.
+
+La page du dossier fixtures est une reconstitution hors ligne d'une page de yacht du site (TYPO3) :
+menu de navigation complet, image de présentation rendue par fluid_styled_content
+(<figure class="image"> dans un contenu texte et image), lien fileadmin/_processed_ réellement
+extrait de la page de Gregaou, galerie et pied de page.
+
+Usage (depuis la racine du projet) :
+    python benchmarks/bench_image_extraction.py [nombre_de_répétitions]
+"""
+# IMPORT
+import os
+import sys
+import time
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'packages'))
+from scraping import extract_figure_image
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+CHUNK_SIZE = 8192 # même taille de morceaux que DataBase.SCRAPING_CHUNK_SIZE
+
+
+def iter_chunks(content:bytes, chunk_size:int=CHUNK_SIZE):
+    """
+    Découpe la page en morceaux comme le ferait response.iter_content()
+    """
+    for i in range(0, len(content), chunk_size):
+        yield content[i:i+chunk_size]
+
+
+def with_beautifulsoup(content:bytes):
+    soup = BeautifulSoup(content, 'html.parser')
+    return soup.find("figure", {"class": "image"}).find("img")['src'], len(content)
+
+
+def with_streaming(content:bytes):
+    image_url, bytes_read, _ = extract_figure_image(iter_chunks(content))
+    return image_url, bytes_read
+
+
+def bench(function, content:bytes, repeat:int):
+    start = time.process_time()
+    for i in range(repeat):
+        image_url, bytes_read = function(content)
+    return (time.process_time() - start)/repeat, bytes_read, image_url
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    for file_name in sorted(os.listdir(FIXTURES)):
+        if not file_name.endswith('.html'):
+            continue
+        with open(os.path.join(FIXTURES, file_name), 'rb') as file:
+            content = file.read()
+        cpu_bs4, bytes_bs4, url_bs4 = bench(with_beautifulsoup, content, repeat)
+        cpu_stream, bytes_stream, url_stream = bench(with_streaming, content, repeat)
+        assert url_bs4 == url_stream, f"Les deux méthodes ne trouvent pas la même image ({url_bs4} ≠ {url_stream})"
+        print(f"► {file_name} ({len(content)} octets)")
+        print(f"    BeautifulSoup : {cpu_bs4*1000:8.2f} ms CPU / bateau, {bytes_bs4:8d} octets lus")
+        print(f"    Streaming     : {cpu_stream*1000:8.2f} ms CPU / bateau, {bytes_stream:8d} octets lus")
+        print(f"    → CPU ÷ {cpu_bs4/cpu_stream:.1f}, octets lus ÷ {bytes_bs4/bytes_stream:.1f}")
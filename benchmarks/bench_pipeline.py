@@ -0,0 +1,305 @@
+"""
+Benchmark de bout en bout du cycle de mise à jour, sans accès au réseau : des serveurs HTTP locaux
+remplacent Google Sheets, l'API de MarineTraffic, le site du musée maritime et les photos des bateaux,
+avec une latence, un taux d'erreur et une taille de flotte réglables (10 à 10 000 MMSI).
+
+Pour chaque taille de flotte (dans un processus à part, pour que la mémoire d'une taille ne fausse pas
+la suivante) : mise à jour complète (DataBase.run), mises à jour partielles, génération de la carte
+(TrackerServer.generate_html) et publication dans un dépôt git local. Le benchmark affiche le temps réel,
+le temps CPU et le pic de mémoire de chaque phase, puis les métriques de chaque étape (requêtes, octets,
+cache, échecs) et le nombre de requêtes reçues par chaque serveur local.
+
+Usage (depuis la racine du projet) :
+    python benchmarks/bench_pipeline.py [--sizes 10,100,1000] [--latency 0.02] [--error-rate 0.01] [--cycles 3]
+"""
+# IMPORT
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+os.environ.setdefault('TQDM_DISABLE', '1') # les barres de progression fausseraient la mesure (lu à l'import de tqdm)
+
+try:
+    import resource # pic de mémoire du processus (absent sous Windows)
+except ImportError:
+    resource = None
+
+PACKAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'packages')
+sys.path.insert(0, PACKAGES)
+from db import DataBase
+from server import TrackerServer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SIZES = [10, 100, 1000]
+PIXEL_PNG = bytes.fromhex('89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+                          '1f15c4890000000d4944415478da63f8cfc0f01f0005000201a2dd8d2b0000000049454e44ae426082') # image 1x1
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass # connexions fermées par le client (réponses lues au fil de l'eau puis abandonnées)
+
+
+class StandInUpstreams():
+    """
+    Serveurs locaux qui imitent les sites interrogés par DataBase, pour une flotte synthétique :
+    - /sheet.csv : export CSV de la feuille Google Sheets de la flotte (quelques bateaux sans MMSI)
+    - /en/reports/ : API de MarineTraffic (un ou plusieurs MMSI par requête), les bateaux en route avancent
+      à chaque requête, les autres sont immobiles, certains transpondeurs sont éteints depuis un jour
+    - /mmr/<nom> : pages du musée maritime (page d'exemple du dossier fixtures, 404 pour les autres bateaux)
+    - /photo?shipid=... : photos de MarineTraffic (404 pour une partie des bateaux)
+    Chaque site a son propre port (donc son propre disjoncteur dans SessionPool, comme en production).
+    Chaque requête attend `latency` secondes et échoue (503) avec la probabilité `error_rate`.
+    Les pages et photos ont un ETag : les requêtes conditionnelles reçoivent une réponse 304.
+    """
+
+    SITES = ('sheet', 'ais', 'mmr', 'photos')
+
+    def __init__(self, fleet_size:int, latency:float=0.0, error_rate:float=0.0, moving_ratio:float=0.3,
+                 page_ratio:float=0.3, photo_ratio:float=0.7, dark_ratio:float=0.05, seed:int=0) -> None:
+        self._latency = latency
+        self._error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = collections.Counter() # site -> nombre de requêtes reçues
+        now = int(time.time())
+        self._boats = {}
+        for i in range(fleet_size):
+            mmsi = 200000000 + i
+            self._boats[mmsi] = {'name': f"BATEAU {i:05d}",
+                                 'moving': self._random.random() < moving_ratio,
+                                 'page': self._random.random() < page_ratio,
+                                 'photo': self._random.random() < photo_ratio,
+                                 'LAST_POS': now - (24*3600 if self._random.random() < dark_ratio else self._random.randint(0, 600)),
+                                 'LAT': self._random.uniform(35, 60),
+                                 'LON': self._random.uniform(-10, 20),
+                                 'COURSE': self._random.randint(0, 359),
+                                 }
+        self._pages = {DataBase.normalize_boat_name(boat['name']) for boat in self._boats.values() if boat['page']}
+        with open(os.path.join(FIXTURES, 'mmr_boat_page.html'), 'rb') as file:
+            self._page = file.read()
+        self._servers = {site: QuietHTTPServer(('127.0.0.1', 0), self._handler(site)) for site in StandInUpstreams.SITES}
+
+    def url(self, site:str) -> str:
+        return "http://127.0.0.1:{0}".format(self._servers[site].server_port)
+
+    def start(self) -> None:
+        for server in self._servers.values():
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def sheet(self) -> bytes:
+        lines = ["Nom du bateau,MMSI,Numero du skipper/armateur"]
+        for i, (mmsi, boat) in enumerate(self._boats.items()):
+            lines.append(f"{boat['name']},{mmsi},{i}")
+            if i % 20 == 0: # bateaux de la feuille sans MMSI, filtrés par DataBase
+                lines.append(f"SANS MMSI {i:05d},,{i}")
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def reports(self, mmsi_list:list) -> bytes:
+        data = []
+        with self._lock:
+            for mmsi in mmsi_list:
+                boat = self._boats.get(mmsi)
+                if boat is None:
+                    continue
+                if boat['moving']:
+                    boat['LAT'] += 0.01
+                    boat['LAST_POS'] = int(time.time())
+                data.append({'MMSI': str(mmsi), 'CODE2': 'FR', 'SHIP_ID': str(mmsi - 199000000),
+                             'LAST_POS': boat['LAST_POS'], 'LAT': round(boat['LAT'], 5), 'LON': round(boat['LON'], 5),
+                             'SPEED': 7.5 if boat['moving'] else 0.0, 'COURSE': boat['COURSE']})
+        return json.dumps({'data': data}).encode('utf-8')
+
+    def _handler(self, site:str):
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # keep-alive, comme les vrais serveurs
+
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                with upstreams._lock:
+                    upstreams.counts[site] += 1
+                    failed = upstreams._random.random() < upstreams._error_rate
+                if upstreams._latency:
+                    time.sleep(upstreams._latency)
+                if failed:
+                    return self._send(503, b'')
+                if url.path == '/sheet.csv':
+                    return self._send(200, upstreams.sheet(), 'text/csv')
+                if url.path.startswith('/en/reports'):
+                    mmsi = urllib.parse.unquote(url.query).split('mmsi|eq|mmsi=')[-1].split('&')[0]
+                    return self._send(200, upstreams.reports([int(value) for value in mmsi.split(',') if value]), 'application/json')
+                if url.path.startswith('/mmr/'):
+                    if url.path[len('/mmr/'):] not in upstreams._pages:
+                        return self._send(404, b'')
+                    return self._send(200, upstreams._page, 'text/html; charset=utf-8', etag='"page"')
+                if url.path == '/photo':
+                    shipid = int(urllib.parse.parse_qs(url.query).get('shipid', ['0'])[0])
+                    boat = upstreams._boats.get(shipid + 199000000)
+                    if boat is None or not boat['photo']:
+                        return self._send(404, b'')
+                    return self._send(200, PIXEL_PNG, 'image/png', etag=f'"photo-{shipid}"')
+                return self._send(404, b'')
+
+            def _send(self, status:int, body:bytes, content_type:str='text/plain', etag:str=None):
+                if etag is not None and self.headers.get('If-None-Match') == etag:
+                    status, body = 304, b''
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if etag is not None:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def configure(upstreams:StandInUpstreams, directory:str, polite:bool) -> None:
+    """
+    Redirige DataBase et TrackerServer vers les serveurs locaux et un dossier temporaire
+    """
+    DataBase.url_fleet = upstreams.url('sheet') + "/sheet.csv"
+    DataBase.API_TEMPLATE = upstreams.url('ais') + "/en/data/?asset_type=vessels&columns={1}&mmsi|eq|mmsi={0}"
+    DataBase.PAGE_URL_TEMPLATE = upstreams.url('mmr') + "/mmr/{0}"
+    DataBase.TEMPLATE_IMG_URL_MT = upstreams.url('photos') + "/photo?shipid={0}"
+    DataBase.DEFAULT_BOAT_IMG_URL = upstreams.url('photos') + "/photo?shipid=0"
+    if not polite:
+        # on mesure le débit du code, pas les pauses imposées par politesse envers les vrais serveurs
+        DataBase.minTIME_SLEEP = DataBase.newTIME_SLEEP_MAX = 0
+        DataBase.REQUESTS_PER_SECOND = 1e6
+        DataBase.CYCLE_BUDGET = DataBase.COMPLETE_CYCLE_BUDGET = None
+    # fichiers statiques du site (icônes, logos, styles) utilisés par la carte, sans les données ni le cache des images
+    shutil.copytree(os.path.join(PACKAGES, '..', 'Tracker_fleet_YCC'), os.path.join(directory, "Tracker_fleet_YCC"),
+                    ignore=shutil.ignore_patterns('DATA_SAVES', 'cache', '*.xcf'))
+    TrackerServer.LOCAL_PATH_TO_BACKUP = os.path.join(directory, "Tracker_fleet_YCC")
+    TrackerServer.LOCAL_PATH_TO_SITE = os.path.join(directory, "site")
+    TrackerServer.GIT_URL = os.path.join(directory, "remote.git")
+    os.makedirs(DataBase.path_saving_data, exist_ok=True)
+    subprocess.run(['git', 'init', '--bare', '-q', TrackerServer.GIT_URL], check=True)
+
+
+def cpu_time() -> float:
+    """
+    Temps CPU du processus (tous ses threads) et des processus fils terminés (git, processus de rendu)
+    """
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+
+@contextlib.contextmanager
+def measure(results:list, phase:str, use_tracemalloc:bool):
+    """
+    Mesure une phase : temps réel, temps CPU (voir cpu_time()) et pic de mémoire
+    (pic des allocations Python de la phase avec tracemalloc, sinon pic du processus depuis son démarrage)
+    """
+    if use_tracemalloc:
+        tracemalloc.reset_peak()
+    wall, cpu = time.perf_counter(), cpu_time()
+    yield
+    wall, cpu = time.perf_counter() - wall, cpu_time() - cpu
+    if use_tracemalloc:
+        peak = tracemalloc.get_traced_memory()[1]/2**20
+    elif resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/(2**20 if sys.platform == 'darwin' else 2**10)
+    else:
+        peak = float('nan')
+    results.append((phase, wall, cpu, peak))
+
+
+def run_size(size:int, latency:float, error_rate:float, cycles:int, polite:bool, use_tracemalloc:bool, verbose:bool) -> dict:
+    """
+    Lance le pipeline complet pour une taille de flotte (dans un dossier temporaire) et retourne les mesures
+    """
+    upstreams = StandInUpstreams(size, latency, error_rate)
+    upstreams.start()
+    directory = tempfile.mkdtemp()
+    previous_directory = os.getcwd()
+    os.chdir(directory) # les chemins de DataBase et TrackerServer sont relatifs au dossier courant
+    phases = []
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        if use_tracemalloc:
+            tracemalloc.start()
+        with output:
+            configure(upstreams, directory, polite)
+            db = DataBase()
+            site = TrackerServer(db, local_assets=False)
+            site.config_git()
+            with measure(phases, "mise à jour complète", use_tracemalloc):
+                db.run(complete_init=True)
+                db.wait_for_save()
+            for cycle in range(1, cycles):
+                with measure(phases, f"mise à jour partielle {cycle}", use_tracemalloc):
+                    db.run(complete_init=False)
+                    db.wait_for_save()
+            site.set_tracked_fleet_df(db.get_tracked_fleet_df().copy())
+            with measure(phases, "génération de la carte", use_tracemalloc):
+                site.generate_html()
+            with measure(phases, "publication", use_tracemalloc):
+                site.publish_site()
+        with open(os.path.join(DataBase.METRICS_DIRECTORY, 'metrics.jsonl'), encoding='utf-8') as file:
+            stages = [json.loads(line) for line in file]
+        return {'size': size, 'boats': len(db.get_tracked_fleet_df()), 'phases': phases, 'stages': stages, 'requests': dict(upstreams.counts)}
+    finally:
+        if use_tracemalloc:
+            tracemalloc.stop()
+        upstreams.stop()
+        os.chdir(previous_directory)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def print_report(result:dict) -> None:
+    print(f"\n=== {result['size']} MMSI ({result['boats']} bateaux suivis) ===")
+    print(f"{'phase':<28} {'temps (s)':>10} {'CPU (s)':>10} {'mémoire (Mo)':>13}")
+    for phase, wall, cpu, peak in result['phases']:
+        print(f"{phase:<28} {wall:10.3f} {cpu:10.3f} {peak:13.1f}")
+    print(f"\n{'cycle':>5} {'étape':<8} {'durée (s)':>10} {'requêtes':>9} {'octets':>11} {'cache':>7} {'échecs':>7}")
+    for stage in result['stages']:
+        print(f"{stage['cycle'] or '':>5} {stage['stage']:<8} {stage['duration']:10.3f} {stage['requests']:9d} "
+              f"{stage['bytes']:11d} {stage['cache_hits']:7d} {stage['failures']:7d}")
+    print("\nRequêtes reçues par les serveurs locaux : " + ", ".join(f"{route} {count}" for route, count in sorted(result['requests'].items())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne du cycle de mise à jour complet")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in SIZES), help="tailles de flotte (nombre de MMSI), séparées par des virgules")
+    parser.add_argument('--latency', type=float, default=0.02, help="latence de chaque réponse des serveurs locaux (en secondes)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="probabilité qu'une requête échoue (réponse 503)")
+    parser.add_argument('--cycles', type=int, default=3, help="nombre de mises à jour (la première est complète)")
+    parser.add_argument('--polite', action='store_true', help="garder les pauses, le débit maximum et le budget de temps de DataBase")
+    parser.add_argument('--tracemalloc', action='store_true', help="mesurer le pic des allocations Python de chaque phase (plus lent)")
+    parser.add_argument('--verbose', action='store_true', help="afficher les messages de DataBase et TrackerServer")
+    args = parser.parse_args()
+
+    for size in [int(size) for size in args.sizes.split(',')]:
+        # un processus par taille : le pic de mémoire d'une taille ne dépend pas des précédentes
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(run_size, size, args.latency, args.error_rate, args.cycles,
+                                     args.polite, args.tracemalloc, args.verbose).result()
+        print_report(result)
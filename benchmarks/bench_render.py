@@ -0,0 +1,88 @@
+"""
+Benchmark de la génération de la carte sur des flottes synthétiques (1k à 10k bateaux) :
+temps de génération des popups et de generate_html() en fonction du nombre de processus.
+Le script se termine en erreur (code 1) si une carte dépasse le budget de taille (TrackerServer.check_html_size).
+
+Usage (depuis la racine du projet) :
+    python benchmarks/bench_render.py [taille1,taille2,...] [processus1,processus2,...]
+"""
+# IMPORT
+import contextlib
+import io
+import os
+import sys
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'packages'))
+from server import TrackerServer
+
+SIZES = [1000, 5000, 10000]
+WORKERS = [1, 2, 4]
+
+
+def synthetic_fleet(size:int, seed:int=0) -> pd.DataFrame:
+    """
+    Génère une flotte aléatoire avec les colonnes utilisées par la carte
+    """
+    rng = np.random.default_rng(seed)
+    countries = np.array([code for code in TrackerServer.dictionnary_country])
+    has_page = rng.random(size) < 0.3
+    return pd.DataFrame({'Nom du bateau': [f"BATEAU {i:05d}" for i in range(size)],
+                         'MMSI': pd.array(200000000 + np.arange(size), dtype='Int64'),
+                         'PAGE_LINK': np.where(has_page, [f"https://www.museemaritimelarochelle.fr/bateau-{i}" for i in range(size)], None),
+                         'COUNTRY_CODE': rng.choice(countries, size),
+                         'LAST_POSITION': (1.69e9 + rng.integers(0, 3600*24*30, size)).astype('float64'),
+                         'LAT': rng.uniform(35, 60, size),
+                         'LONG': rng.uniform(-10, 20, size),
+                         'SPEED': rng.uniform(0, 12, size).round(1),
+                         'CAP': np.where(rng.random(size) < 0.1, np.nan, rng.integers(0, 360, size)),
+                         'IMAGE_URL': [f"https://photos.marinetraffic.com/ais/showphoto.aspx?shipid={i}" for i in range(size)],
+                         })
+
+
+def bench(size:int, workers:int):
+    site = TrackerServer(html_file_name='bench_render.html', render_workers=workers, local_assets=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        site.set_tracked_fleet_df(synthetic_fleet(size))
+    records = site._prepare_render_frame(site._tracked_fleet_df).to_dict('records')
+    start = time.perf_counter()
+    site.render_popups(records)
+    popups = time.perf_counter() - start
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # on masque les messages de la génération
+        site.generate_html()
+    total = time.perf_counter() - start
+    with contextlib.redirect_stdout(io.StringIO()):
+        within_budget = site.check_html_size(os.path.join('Tracker_fleet_YCC', 'bench_render.html'), size)
+    return popups, total, os.path.getsize(os.path.join('Tracker_fleet_YCC', 'bench_render.html')), within_budget
+
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else SIZES
+    workers_list = [int(workers) for workers in sys.argv[2].split(',')] if len(sys.argv) > 2 else WORKERS
+    # la carte est générée dans un dossier temporaire pour ne pas écraser le site
+    directory = tempfile.mkdtemp()
+    # fichiers statiques du site (icônes, logos, styles) utilisés par la carte
+    shutil.copytree(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Tracker_fleet_YCC'), os.path.join(directory, 'Tracker_fleet_YCC'),
+                    ignore=shutil.ignore_patterns('DATA_SAVES', 'cache', '*.xcf'))
+    os.chdir(directory)
+    results = []
+    try:
+        for size in sizes:
+            for workers in workers_list:
+                results.append((size, workers) + bench(size, workers))
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"\n{os.cpu_count()} coeurs disponibles")
+    print(f"{'bateaux':>8} {'processus':>10} {'popups (s)':>11} {'carte (s)':>10} {'accélération popups':>20} {'taille (ko)':>12}")
+    for size, workers, popups, total, html_bytes, within_budget in results:
+        reference = next(result[2] for result in results if result[0] == size)
+        print(f"{size:8d} {workers:10d} {popups:11.3f} {total:10.3f} {reference/popups:19.2f}x {html_bytes/1024:12.1f}{'' if within_budget else '  HORS BUDGET'}")
+    if not all(result[5] for result in results):
+        print("-- La carte dépasse le budget de taille (MAX_HTML_BYTES_BASE + MAX_HTML_BYTES_PER_BOAT par bateau) --")
+        sys.exit(1)
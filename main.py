@@ -1,5 +1,4 @@
-from itools import DataBase, TrackerServer
-import time 
+from packages import DataBase, TrackerServer, PipelineScheduler
 
 
 if __name__ == '__main__':
@@ -11,41 +10,26 @@ if __name__ == '__main__':
     
     print("__________________________STARTING TRACKER SERVER__________________________\n\n")
     db = DataBase()
-    site = TrackerServer()
+    site = TrackerServer(db, publish_mode='incremental') # la page n'est régénérée que si la flotte change, sinon seules les positions sont publiées
     site.config_git()
 
-    # on initialise la base de données avec un initialisation complète
-    db.run(complete_init=True)
-    site.load_last_save()
-    site.generate_html()
-    site.publish_site()
-    print("\n\n__________________________TRACKER SERVER INITIALIZED__________________________\n\n")
-    
-
-
-    # on lance le serveur
-    while True:
-        # on attend DELAY secondes avant de recommencer en affichant le temps restant
-        for i in range(DELAY):
-            # on affiche le temps restant en format hh:mm:ss
-            print("Time remaining before next update: {:02d}:{:02d}:{:02d}".format((DELAY-i)//3600, ((DELAY-i)%3600)//60, (DELAY-i)%60), end="\r")
-            time.sleep(1)
-        print("Time remaining before next update: 00:00:00", end="\r")
-
-        # on relance le serveur
-        print("\n\n__________________________UPDATING TRACKER SERVER__________________________\n\n")
-        db.run(complete_init=False)
-        site.load_last_save()
-        site.generate_html()
-        site.publish_site()
+    def fetch(cycle):
+        """
+        Mise à jour de la base de données (thread principal), le premier cycle est une initialisation complète
+        """
+        print(f"\n\n__________________________UPDATING DATABASE (cycle {cycle})__________________________\n\n")
+        db.run(complete_init=(cycle == 0))
+        # copie figée transmise à la publication : la base continue d'être mise à jour pendant ce temps
+        # (avec le numéro de la mise à jour, pour relier les métriques de la publication à celles de la mise à jour)
+        return db.get_cycle(), db.get_tracked_fleet_df().copy()
+
+    def publish(result):
+        """
+        Génération et publication du site (thread de publication)
+        """
+        db_cycle, tracked_fleet_df = result
+        site.update_site(tracked_fleet_df=tracked_fleet_df, cycle=db_cycle) # on ne régénère et ne publie la carte que si la flotte a changé
         print("\n\n__________________________TRACKER SERVER UPDATED__________________________\n\n")
 
-
-        
-
-
-
-
-    
-
-
+    # une mise à jour toutes les DELAY secondes exactement, la publication d'un cycle se fait pendant la mise à jour du suivant
+    PipelineScheduler(DELAY, fetch, publish).run_forever()
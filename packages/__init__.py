@@ -1,2 +1,13 @@
-from .db import DataBase
-from .server import TrackerServer
\ No newline at end of file
+import os
+import sys
+
+# les modules du paquet s'importent entre eux comme des scripts (from network import SessionPool) :
+# leur dossier doit être dans le chemin d'import pour que `from packages import DataBase` fonctionne.
+# Il est ajouté en fin de chemin : les noms génériques (db, server, cache...) ne masquent pas d'autres modules.
+PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+if PACKAGE_DIRECTORY not in sys.path:
+    sys.path.append(PACKAGE_DIRECTORY)
+
+from db import DataBase
+from server import TrackerServer
+from scheduler import PipelineScheduler
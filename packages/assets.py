@@ -0,0 +1,162 @@
+# IMPORT
+import hashlib
+import io
+import mimetypes
+import os
+import tempfile
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from network import SessionPool
+from cache import DiskCache
+
+try:
+    from PIL import Image # optionnel : sans Pillow, les images sont servies localement mais sans miniatures
+except ImportError:
+    Image = None
+
+
+class AssetStore():
+    """
+    Cache local des images affichées sur la carte (drapeaux, photos des bateaux).
+    Chaque image distincte n'est téléchargée qu'une fois et rangée sous le sha256 de son contenu
+    (deux liens vers la même image ne prennent qu'une place). Si Pillow est installé, on génère
+    en plus une miniature à la taille d'affichage et sa variante WebP.
+    """
+
+    # taille maximale (largeur, hauteur) des miniatures de chaque type d'image (2x la taille affichée pour les écrans haute densité)
+    SIZES = {'flag': (200, 50), # drapeaux de la liste des bateaux (25 px de haut)
+             'photo': (600, 600), # photos des popups (300 px de large au maximum)
+             }
+    TIMEOUT = 15 # délai maximum d'un téléchargement (en secondes)
+    HEADERS = {'User-Agent': 'FleetyTracker (https://github.com/pierre-cau/YCC_fleet_tracker)'} # Wikimedia refuse les requêtes sans User-Agent
+
+    def __init__(self, directory:str, url_prefix:str, index_path:str, ttl_found:float, ttl_missing:float, nb_workers:int=4, http:SessionPool=None) -> None:
+        """
+        :param directory: dossier où sont rangées les images (dans le dossier du site)
+        :param url_prefix: chemin de ce dossier relativement à la page HTML
+        :param index_path: fichier JSON qui associe chaque lien d'origine aux fichiers locaux
+        """
+        self._directory = directory
+        self._url_prefix = url_prefix.rstrip('/')
+        self._index = DiskCache(index_path, ttl_found, ttl_missing) # lien d'origine -> fichiers locaux
+        self._nb_workers = nb_workers
+        self._http = http if http is not None else SessionPool(headers=AssetStore.HEADERS)
+        if Image is None:
+            print("→ Pillow n'est pas installé : les images seront servies localement mais sans miniatures")
+
+    def localize(self, urls, kind:str) -> dict:
+        """
+        Télécharge (si besoin) les images et retourne pour chaque lien d'origine les liens locaux
+        {'src': miniature (ou original), 'webp': variante WebP ou None}.
+        Une image qu'on n'arrive pas à télécharger garde son lien d'origine.
+
+        :param urls: liens des images (les doublons et valeurs manquantes sont ignorés)
+        :param kind: type d'image, clé de SIZES
+        """
+        urls = sorted({url for url in urls if isinstance(url, str) and url.startswith('http')})
+        with ThreadPoolExecutor(max_workers=self._nb_workers) as executor:
+            links = dict(zip(urls, executor.map(lambda url: self._localize_one(url, kind), urls)))
+        self._index.save()
+        return links
+
+    def _localize_one(self, url:str, kind:str) -> dict:
+        entry = self._index.get(url)
+        if self._index.is_fresh(entry) and (not entry['ok'] or os.path.isfile(self._path(entry['value']))):
+            if not entry['ok']:
+                return {'src': url, 'webp': None}
+            return self._variants(entry['value'], kind)
+
+        # on ne revalide que si le fichier local existe encore : sinon une réponse 304 n'aurait pas de contenu à servir
+        stored = entry is not None and entry['ok'] and os.path.isfile(self._path(entry['value']))
+        try:
+            response = self._http.get(url, headers=DiskCache.conditional_headers(entry) if stored else {}, timeout=AssetStore.TIMEOUT)
+            if response.status_code == 304:
+                if not stored:
+                    raise ValueError("réponse 304 sans image locale")
+                self._index.touch(url)
+                return self._variants(entry['value'], kind)
+            response.raise_for_status()
+        except Exception as e:
+            print("→ Image non téléchargée : {0} → {1}".format(url, e))
+            if stored:
+                return self._variants(entry['value'], kind) # on garde l'ancienne version
+            self._index.set(url, None, ok=False)
+            return {'src': url, 'webp': None}
+
+        # nom du fichier : empreinte du contenu + extension d'après le type MIME (ou le lien)
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        extension = mimetypes.guess_extension(content_type) or os.path.splitext(urllib.parse.urlsplit(url).path)[1] or '.img'
+        name = hashlib.sha256(response.content).hexdigest() + extension
+        try:
+            self._write_file(name, response.content)
+        except OSError as e:
+            print("→ Image non enregistrée : {0} → {1}".format(url, e))
+            return {'src': url, 'webp': None}
+        self._index.set(url, name, ok=True, etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+        return self._variants(name, kind)
+
+    def _variants(self, name:str, kind:str) -> dict:
+        """
+        Retourne les liens de la miniature et de sa variante WebP (créées si elles n'existent pas encore)
+        """
+        original = {'src': self._link(name), 'webp': None}
+        if Image is None:
+            return original
+        width, height = AssetStore.SIZES[kind]
+        stem, extension = os.path.splitext(name)
+        extension = extension if extension in ('.png', '.jpg', '.jpeg', '.gif') else '.png'
+        thumbnail = f"{stem}_{width}x{height}{'.png' if extension == '.gif' else extension}"
+        webp = f"{stem}_{width}x{height}.webp"
+        if not (os.path.isfile(self._path(thumbnail)) and os.path.isfile(self._path(webp))):
+            try:
+                with Image.open(self._path(name)) as image:
+                    image.thumbnail((width, height))
+                    if thumbnail.endswith(('.jpg', '.jpeg')):
+                        image = image.convert('RGB')
+                    self._save_image(image, thumbnail)
+                    self._save_image(image, webp, quality=80)
+            except Exception as e:
+                # format non géré par Pillow (svg...) : on sert l'original
+                print("→ Miniature impossible pour {0} → {1}".format(name, e))
+                return original
+        return {'src': self._link(thumbnail), 'webp': self._link(webp)}
+
+    def _save_image(self, image, name:str, **kwargs) -> None:
+        buffer = io.BytesIO()
+        image.save(buffer, format=Image.registered_extensions()[os.path.splitext(name)[1]], **kwargs)
+        self._write_file(name, buffer.getvalue())
+
+    def _write_file(self, name:str, content:bytes) -> None:
+        """
+        Écrit un fichier du cache s'il n'existe pas encore. Plusieurs threads peuvent écrire le même fichier
+        (même contenu, donc même nom) : chacun passe par son propre fichier temporaire avant le renommage atomique.
+        """
+        path = self._path(name)
+        if os.path.isfile(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _path(self, name:str) -> str:
+        # on répartit les fichiers dans des sous-dossiers selon les 2 premiers caractères de l'empreinte
+        return os.path.join(self._directory, name[:2], name)
+
+    def _link(self, name:str) -> str:
+        return f"{self._url_prefix}/{name[:2]}/{name}"
+
+    def stats(self) -> dict:
+        """
+        Compteurs des téléchargements (voir SessionPool.stats())
+        """
+        return self._http.stats()
+
+    def close(self) -> None:
+        self._http.close()
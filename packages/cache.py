@@ -0,0 +1,87 @@
+# IMPORT
+import json
+import os
+import threading
+import time
+
+
+class DiskCache():
+    """
+    Cache persistant sur disque (fichier JSON) qui garde les résultats positifs et négatifs
+    d'une requête avec des durées de validité (TTL) distinctes, ainsi que les en-têtes
+    ETag/Last-Modified pour pouvoir revalider une entrée expirée avec une requête conditionnelle.
+    """
+
+    def __init__(self, path:str, ttl_positive:float, ttl_negative:float) -> None:
+        self._path = path # chemin du fichier JSON
+        self._ttl_positive = ttl_positive # durée de validité d'un résultat positif (en secondes)
+        self._ttl_negative = ttl_negative # durée de validité d'un résultat négatif (en secondes)
+        self._lock = threading.Lock()
+        self._entries = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    self._entries = json.load(file)
+            except (OSError, ValueError) as e:
+                print("→ Cache illisible, il sera reconstruit : {0} → {1}".format(path, e))
+
+    def get(self, key:str) -> dict:
+        """
+        Retourne l'entrée associée à la clé (None si absente)
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+    def is_fresh(self, entry:dict) -> bool:
+        """
+        Indique si une entrée est encore valide selon son type (positive ou négative)
+        """
+        if entry is None:
+            return False
+        ttl = self._ttl_positive if entry['ok'] else self._ttl_negative
+        return time.time() - entry['fetched_at'] < ttl
+
+    def set(self, key:str, value, ok:bool, etag:str=None, last_modified:str=None) -> None:
+        """
+        Enregistre un résultat positif (ok=True) ou négatif (ok=False)
+        """
+        with self._lock:
+            self._entries[key] = {'value': value,
+                                  'ok': ok,
+                                  'etag': etag,
+                                  'last_modified': last_modified,
+                                  'fetched_at': time.time(),
+                                  }
+
+    def touch(self, key:str) -> None:
+        """
+        Prolonge la validité d'une entrée (réponse 304 Not Modified)
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries[key]['fetched_at'] = time.time()
+
+    @staticmethod
+    def conditional_headers(entry:dict) -> dict:
+        """
+        Retourne les en-têtes If-None-Match/If-Modified-Since pour revalider une entrée positive
+        """
+        headers = {}
+        if entry is None or not entry['ok']:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def save(self) -> None:
+        """
+        Écrit le cache sur le disque (écriture atomique via un fichier temporaire)
+        """
+        with self._lock:
+            os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+            tmp_path = self._path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self._entries, file)
+            os.replace(tmp_path, self._path)
@@ -1,16 +1,23 @@
 # IMPORT
 import pandas as pd
 import numpy as np
-from aisexplorer.AIS import AIS
 import urllib
 from tqdm import tqdm
-import requests
 # on récupère beautifulsoup4 pour parser le html
 from bs4 import BeautifulSoup
 from datetime import datetime
 import time
 import random
+import io
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from network import TokenBucket, SessionPool, RequestSkipped
+from cache import DiskCache
+from scraping import extract_figure_image
+from history import HistoryStore
+from snapshot import save_snapshot, load_snapshot, list_saves
+from polling import PollingPlanner
+from metrics import MetricsRecorder
 
 
 class DataBase():
@@ -28,9 +35,29 @@ class DataBase():
     # Paramètrage des saves locales des données AIS
     path_saving_data = "Tracker_fleet_YCC/DATA_SAVES/"
     format_path_saving_data = path_saving_data + '/SAVE__{0}.csv'
+    # les sauvegardes binaires restent hors du dossier publié : seul l'export csv est poussé sur le site
+    path_snapshots = "DATA_SNAPSHOTS/"
+    format_path_snapshot = path_snapshots + 'SAVE__{0}.npz'
+    SNAPSHOT_BINARY = True # sauvegarde au format binaire en colonnes (.npz), rapide à recharger
+    EXPORT_CSV = True # on garde aussi un export csv de chaque sauvegarde
+    SAVE_IN_BACKGROUND = True # l'écriture des sauvegardes se fait en dehors du chemin critique fetch → publication
     format_print = "%d/%m/%Y %H:%M:%S" # format d'affichage de la date
     FORMAT_DATE_CSV_FILE = "%d_%m_%Y_%H_%M_%S" # format de la date pour le nom du fichier csv
-    MAX_NUMBER_OF_FILES = 5 # on ne garde que les n derniers fichiers de données AIS dans le dossier data_ship
+    MAX_NUMBER_OF_FILES = 2 # on ne garde que les n derniers fichiers de données AIS dans le dossier data_ship (l'historique complet est dans HISTORY_DB)
+
+    # Paramètrage de l'historique des positions (hors du dossier publié sur le site)
+    path_history = "DATA_HISTORY/"
+    HISTORY_DB = path_history + "history.sqlite"
+    HISTORY_RETENTION_DAYS = 180 # durée de conservation des positions (en jours)
+
+    # Paramètrage des caches persistants (hors du dossier publié sur le site)
+    path_cache = "CACHE/"
+    MMR_CACHE_FILE = path_cache + "mmr_pages.json" # cache des pages du musée maritime
+    TTL_MMR_PAGE_FOUND = 30*24*3600 # durée de validité d'une page trouvée (en secondes)
+    TTL_MMR_PAGE_MISSING = 7*24*3600 # durée de validité d'une page absente (en secondes)
+    IMAGE_CACHE_FILE = path_cache + "image_links.json" # cache des liens des images des bateaux
+    TTL_IMAGE_FOUND = 7*24*3600 # durée de validité d'un lien d'image trouvé (en secondes)
+    TTL_IMAGE_MISSING = 24*3600 # durée de validité d'un échec (image par défaut) (en secondes)
     
     # Liste des colonnes à récupérer dans la base de données de contrôle des navires
     TO_INT_COLUMNS = ['MMSI', 'Numero du skipper/armateur']
@@ -40,11 +67,40 @@ class DataBase():
     maxTIME_SLEEP = 0.4
     newTIME_SLEEP_MAX = 0.2 # le serveur pour le musée maritime de La Rochelle est plus tolérant
 
-    num_retries = 8 # nombre de tentatives de requêtes avant de passer à la suivante pour l'API
-    seconds_wait = 5 # nombre de secondes à attendre avant de relancer une requête pour l'API
+    # Paramètrage du moteur de requêtes concurrentes vers l'API AIS
+    NB_WORKERS = 4 # nombre de requêtes AIS menées en parallèle
+    REQUESTS_PER_SECOND = 3.0 # débit max de requêtes vers l'API AIS, partagé entre tous les threads
+    RATE_BURST = 2 # nombre de requêtes qui peuvent partir d'un coup quand le seau est plein
+    AIS_BATCH_SIZE = 10 # nombre de MMSI demandés en une seule requête à l'API
+
+    # Interrogation adaptative : lors d'une mise à jour partielle, seuls les bateaux en route sont interrogés à chaque cycle
+    ADAPTIVE_POLLING = True # False : tous les bateaux sont interrogés à chaque mise à jour
+    MOVING_SPEED = 0.5 # vitesse (en noeuds) à partir de laquelle un bateau est considéré en route
+    MOVING_DISTANCE = 0.0005 # déplacement (en degrés, ~50 m) depuis la dernière interrogation à partir duquel un bateau est en route
+    DARK_FIX_AGE = 6*3600 # âge (en secondes) de la dernière position AIS au delà duquel le transpondeur est considéré éteint
+    POLL_BACKOFF_MIN = 10*60 # premier délai (en secondes) avant de réinterroger un bateau immobile, doublé à chaque réponse identique
+    POLL_BACKOFF_MAX = 6*3600 # délai maximum (en secondes) entre deux interrogations d'un même bateau
+
+    # Résilience des requêtes (API AIS, musée maritime, images) : un serveur lent ou en panne ne bloque plus toute la mise à jour
+    HTTP_TIMEOUT = 15 # délai maximum d'une requête (en secondes)
+    HTTP_RETRIES = 2 # nombre de nouvelles tentatives après une erreur réseau ou une réponse 429/5xx
+    HTTP_BACKOFF = 0.5 # délai de base avant une nouvelle tentative (en secondes), doublé à chaque échec avec une part aléatoire
+    HTTP_MAX_BACKOFF = 8 # délai maximum avant une nouvelle tentative (en secondes)
+    BREAKER_FAILURES = 5 # nombre d'échecs consécutifs après lesquels un hôte n'est plus interrogé
+    BREAKER_RESET = 60 # durée (en secondes) pendant laquelle un hôte en panne n'est plus interrogé
+    CYCLE_BUDGET = 90 # budget de temps (en secondes) de toutes les requêtes d'une mise à jour partielle
+    COMPLETE_CYCLE_BUDGET = 15*60 # budget de temps (en secondes) de toutes les requêtes d'une mise à jour complète
+
+    # Métriques de chaque étape de la mise à jour (durée, requêtes, octets, cache, échecs)
+    METRICS_DIRECTORY = "METRICS/" # journal JSON lines (metrics.jsonl) et fichier Prometheus (metrics.prom)
 
     # Template de la réquête API de marinetraffic pour récupérer les données AIS
     API_TEMPLATE = "https://www.marinetraffic.com/en/data/?asset_type=vessels&columns={1}&mmsi|eq|mmsi={0}"
+    API_COLUMNS = ["mmsi", "flag", "imo", "time_of_latest_position", "lat_of_latest_position", "lon_of_latest_position", "speed", "course"] # colonnes demandées à l'API
+    API_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+                   "Vessel-Image": "0026501dd5e7cae9b8afd72aa41a3f831929",
+                   "X-Requested-With": "XMLHttpRequest",
+                   } # en-têtes attendus par l'API de marinetraffic
     # Template de la page sur le musée maritime de La Rochelle pour check si le bateau est un bateau du YCC enregistré au musée
     PAGE_URL_TEMPLATE = "https://museemaritime.larochelle.fr/au-dela-de-la-visite/a-decouvrir-a-proximite/yatchs-classiques/{0}"
     # Template pour récupérer une image sur marine traffic
@@ -52,9 +108,36 @@ class DataBase():
 
     # URL par défaut pour l'image du bateau
     DEFAULT_BOAT_IMG_URL = "https://upload.wikimedia.org/wikipedia/commons/thumb/e/e1/Sail_plan_schooner.svg/1200px-Sail_plan_schooner.svg.png"
+    SCRAPING_CHUNK_SIZE = 8192 # taille des morceaux lus lors du scrapping des pages du musée maritime (en octets)
 
-    def __init__(self) -> None:
+    def __init__(self, nb_workers=NB_WORKERS) -> None:
         self._db_updated = False # booléen qui indique si la base de données a été mise à jour. Par défaut elle n'est pas à jour
+        self._nb_workers = nb_workers # nombre de threads pour les requêtes AIS
+        self._save_executor = ThreadPoolExecutor(max_workers=1) # thread d'écriture des sauvegardes
+        self._pending_save = None # sauvegarde en cours d'écriture
+        self._rate_limiter = TokenBucket(DataBase.REQUESTS_PER_SECOND, DataBase.RATE_BURST) # limiteur de débit partagé vers l'API AIS
+        # connexions keep-alive partagées par tous les scrapers (AIS, musée maritime, images)
+        self._http = SessionPool(pool_maxsize=nb_workers,
+                                 timeout=DataBase.HTTP_TIMEOUT,
+                                 retries=DataBase.HTTP_RETRIES,
+                                 backoff=DataBase.HTTP_BACKOFF,
+                                 max_backoff=DataBase.HTTP_MAX_BACKOFF,
+                                 failure_threshold=DataBase.BREAKER_FAILURES,
+                                 reset_timeout=DataBase.BREAKER_RESET)
+        # cache des pages du musée maritime, indexé par nom de bateau normalisé
+        self._mmr_cache = DiskCache(DataBase.MMR_CACHE_FILE, DataBase.TTL_MMR_PAGE_FOUND, DataBase.TTL_MMR_PAGE_MISSING)
+        # cache des liens des images, indexé par (PAGE_LINK, SHIP_ID)
+        self._image_cache = DiskCache(DataBase.IMAGE_CACHE_FILE, DataBase.TTL_IMAGE_FOUND, DataBase.TTL_IMAGE_MISSING)
+        # sauvegardes binaires laissées dans le dossier publié par une version précédente
+        DataBase.move_snapshots_out_of_site()
+        # historique des positions de la flotte
+        self._history = HistoryStore(DataBase.HISTORY_DB, DataBase.HISTORY_RETENTION_DAYS)
+        # mesures de chaque étape des mises à jour (partagées avec le serveur du site)
+        self._metrics = MetricsRecorder(DataBase.METRICS_DIRECTORY)
+        self._cycle = 0 # numéro de la mise à jour en cours
+        # planning des interrogations AIS de chaque bateau
+        self._polling = PollingPlanner(DataBase.MOVING_SPEED, DataBase.MOVING_DISTANCE, DataBase.DARK_FIX_AGE,
+                                       DataBase.POLL_BACKOFF_MIN, DataBase.POLL_BACKOFF_MAX)
         
     def run(self,complete_init=False):
         """
@@ -70,47 +153,69 @@ class DataBase():
         if complete_update :
             print("\n  --- COMPLETE UPDATE DATABASE ---   ")
             print("====================================")
-            self.request_update_ggsheet()
+            self._http.start_cycle(DataBase.COMPLETE_CYCLE_BUDGET)
+            self._cycle += 1
+            with self._metrics.stage('sheet', self._cycle, http=self._http):
+                self.request_update_ggsheet()
             # on fait une copie de la base de données pour pouvoir comparer les deux
             self._last_update_db = self._tracked_fleet_df.copy()
             if print_ggsheet_extraction :
                 print(" ----- GGSHEET EXTRACTION -----")
                 print(self.__df)
-            self.check_page_MMR(complete_check=True)
-            self.request_update_API(complete_update=True)
-            self.request_image_links()
-            self._db_updated = True
-            self.saveDB()
+            self._run_scraping_stages(complete_update=True)
             print(" ► Base de données mise à jour ! ◄")
+            print("  " + self._metrics.summary(['sheet', 'mmr', 'ais', 'images']))
             print("====================================\n")
 
         else : # on lance une mise à jour partielle
             print("\n  --- PARTIAL UPDATE DATABASE ---   ")
             print("====================================")
-            self.load_last_save()
-            self.request_update_ggsheet()
+            self._http.start_cycle(DataBase.CYCLE_BUDGET)
+            self._cycle += 1
+            if self._db_updated:
+                # l'état précédent est encore en mémoire : inutile de relire la sauvegarde sur le disque
+                self._last_update_db = self._tracked_fleet_df
+            else:
+                self.load_last_save()
+            with self._metrics.stage('sheet', self._cycle, http=self._http):
+                self.request_update_ggsheet()
             if print_ggsheet_extraction :
                 print("                                 ----- GGSHEET EXTRACTION -----")
                 # on affiche les 10 dernières lignes du dataframe
                 print(self.__df.tail(10))
                 print("Affichage des 10 dernières lignes du dataframe")
                 print(self.__df.info())
-            self.check_page_MMR(complete_check=False)
-            self.request_update_API(complete_update=False)
+            self._run_scraping_stages(complete_update=False)
+            print("  " + self._metrics.summary(['sheet', 'mmr', 'ais', 'images']))
+
+    def _run_scraping_stages(self, complete_update:bool)-> None:
+        """
+        Étapes communes aux mises à jour complètes et partielles (pages du musée maritime, données AIS, images
+        puis sauvegarde), chacune mesurée dans les métriques du cycle
+        """
+        with self._metrics.stage('mmr', self._cycle, http=self._http) as stage:
+            self.check_page_MMR(complete_check=complete_update)
+            stage.add(cache_hits=self._mmr_cache_hits)
+        with self._metrics.stage('ais', self._cycle, http=self._http) as stage:
+            self.request_update_API(complete_update=complete_update)
+            # bateaux non interrogés (interrogation adaptative) : leur dernière position est reprise telle quelle
+            stage.add(cache_hits=self._ais_carried, failures=self._ais_unfound)
+        with self._metrics.stage('images', self._cycle, http=self._http) as stage:
             self.request_image_links()
-            self._db_updated = True
-            self.saveDB()
-            
+            stage.add(cache_hits=self._image_cache_hits)
+        self._db_updated = True
+        self.saveDB()
+
     def load_data(self, date:datetime,print_result=False)-> None:
         """
-        Charge les données AIS à partir d'un fichier csv
+        Charge les données AIS à partir d'une sauvegarde (binaire si disponible, csv sinon)
         :param date: date de la sauvegarde des données AIS
         """
         self._last_update = date
         print("_________________________________________________________")
         print("► Date de sauvegarde choisie :", date.strftime(DataBase.format_print))
         print("► Chargement des données AIS...")
-        self._last_update_db = pd.read_csv(DataBase.format_path_saving_data.format(date.strftime(DataBase.FORMAT_DATE_CSV_FILE)))
+        self._last_update_db = load_snapshot(self.get_save_path(date))
         if print_result:
             print("                                 ----- DATAFRAME -----")
             print(self._last_update_db.tail(10)) # on affiche les 10 dernières lignes du dataframe
@@ -128,6 +233,7 @@ class DataBase():
         :return: True si le chargement a réussi, False sinon
         """
         print("              --- LOAD LAST SAVE ---   ")
+        self.wait_for_save() # la dernière sauvegarde est peut-être encore en cours d'écriture
         list_files = self.get_list_of_saves()
         if len(list_files) > 0:
             # on charge le dernier fichier
@@ -159,35 +265,108 @@ class DataBase():
         """
         Retourne la liste des dates des sauvegardes des données AIS
         """
-        list_files = os.listdir(DataBase.path_saving_data)
         # on récupère les dates associées à chaque fichier selon le format de date défini dans la classe
-        list_files = [datetime.strptime(file.split('SAVE__')[1].split('.csv')[0], DataBase.FORMAT_DATE_CSV_FILE) for file in list_files]
-        return list_files
+        return list(DataBase.list_saves().keys())
+
+    def get_save_path(self, date:datetime)-> str:
+        """
+        Retourne le chemin de la sauvegarde d'une date donnée (le format binaire est préféré au csv)
+        """
+        return DataBase.list_saves()[date]
+
+    @staticmethod
+    def list_saves()-> dict:
+        """
+        Retourne un dictionnaire date -> chemin de la sauvegarde à charger, parmi les sauvegardes binaires et csv
+        """
+        return list_saves([DataBase.path_snapshots, DataBase.path_saving_data], DataBase.FORMAT_DATE_CSV_FILE)
+
+    @staticmethod
+    def move_snapshots_out_of_site()-> None:
+        """
+        Déplace les sauvegardes binaires écrites dans le dossier publié (anciennes versions) vers path_snapshots :
+        elles sont ensuite supprimées du dépôt du site à la publication suivante
+        """
+        if not os.path.isdir(DataBase.path_saving_data):
+            return
+        for file in os.listdir(DataBase.path_saving_data):
+            if file.startswith('SAVE__') and file.endswith('.npz'):
+                os.makedirs(DataBase.path_snapshots, exist_ok=True)
+                os.replace(os.path.join(DataBase.path_saving_data, file), os.path.join(DataBase.path_snapshots, file))
     
     def saveDB(self):
+        """
+        Sauvegarde l'état de la flotte. Si SAVE_IN_BACKGROUND est activé, l'écriture sur le disque est faite
+        dans un thread dédié à partir d'une copie du dataframe pour ne pas retarder la publication du site.
+        """
         print(" --> Save database...")
         date = datetime.now()
-        # on récupère la liste des fichiers de données AIS dans le dossier data_ship
-        list_files = self.get_list_of_saves()
-        # si la longueur de la liste est supérieure ou égale à MAX_NUMBER_OF_FILES, on devra supprimer le plus vieux fichier
-        if len(list_files) >= DataBase.MAX_NUMBER_OF_FILES:
-            # on récupère le plus vieux fichier
-            oldest_file = min(list_files)
-            print("     → Le serveur ne peut pas stocker plus de {0} fichiers de données AIS.\      → Le fichier le plus ancien sera supprimé : {1}".format(
-                DataBase.MAX_NUMBER_OF_FILES, 'SAVE__'+oldest_file.strftime(DataBase.FORMAT_DATE_CSV_FILE)+'.csv'))
-            # on supprime le fichier le plus ancien
-            os.remove(DataBase.format_path_saving_data.format(oldest_file.strftime(DataBase.FORMAT_DATE_CSV_FILE)))
-
         self._last_update = date.strftime(DataBase.FORMAT_DATE_CSV_FILE)
-        # on test si on a accès au dossier data_ship
-        if os.path.isdir(DataBase.path_saving_data):
-            # on sauvegarde le dataframe dans un fichier csv 
-            self._tracked_fleet_df.to_csv(DataBase.format_path_saving_data.format(date.strftime(DataBase.FORMAT_DATE_CSV_FILE)), index=False)
+        tracked_fleet_df = self._tracked_fleet_df.copy() # copie figée, le dataframe peut changer pendant l'écriture
+        if DataBase.SAVE_IN_BACKGROUND:
+            # un seul thread d'écriture : les sauvegardes restent dans l'ordre et ne se chevauchent pas
+            self._pending_save = self._save_executor.submit(self._write_save, tracked_fleet_df, date, self._cycle)
+            # l'erreur est affichée dès la fin de l'écriture : elle n'est pas perdue si une autre sauvegarde est lancée entre temps
+            self._pending_save.add_done_callback(DataBase._report_save_error)
+        else:
+            self._write_save(tracked_fleet_df, date, self._cycle)
+
+    def wait_for_save(self)-> None:
+        """
+        Attend la fin de la sauvegarde en cours (s'il y en a une)
+        """
+        if self._pending_save is not None:
+            try:
+                self._pending_save.result()
+            except Exception:
+                pass # déjà signalée par _report_save_error
+            self._pending_save = None
 
+    @staticmethod
+    def _report_save_error(future)-> None:
+        """
+        Affiche l'erreur d'une sauvegarde faite en arrière-plan (appelée à la fin de chaque écriture)
+        """
+        if future.exception() is not None:
+            print("→ Erreur lors de la sauvegarde de la base de données → {0}".format(future.exception()))
+
+    def _write_save(self, tracked_fleet_df:pd.DataFrame, date:datetime, cycle:int=None)-> None:
+        """
+        Écrit une sauvegarde sur le disque et l'ajoute à l'historique
+        """
+        with self._metrics.stage('save', cycle):
+            # on récupère la liste des fichiers de données AIS dans le dossier data_ship
+            list_files = self.get_list_of_saves()
+            # si la longueur de la liste est supérieure ou égale à MAX_NUMBER_OF_FILES, on devra supprimer le plus vieux fichier
+            if len(list_files) >= DataBase.MAX_NUMBER_OF_FILES:
+                # on récupère le plus vieux fichier
+                oldest_file = min(list_files)
+                print("     → Le serveur ne peut pas stocker plus de {0} fichiers de données AIS.\      → Le fichier le plus ancien sera supprimé : {1}".format(
+                    DataBase.MAX_NUMBER_OF_FILES, 'SAVE__'+oldest_file.strftime(DataBase.FORMAT_DATE_CSV_FILE)))
+                # on supprime le fichier le plus ancien (dans tous les formats)
+                for format_path in (DataBase.format_path_snapshot, DataBase.format_path_saving_data):
+                    path = format_path.format(oldest_file.strftime(DataBase.FORMAT_DATE_CSV_FILE))
+                    if os.path.isfile(path):
+                        os.remove(path)
+
+            if DataBase.SNAPSHOT_BINARY:
+                # on sauvegarde le dataframe en colonnes binaires (rechargement rapide et typé)
+                os.makedirs(DataBase.path_snapshots, exist_ok=True)
+                save_snapshot(tracked_fleet_df, DataBase.format_path_snapshot.format(date.strftime(DataBase.FORMAT_DATE_CSV_FILE)))
+
+            # on test si on a accès au dossier data_ship
+            if os.path.isdir(DataBase.path_saving_data):
+                if DataBase.EXPORT_CSV or not(DataBase.SNAPSHOT_BINARY):
+                    # on sauvegarde le dataframe dans un fichier csv 
+                    tracked_fleet_df.to_csv(DataBase.format_path_saving_data.format(date.strftime(DataBase.FORMAT_DATE_CSV_FILE)), index=False)
+
+            else :
+                print("Le dossier data_ship n'existe pas ou n'est pas accessible")
+
+            # on ajoute les nouvelles positions à l'historique
+            nb_positions = self._history.append(tracked_fleet_df, date)
+            print(f"     → {nb_positions} nouvelles positions ajoutées à l'historique")
 
-        else :
-            print("Le dossier data_ship n'existe pas ou n'est pas accessible")
-                   
     def filter_mmsi(self):
         """
         Ne récupère que les données des bateaux du YCC possédant un MMSI
@@ -203,7 +382,9 @@ class DataBase():
         Met à jour les données de la flotte du YCC à partir de la base de données de contrôle des navires
         """
         print(" --> Request update from Google Sheet")
-        self.__df = pd.read_csv(DataBase.url_fleet)
+        response = self._http.get(DataBase.url_fleet)
+        response.raise_for_status()
+        self.__df = pd.read_csv(io.BytesIO(response.content))
         self.__df[DataBase.TO_INT_COLUMNS] = self.__df[DataBase.TO_INT_COLUMNS].astype('Int64')
         self.filter_mmsi()
 
@@ -255,54 +436,101 @@ class DataBase():
         skipped = {}
         for column in fixable_columns:
             skipped[column] = 0
-        
-        for column in fixable_columns+always_updated_columns:
-            self._tracked_fleet_df[Conversion[f"{column}"]] = [np.nan for i in range(self._tracked_fleet_df.shape[0])]
-        if complete_update:
-            wanted_columns = always_updated_columns+fixable_columns
-        
-        for index, row in tqdm(self._tracked_fleet_df.iterrows(), total=self._tracked_fleet_df.shape[0], desc='Recherche des données AIS pour les bateaux de la flotte...',leave=False):
-            # on attend un temps aléatoire entre minTIME_SLEEP et maxTIME_SLEEP (float)
-            time.sleep(random.uniform(DataBase.minTIME_SLEEP, DataBase.maxTIME_SLEEP))
-            try:
-                # on récupère les données AIS du bateau
-                if not(complete_update):
-                    #print("not complete update")
-                    wanted_columns = always_updated_columns
-                    for index,column in enumerate(fixable_columns):
-                            if not(pd.isna(self._last_update_db.loc[self._last_update_db['MMSI'] == row['MMSI']][Conversion[f"{column}"]].values[0])):
-                                wanted_columns.append(column)
-                            else : 
-                                skipped[column] += 1
-
-                #print(wanted_columns)
-                ais = AIS(verbose=False,
-                        return_df=False,
-                        return_total_count=False,
-                        seconds_wait=DataBase.seconds_wait,
-                        num_retries = DataBase.num_retries,
-                    )
-                response = ais.get_location(row['MMSI'])
-                print(response[0])
-                
-
-                for index, column in enumerate(wanted_columns):
-                    #print(response[0][response_conversion[column]])
-                    self._tracked_fleet_df.loc[self._last_update_db['MMSI'] == row['MMSI'],Conversion[f"{column}"]] = response[0][response_conversion[column]]
-                    #print(f"→ {row['Nom du bateau']} ({row['MMSI']}) : {column} → {response[0][response_conversion[f'{column}']]}")
-                for index,column in enumerate([column for column in fixable_columns if column not in wanted_columns]):
-                    self._tracked_fleet_df.iloc[self._last_update_db['MMSI'] == row['MMSI'], Conversion[f"{column}"]] = self._last_update_db.loc[self._last_update_db['MMSI'] == row['MMSI'], Conversion[f"{column}"]]
-                    #print(f"→ {row['Nom du bateau']} ({row['MMSI']}) : {column} → {self._last_update_db.loc[self._last_update_db['MMSI'] == row['MMSI'], Conversion[f'{column}']]}")
-                
-            except Exception as e:
-                # on print l'erreur et son explication0
-                print("→ {0} ({1}) : 'UNFOUND → {2}'".format(
-                    row['Nom du bateau'], row['MMSI'], e))
-                # on récupère l'index à supprimer
-                index_to_drop = self._tracked_fleet_df[self._tracked_fleet_df['MMSI'] == row['MMSI']].index
-                # on supprime la ligne
-                self._tracked_fleet_df.drop(index_to_drop, inplace=True)
 
+        # on regroupe les MMSI par lots pour ne faire qu'une requête par lot
+        names = self._tracked_fleet_df.set_index('MMSI')['Nom du bateau']
+        fleet_mmsi = [int(mmsi) for mmsi in self._tracked_fleet_df['MMSI']]
+        now = time.time()
+        if complete_update or not DataBase.ADAPTIVE_POLLING:
+            mmsi_list = fleet_mmsi
+        else:
+            # mise à jour partielle : on n'interroge que les bateaux dont la prochaine interrogation est due,
+            # les autres gardent les valeurs de la dernière mise à jour
+            mmsi_list = self._polling.due(fleet_mmsi, now)
+        batches = [mmsi_list[i:i+DataBase.AIS_BATCH_SIZE] for i in range(0, len(mmsi_list), DataBase.AIS_BATCH_SIZE)]
+
+        # on lance les requêtes en parallèle, le limiteur de débit remplace le sleep entre chaque requête
+        responses = {} # dictionnaire MMSI -> réponse de l'API
+        fallback = [] # MMSI à redemander un par un
+        unreached = set() # MMSI non demandés (API en panne ou budget de temps épuisé) : ce n'est pas un échec du bateau
+        with ThreadPoolExecutor(max_workers=self._nb_workers) as executor:
+            futures = {executor.submit(self._fetch_ais_batch, batch): batch for batch in batches}
+            # on récupère les réponses dans le thread principal au fur et à mesure qu'elles arrivent
+            for future in tqdm(as_completed(futures), total=len(futures), desc='Recherche des données AIS pour les bateaux de la flotte...',leave=False):
+                batch = futures[future]
+                try:
+                    found = future.result()
+                except Exception as e:
+                    print("→ Lot de {0} MMSI en échec → {1} : requêtes individuelles".format(len(batch), e))
+                    found = {}
+                # on redistribue les réponses du lot à chaque bateau
+                for mmsi in batch:
+                    if mmsi in found:
+                        responses[mmsi] = found[mmsi]
+                    else:
+                        fallback.append(mmsi)
+
+            # les bateaux absents des réponses par lot sont redemandés individuellement
+            futures = {executor.submit(self._fetch_ais, mmsi): mmsi for mmsi in fallback}
+            for future in tqdm(as_completed(futures), total=len(futures), desc='Recherche individuelle des bateaux restants...',leave=False):
+                mmsi = futures[future]
+                try:
+                    responses[mmsi] = DataBase.first_ais_record(future.result())
+                except RequestSkipped:
+                    unreached.add(mmsi)
+                except Exception as e:
+                    # on print l'erreur et son explication
+                    print("→ {0} ({1}) : 'UNFOUND → {2}'".format(
+                        names[mmsi], mmsi, e))
+        print(f"    → {len(batches)} requêtes par lot, {len(fallback)} requêtes individuelles")
+        if unreached:
+            print(f"    → {len(unreached)} bateaux non interrogés (API en panne ou budget de temps épuisé) : ils seront interrogés à la prochaine mise à jour")
+        if len(mmsi_list) < len(fleet_mmsi):
+            saved = -(-len(fleet_mmsi)//DataBase.AIS_BATCH_SIZE) - len(batches)
+            print(f"    → {len(mmsi_list)}/{len(fleet_mmsi)} bateaux interrogés : {saved} requête(s) économisée(s), les bateaux immobiles gardent leur dernière position")
+
+        # on planifie la prochaine interrogation de chaque bateau interrogé
+        for mmsi in mmsi_list:
+            if mmsi in responses:
+                response = responses[mmsi]
+                self._polling.update(mmsi, response.get('SPEED'), response.get('LAT'), response.get('LON'), response.get('LAST_POS'), now)
+            elif mmsi in unreached:
+                self._polling.forget(mmsi)
+            else:
+                self._polling.failed(mmsi, now)
+
+        # on supprime les bateaux introuvables, ceux qui n'ont pas été interrogés sont conservés s'ils étaient
+        # dans la dernière mise à jour (un bateau introuvable en attente de sa prochaine interrogation reste absent)
+        polled = set(mmsi_list) - unreached
+        known = set() if complete_update else set(int(mmsi) for mmsi in self._last_update_db['MMSI'].dropna())
+        not_polled = [mmsi for mmsi in fleet_mmsi if mmsi not in polled and mmsi in known]
+        self._tracked_fleet_df = self._tracked_fleet_df[self._tracked_fleet_df['MMSI'].isin(list(responses.keys()) + not_polled)].copy()
+        self._ais_carried = len(not_polled)
+        self._ais_unfound = len(polled) - len(responses)
+        # on indexe les réponses par MMSI pour les joindre au dataframe en une seule passe
+        response_df = pd.DataFrame.from_dict(responses, orient='index').reindex(columns=list(response_conversion.values()))
+        mmsi = self._tracked_fleet_df['MMSI']
+        if not complete_update:
+            # on indexe la dernière sauvegarde par MMSI une seule fois pour tout le cycle
+            previous = self._last_update_db.drop_duplicates(subset=['MMSI']).set_index('MMSI')
+            is_polled = mmsi.isin(list(polled))
+
+        for column in always_updated_columns:
+            values = mmsi.map(response_df[response_conversion[column]])
+            if not complete_update:
+                # les bateaux non interrogés reprennent les valeurs de la dernière mise à jour
+                values = values.where(is_polled, mmsi.map(previous[Conversion[f"{column}"]]))
+            self._tracked_fleet_df[Conversion[f"{column}"]] = values
+
+        if complete_update:
+            for column in fixable_columns:
+                self._tracked_fleet_df[Conversion[f"{column}"]] = mmsi.map(response_df[response_conversion[column]])
+        else:
+            for column in fixable_columns:
+                # on reprend la valeur de la dernière sauvegarde si elle est connue, sinon on prend celle de l'API
+                previous_values = mmsi.map(previous[Conversion[f"{column}"]])
+                skipped[column] = int(previous_values.notna().sum())
+                self._tracked_fleet_df[Conversion[f"{column}"]] = previous_values.where(previous_values.notna(), mmsi.map(response_df[response_conversion[column]]))
         
         self._tracked_fleet_df['LONG'] = self._tracked_fleet_df['LONG'].astype(
             'float64')
@@ -324,69 +552,128 @@ class DataBase():
             for column in fixable_columns:
                 print(f"    → {skipped[column]} bateaux n'ont pas été mis à jour pour la colonne {Conversion[f'{column}']}")
 
+    def _fetch_ais_batch(self, mmsi_list:list[int]) -> dict:
+        """
+        Récupère en une seule requête les données AIS d'un lot de bateaux. Cette fonction est
+        appelée depuis les threads du pool de request_update_API et ne doit donc pas modifier le dataframe.
+
+        :return: dictionnaire MMSI -> réponse de l'API (les MMSI introuvables sont absents)
+        """
+        # on attend qu'un jeton soit disponible pour ne pas surcharger les serveurs
+        self._rate_limiter.acquire()
+        referer_url = DataBase.API_TEMPLATE.format(",".join(str(mmsi) for mmsi in mmsi_list), ",".join(DataBase.API_COLUMNS))
+        # la page /data/ sert de referer, les données sont servies par /reports/
+        request_url = referer_url.replace("/data/", "/reports/")
+        response = self._http.get(request_url, headers=dict(DataBase.API_HEADERS, Referer=referer_url))
+        response.raise_for_status()
+        return {int(record['MMSI']): record for record in response.json()['data'] if int(record['MMSI']) in mmsi_list}
+
+    @staticmethod
+    def first_ais_record(result) -> dict:
+        """
+        Retourne la réponse d'une requête individuelle à l'API (liste de réponses). Tout autre résultat
+        (liste vide, message d'erreur...) signifie que le bateau est introuvable.
+        """
+        if not isinstance(result, list) or len(result) == 0 or not isinstance(result[0], dict):
+            raise ValueError("Réponse inattendue de l'API : {0!r}".format(result)[:200])
+        return result[0]
+
+    def _fetch_ais(self, mmsi):
+        """
+        Récupère les données AIS d'un bateau (liste vide s'il est introuvable). Cette fonction est appelée
+        depuis les threads du pool de request_update_API et ne doit donc pas modifier le dataframe.
+        La requête est un lot d'un seul MMSI : elle passe par la SessionPool (connexions keep-alive partagées,
+        délai maximum, nouvelles tentatives, disjoncteur et budget du cycle).
+        """
+        found = self._fetch_ais_batch([mmsi])
+        return [found[mmsi]] if mmsi in found else []
+
     def check_page_MMR(self,complete_check=False):
         """
         Fonction qui pour chaque bateau de la flotte vérifie si une page sur le site du
         Musée Maritime de La Rochelle existe. Si oui, on ajoute l'URL de la page dans la
-        colonne 'PAGE_LINK' du DataFrame.
+        colonne 'PAGE_LINK' du DataFrame. Les résultats (positifs et négatifs) sont gardés
+        dans un cache persistant : seules les entrées expirées provoquent une requête.
         """
         # Pour chaque bateau, on check si il y a une page sur le site du musée maritime de La Rochelle
-        PAGE_LINK = []
         NEW_TIME_SLEEP_MAX = DataBase.newTIME_SLEEP_MAX  # ce serveur est plus tolérant
         assert NEW_TIME_SLEEP_MAX < DataBase.maxTIME_SLEEP, f"NEW_TIME_SLEEP_MAX ({NEW_TIME_SLEEP_MAX}) doit être inférieur à DataBase.maxTIME_SLEEP ({DataBase.maxTIME_SLEEP})"
 
         print(" --> Checking 'https://museemaritime.larochelle.fr/' for pages")
+        mmsi = self._tracked_fleet_df['MMSI']
 
         if complete_check : # on check pour tous les bateaux de la flotte
-            for index, row in tqdm(self._tracked_fleet_df.iterrows(), total=self._tracked_fleet_df.shape[0], desc='Search for "MMR" pages...', leave=False):
-                # on attend un temps aléatoire entre minTIME_SLEEP et maxTIME_SLEEP (float)
-                time.sleep(random.uniform(
-                    DataBase.minTIME_SLEEP, NEW_TIME_SLEEP_MAX))
-                try:
-                    # on met en minuscule et on remplace les espaces par des tirets
-                    nom = row['Nom du bateau'].lower().replace(" ", "-")
-                    str = DataBase.PAGE_URL_TEMPLATE.format(nom)
-                    response = requests.get(str)
-                    if response.status_code == 200:
-                        PAGE_LINK.append(response.url)
-                    else:
-                        PAGE_LINK.append(np.nan)
+            known = pd.Series(False, index=self._tracked_fleet_df.index)
+            previous_links = pd.Series(dtype=object)
+        else : # on reprend les pages déjà trouvées lors de la dernière sauvegarde
+            # on indexe la dernière sauvegarde par MMSI une seule fois pour tout le cycle
+            previous_links = self._last_update_db.drop_duplicates(subset=['MMSI']).set_index('MMSI')['PAGE_LINK'].dropna()
+            known = mmsi.isin(previous_links.index)
+
+        new_links = {} # dictionnaire MMSI -> lien de la page pour les bateaux à vérifier
+        self._mmr_network_count = 0
+        for index, row in tqdm(self._tracked_fleet_df[~known].iterrows(), total=int((~known).sum()), desc='Search for "MMR" pages...', leave=False):
+            try:
+                new_links[row['MMSI']] = self._lookup_page_MMR(row['Nom du bateau'])
+            except Exception as e:
+                print("→ {0} ({1}) : 'ERREUR → {2}'".format(
+                    row['Nom du bateau'], row['MMSI'], e))
+                new_links[row['MMSI']] = np.nan
+        self._mmr_cache.save()
 
-                except Exception as e:
-                    print("→ {0} ({1}) : 'ERREUR → {2}'".format(
-                        row['Nom du bateau'], row['MMSI'], e))
-                    PAGE_LINK.append(np.nan)
-        
-        else : # seulement pour les bateaux qui n'ont pas encore de page MMR
-            skip_count = 0
-            for index, row in tqdm(self._tracked_fleet_df.iterrows(), total=self._tracked_fleet_df.shape[0], desc='Search for "MMR" pages...', leave=False):
-                # on check si le bateau n'a pas déjà une page MMR en passant par son MMSI 
-                page = self._last_update_db.loc[self._last_update_db['MMSI'] == row['MMSI']]['PAGE_LINK']
-                if page.empty:
-                        # on attend un temps aléatoire entre minTIME_SLEEP et maxTIME_SLEEP (float)
-                    time.sleep(random.uniform(
-                        DataBase.minTIME_SLEEP, NEW_TIME_SLEEP_MAX))
-                    try:
-                        # on met en minuscule et on remplace les espaces par des tirets
-                        nom = row['Nom du bateau'].lower().replace(" ", "-")
-                        str = DataBase.PAGE_URL_TEMPLATE.format(nom)
-                        response = requests.get(str)
-                        if response.status_code == 200:
-                            PAGE_LINK.append(response.url)
-                        else:
-                            PAGE_LINK.append(np.nan)
-
-                    except Exception as e:
-                        print("→ {0} ({1}) : 'ERREUR → {2}'".format(
-                            row['Nom du bateau'], row['MMSI'], e))
-                        PAGE_LINK.append(np.nan)
-                else :
-                    skip_count += 1
-                    PAGE_LINK.append(page.values[0])
-            print(f"        AVERTISSEMENT : {skip_count} bateaux ont une page sur le site du Musée Maritime de La Rochelle. Ces dernières ne seront pas mises à jour.")
+        if not(complete_check):
+            print(f"        AVERTISSEMENT : {int(known.sum())} bateaux ont une page sur le site du Musée Maritime de La Rochelle. Ces dernières ne seront pas mises à jour.")
+        print(f"    → {self._mmr_network_count} requêtes vers le musée maritime, {len(new_links)-self._mmr_network_count} réponses tirées du cache")
+        self._mmr_cache_hits = int(known.sum()) + len(new_links) - self._mmr_network_count
 
+        self._tracked_fleet_df['PAGE_LINK'] = mmsi.map(previous_links).where(known, mmsi.map(new_links))
 
-        self._tracked_fleet_df['PAGE_LINK'] = PAGE_LINK
+    @staticmethod
+    def normalize_boat_name(name:str) -> str:
+        """
+        Normalise le nom d'un bateau tel qu'il apparaît dans l'URL de sa page sur le site du musée maritime
+        """
+        # on met en minuscule et on remplace les espaces par des tirets
+        return name.strip().lower().replace(" ", "-")
+
+    def _lookup_page_MMR(self, name:str):
+        """
+        Retourne le lien de la page du bateau sur le site du musée maritime (np.nan si absente)
+        en passant par le cache, puis par une requête (conditionnelle si possible) si l'entrée a expiré
+        """
+        key = DataBase.normalize_boat_name(name)
+        entry = self._mmr_cache.get(key)
+        if self._mmr_cache.is_fresh(entry):
+            return entry['value'] if entry['ok'] else np.nan
+
+        # on attend un temps aléatoire entre minTIME_SLEEP et newTIME_SLEEP_MAX (float)
+        time.sleep(random.uniform(
+            DataBase.minTIME_SLEEP, DataBase.newTIME_SLEEP_MAX))
+        self._mmr_network_count += 1
+        response = self._http.get(DataBase.PAGE_URL_TEMPLATE.format(key), headers=DiskCache.conditional_headers(entry))
+        if response.status_code == 304: # la page n'a pas changé depuis la dernière vérification
+            self._mmr_cache.touch(key)
+            return entry['value']
+        if response.status_code == 200:
+            self._mmr_cache.set(key, response.url, ok=True,
+                                etag=response.headers.get('ETag'),
+                                last_modified=response.headers.get('Last-Modified'))
+            return response.url
+        if response.status_code in (404, 410): # la page n'existe pas : on s'en souvient aussi
+            self._mmr_cache.set(key, None, ok=False)
+        return np.nan
+
+    def get_cycle(self) -> int:
+        """
+        Getter de l'attribut _cycle (numéro de la dernière mise à jour).
+        """
+        return self._cycle
+
+    def get_metrics(self) -> MetricsRecorder:
+        """
+        Getter de l'attribut _metrics.
+        """
+        return self._metrics
 
     def get_tracked_fleet_df(self):
         """
@@ -394,11 +681,18 @@ class DataBase():
         """
         return self._tracked_fleet_df
 
+    def is_updated(self)-> bool:
+        """
+        Getter de l'attribut _db_updated.
+        """
+        return self._db_updated
+
     def request_image_links(self):
         """
         Fonction qui met à jour les liens des images des bateaux.
         """
         IMAGES_URL = []
+        self._image_cache_hits = 0 # liens tirés du cache (entrée valide ou revalidée par une réponse 304)
 
         print(" --> Downlad images")
         for index, row in tqdm(self._tracked_fleet_df.iterrows(), total=self._tracked_fleet_df.shape[0], desc="Récupération des images des bateaux...", leave=False):
@@ -409,32 +703,77 @@ class DataBase():
                 print(
                     "→ Erreur lors de la récupération de l'image du bateau → {0}".format(e))
                 IMAGES_URL.append(DataBase.DEFAULT_BOAT_IMG_URL)
+        self._image_cache.save()
 
         self._tracked_fleet_df['IMAGE_URL'] = IMAGES_URL
 
     def get_image_from_page_link(self, url, ship_id):
         """
-        Fonction qui récupère l'image d'un bateau à partir de son lien sur le site du musée maritime de La Rochelle par scrapping
+        Fonction qui récupère l'image d'un bateau à partir de son lien sur le site du musée maritime de La Rochelle par scrapping.
+        Le résultat (y compris l'image par défaut en cas d'échec) est gardé en cache et revalidé par une requête conditionnelle.
         """
+        key = "{0}|{1}".format(url, ship_id)
+        entry = self._image_cache.get(key)
+        if self._image_cache.is_fresh(entry):
+            self._image_cache_hits += 1
+            return entry['value'] if entry['ok'] else DataBase.DEFAULT_BOAT_IMG_URL
+
         if pd.isna(url):
             try:
-                response = requests.get(self.TEMPLATE_IMG_URL_MT.format(ship_id))
-                if response.status_code == 200:
+                # on ne télécharge pas l'image, on vérifie seulement qu'elle existe
+                response = self._http.get(self.TEMPLATE_IMG_URL_MT.format(ship_id), headers=DiskCache.conditional_headers(entry), stream=True)
+                response.close()
+                if response.status_code == 304:
+                    self._image_cache.touch(key)
+                    self._image_cache_hits += 1
+                    return entry['value']
+                elif response.status_code == 200:
+                    self._image_cache.set(key, response.url, ok=True,
+                                          etag=response.headers.get('ETag'),
+                                          last_modified=response.headers.get('Last-Modified'))
                     return response.url
+                elif response.status_code in SessionPool.RETRY_STATUS: # serveur indisponible : on ne s'en souvient pas
+                    raise Exception(f'Marine Traffic : {response.status_code}')
                 else :
+                    self._image_cache.set(key, None, ok=False)
                     raise Exception(f'Marine Traffic : {response.status_code}')
 
             except Exception as e:  # si on n'a pas d'image sur Marine Traffic ni sur le site du musée maritime de La Rochelle
                 return DataBase.DEFAULT_BOAT_IMG_URL
         try:
-            response = requests.get(url)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            image_url = soup.find(
-                "figure", {"class": "image"}).find("img")['src']
+            response = self._http.get(url, headers=DiskCache.conditional_headers(entry), stream=True)
+            if response.status_code == 304: # la page n'a pas changé : inutile de la parser à nouveau
+                response.close()
+                self._image_cache.touch(key)
+                self._image_cache_hits += 1
+                return entry['value']
+            if response.status_code in (404, 410): # la page n'existe plus : on s'en souvient (TTL_IMAGE_MISSING)
+                response.close()
+                self._image_cache.set(key, None, ok=False)
+                return DataBase.DEFAULT_BOAT_IMG_URL
+            response.raise_for_status()
+            # on lit la page au fil de l'eau et on arrête le téléchargement dès que l'image est trouvée
+            image_url, bytes_read, content = extract_figure_image(response.iter_content(DataBase.SCRAPING_CHUNK_SIZE),
+                                                                  response.encoding or 'utf-8')
+            response.close()
+        except Exception as e:
+            print(
+                "  → Erreur lors de la récupération de l'image du bateau → {0}".format(e))
+            return DataBase.DEFAULT_BOAT_IMG_URL
+        try:
+            if image_url is None: # on se rabat sur BeautifulSoup si le parseur rapide n'a rien trouvé
+                soup = BeautifulSoup(content, 'html.parser')
+                image_url = soup.find(
+                    "figure", {"class": "image"}).find("img")['src']
+            self._image_cache.set(key, image_url, ok=True,
+                                  etag=response.headers.get('ETag'),
+                                  last_modified=response.headers.get('Last-Modified'))
             return image_url
         except Exception as e:
             print(
                 "  → Erreur lors de la récupération de l'image du bateau → {0}".format(e))
+            # la page ne contient pas d'image : on s'en souvient pour ne pas la re-parser à chaque mise à jour
+            self._image_cache.set(key, None, ok=False)
             return DataBase.DEFAULT_BOAT_IMG_URL
 
 
@@ -0,0 +1,97 @@
+# IMPORT
+import json
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+from datetime import datetime
+
+
+class HistoryStore():
+    """
+    Historique des positions de la flotte stocké dans une base SQLite.
+    Les attributs statiques de chaque bateau (nom, skipper, drapeau, liens...) ne sont écrits
+    qu'une seule fois (et réécrits seulement s'ils changent), alors que seules les colonnes qui
+    varient (TRACK_COLUMNS) sont ajoutées à chaque mise à jour.
+    """
+
+    TRACK_COLUMNS = ['LAST_POSITION', 'LAT', 'LONG', 'SPEED', 'CAP'] # colonnes qui varient d'une mise à jour à l'autre
+
+    def __init__(self, path:str, retention_days:float) -> None:
+        self._path = path # chemin de la base SQLite
+        self._retention = retention_days*24*3600 # durée de conservation des positions (en secondes)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS boats (
+                                            MMSI INTEGER PRIMARY KEY,
+                                            attributes TEXT NOT NULL,
+                                            updated_at REAL NOT NULL)""")
+            # une position n'est ajoutée qu'une fois par point AIS : un bateau au mouillage ne crée pas de doublon
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS positions (
+                                            MMSI INTEGER NOT NULL,
+                                            LAST_POSITION INTEGER NOT NULL,
+                                            LAT REAL,
+                                            LONG REAL,
+                                            SPEED REAL,
+                                            CAP REAL,
+                                            recorded_at REAL NOT NULL,
+                                            PRIMARY KEY (MMSI, LAST_POSITION)) WITHOUT ROWID""")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS positions_recorded_at ON positions (recorded_at)")
+
+    def append(self, df:pd.DataFrame, date:datetime) -> int:
+        """
+        Ajoute l'état de la flotte à l'historique et supprime les positions trop anciennes
+
+        :return: nombre de nouvelles positions enregistrées
+        """
+        recorded_at = date.timestamp()
+        df = df[df['MMSI'].notna() & df['LAST_POSITION'].notna()]
+        static_columns = [column for column in df.columns if column not in HistoryStore.TRACK_COLUMNS]
+        # to_json gère proprement les NaN et les types pandas (Int64...)
+        attributes = [json.dumps(record, ensure_ascii=False, sort_keys=True) for record in json.loads(df[static_columns].to_json(orient='records'))]
+        boats = [(int(mmsi), attrs, recorded_at) for mmsi, attrs in zip(df['MMSI'], attributes)]
+        positions = [(int(row.MMSI), int(row.LAST_POSITION),
+                      None if pd.isna(row.LAT) else float(row.LAT),
+                      None if pd.isna(row.LONG) else float(row.LONG),
+                      None if pd.isna(row.SPEED) else float(row.SPEED),
+                      None if pd.isna(row.CAP) else float(row.CAP),
+                      recorded_at) for row in df[['MMSI']+HistoryStore.TRACK_COLUMNS].itertuples(index=False)]
+
+        with self._lock, self._connection:
+            self._connection.executemany("""INSERT INTO boats (MMSI, attributes, updated_at) VALUES (?, ?, ?)
+                                            ON CONFLICT(MMSI) DO UPDATE SET attributes=excluded.attributes, updated_at=excluded.updated_at
+                                            WHERE boats.attributes != excluded.attributes""", boats)
+            before = self._connection.total_changes
+            self._connection.executemany("""INSERT OR IGNORE INTO positions (MMSI, LAST_POSITION, LAT, LONG, SPEED, CAP, recorded_at)
+                                            VALUES (?, ?, ?, ?, ?, ?, ?)""", positions)
+            inserted = self._connection.total_changes - before
+            # on applique la durée de conservation
+            self._connection.execute("DELETE FROM positions WHERE recorded_at < ?", (time.time() - self._retention,))
+        return inserted
+
+    def get_track(self, mmsi:int, since:datetime=None) -> pd.DataFrame:
+        """
+        Retourne la trace d'un bateau (positions triées par date), éventuellement depuis une date donnée
+        """
+        query = "SELECT {0} FROM positions WHERE MMSI = ?".format(", ".join(HistoryStore.TRACK_COLUMNS))
+        parameters = [int(mmsi)]
+        if since is not None:
+            query += " AND LAST_POSITION >= ?"
+            parameters.append(int(since.timestamp()))
+        with self._lock:
+            return pd.read_sql_query(query + " ORDER BY LAST_POSITION", self._connection, params=parameters)
+
+    def get_boat(self, mmsi:int) -> dict:
+        """
+        Retourne les attributs statiques d'un bateau (None si inconnu)
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT attributes FROM boats WHERE MMSI = ?", (int(mmsi),)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
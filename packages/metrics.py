@@ -0,0 +1,143 @@
+# IMPORT
+import contextlib
+import json
+import os
+import threading
+import time
+
+
+class StageMetrics():
+    """
+    Mesures d'une exécution d'une étape du cycle de mise à jour (sheet, mmr, ais, images, save, render, publish)
+    """
+
+    COUNTERS = ('requests', 'bytes', 'cache_hits', 'failures')
+
+    def __init__(self, stage:str, cycle:int=None) -> None:
+        self.stage = stage
+        self.cycle = cycle
+        self.duration = 0.0 # en secondes
+        self.ok = True # False si l'étape s'est terminée par une exception
+        self.counts = dict.fromkeys(StageMetrics.COUNTERS, 0)
+        self.extra = {} # informations propres à l'étape (ajoutées telles quelles au journal)
+        self._lock = threading.Lock()
+
+    def add(self, **counts) -> None:
+        """
+        Ajoute des valeurs aux compteurs de l'étape (utilisable depuis plusieurs threads)
+        """
+        with self._lock:
+            for name, value in counts.items():
+                assert name in StageMetrics.COUNTERS, f"Compteur inconnu : {name}"
+                self.counts[name] += int(value)
+
+    def to_dict(self) -> dict:
+        return dict({'time': round(time.time(), 3), 'cycle': self.cycle, 'stage': self.stage,
+                     'duration': round(self.duration, 4), 'ok': self.ok}, **self.counts, **self.extra)
+
+
+class MetricsRecorder():
+    """
+    Instrumentation du cycle de mise à jour : chaque étape est mesurée (durée, requêtes, octets reçus,
+    réponses tirées du cache, échecs) puis exportée
+    - dans un journal JSON lines (une ligne par exécution d'étape), pour suivre l'évolution cycle par cycle
+    - dans un fichier texte au format Prometheus (dernière exécution et cumuls de chaque étape), à lire
+      par le collecteur textfile de node_exporter pour alerter en cas de régression
+
+    Un même enregistreur peut être partagé entre la mise à jour des données et la publication du site
+    (qui tournent dans des threads différents).
+    """
+
+    PREFIX = "fleety_stage" # préfixe des métriques Prometheus
+
+    def __init__(self, directory:str, log_file_name:str="metrics.jsonl", prometheus_file_name:str="metrics.prom", max_log_bytes:int=10*1024*1024) -> None:
+        """
+        :param directory: dossier où sont écrits les fichiers de métriques
+        :param max_log_bytes: taille au delà de laquelle le journal est archivé (.1) et recommencé
+        """
+        self._log_path = os.path.join(directory, log_file_name)
+        self._prometheus_path = os.path.join(directory, prometheus_file_name)
+        self._max_log_bytes = max_log_bytes
+        self._last = {} # étape -> mesures de la dernière exécution
+        self._totals = {} # étape -> cumuls depuis le démarrage
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @contextlib.contextmanager
+    def stage(self, name:str, cycle:int=None, http=None):
+        """
+        Mesure une étape : with metrics.stage('ais', cycle, http=pool) as stage: ... stage.add(cache_hits=n)
+        Les requêtes, octets et échecs de `http` (SessionPool, ou tout objet avec une méthode stats()) pendant
+        l'étape sont ajoutés automatiquement.
+        Une exception est comptée comme un échec puis propagée.
+        """
+        stage = StageMetrics(name, cycle)
+        before = http.stats() if http is not None else None
+        start = time.perf_counter()
+        try:
+            yield stage
+        except BaseException:
+            stage.ok = False
+            stage.add(failures=1)
+            raise
+        finally:
+            stage.duration = time.perf_counter() - start
+            if before is not None:
+                after = http.stats()
+                stage.add(**{counter: after[counter] - before[counter] for counter in ('requests', 'bytes', 'failures')})
+            self.record(stage)
+
+    def record(self, stage:StageMetrics) -> None:
+        """
+        Enregistre les mesures d'une étape et met à jour les fichiers exportés
+        """
+        line = stage.to_dict()
+        with self._lock:
+            self._last[stage.stage] = line
+            totals = self._totals.setdefault(stage.stage, dict.fromkeys(('runs', 'duration') + StageMetrics.COUNTERS, 0))
+            totals['runs'] += 1
+            totals['duration'] += stage.duration
+            for name in StageMetrics.COUNTERS:
+                totals[name] += stage.counts[name]
+            try:
+                self._append_log(line)
+                self._write_prometheus()
+            except OSError as e:
+                print("→ Métriques non écrites → {0}".format(e))
+
+    def _append_log(self, line:dict) -> None:
+        if os.path.isfile(self._log_path) and os.path.getsize(self._log_path) > self._max_log_bytes:
+            os.replace(self._log_path, self._log_path + '.1')
+        with open(self._log_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(line, ensure_ascii=False) + '\n')
+
+    def _write_prometheus(self) -> None:
+        metrics = [('last_duration_seconds', 'gauge', "Durée de la dernière exécution de l'étape", lambda stage: self._last[stage]['duration']),
+                   ('last_success', 'gauge', "1 si la dernière exécution de l'étape a réussi", lambda stage: int(self._last[stage]['ok'])),
+                   ('last_run_timestamp_seconds', 'gauge', "Date de la dernière exécution de l'étape", lambda stage: self._last[stage]['time']),
+                   ('runs_total', 'counter', "Nombre d'exécutions de l'étape", lambda stage: self._totals[stage]['runs']),
+                   ('duration_seconds_total', 'counter', "Durée cumulée de l'étape", lambda stage: round(self._totals[stage]['duration'], 4)),
+                   ('requests_total', 'counter', "Requêtes HTTP envoyées pendant l'étape", lambda stage: self._totals[stage]['requests']),
+                   ('bytes_total', 'counter', "Octets reçus pendant l'étape", lambda stage: self._totals[stage]['bytes']),
+                   ('cache_hits_total', 'counter', "Résultats tirés du cache pendant l'étape", lambda stage: self._totals[stage]['cache_hits']),
+                   ('failures_total', 'counter', "Échecs pendant l'étape", lambda stage: self._totals[stage]['failures']),
+                   ]
+        lines = []
+        for suffix, kind, description, value in metrics:
+            name = f"{MetricsRecorder.PREFIX}_{suffix}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines += [f'{name}{{stage="{stage}"}} {value(stage)}' for stage in sorted(self._last)]
+        # écriture atomique : le collecteur ne lit jamais un fichier à moitié écrit
+        with open(self._prometheus_path + '.tmp', 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        os.replace(self._prometheus_path + '.tmp', self._prometheus_path)
+
+    def summary(self, stages:list=None) -> str:
+        """
+        Résumé d'une ligne de la dernière exécution des étapes (toutes par défaut)
+        """
+        with self._lock:
+            stages = [stage for stage in (stages or sorted(self._last)) if stage in self._last]
+            return " | ".join("{0} {1:.2f} s{2}".format(stage, self._last[stage]['duration'],
+                                                        "" if self._last[stage]['ok'] else " (échec)") for stage in stages)
@@ -0,0 +1,139 @@
+# IMPORT
+import glob
+import gzip
+import hashlib
+import os
+import re
+
+try:
+    import brotli # optionnel : sans le module brotli, seules les versions gzip sont écrites
+except ImportError:
+    brotli = None
+
+
+# blocs dont le contenu n'est pas du HTML (ou dont les espaces comptent)
+RAW_BLOCKS = re.compile(r'(<(script|style|pre|textarea)\b[^>]*>)(.*?)(</\2\s*>)', re.S | re.I)
+HTML_COMMENTS = re.compile(r'<!--(?!\[if).*?-->', re.S)
+CSS_COMMENTS = re.compile(r'/\*.*?\*/', re.S)
+FOLIUM_ID = re.compile(r'_[0-9a-f]{32}') # identifiant aléatoire d'un élément folium (différent à chaque génération)
+
+
+def _strip_lines(text:str, drop=None) -> str:
+    """
+    Enlève l'indentation et les lignes vides (et les lignes pour lesquelles drop(ligne) est vrai)
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not (drop and drop(line)))
+
+
+def minify_css(css:str) -> str:
+    """
+    Minifie une feuille de style : commentaires, indentation et espaces autour de la ponctuation
+    (on ne touche pas aux espaces avant ':' qui ont un sens dans les sélecteurs)
+    """
+    css = CSS_COMMENTS.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def minify_js(js:str) -> str:
+    """
+    Minification prudente d'un script : indentation, lignes vides et lignes de commentaire
+    (le contenu des lignes n'est pas modifié pour ne jamais toucher aux chaînes de caractères)
+    """
+    return _strip_lines(js, drop=lambda line: line.startswith('//'))
+
+
+def collapse_whitespace(fragment:str) -> str:
+    """
+    Réduit chaque suite d'espaces d'un fragment HTML (sans <pre> ni <script>) à un seul espace
+    """
+    return ' '.join(fragment.split())
+
+
+def minify_html(html:str) -> str:
+    """
+    Minifie une page HTML : commentaires et indentation du HTML, puis des styles et scripts intégrés
+    """
+    parts = []
+    position = 0
+    for match in RAW_BLOCKS.finditer(html):
+        parts.append(_strip_lines(HTML_COMMENTS.sub('', html[position:match.start()])))
+        opening, tag, content, closing = match.group(1), match.group(2).lower(), match.group(3), match.group(4)
+        if tag == 'style':
+            content = minify_css(content)
+        elif tag == 'script':
+            content = minify_js(content)
+        parts.append(opening + content + closing)
+        position = match.end()
+    parts.append(_strip_lines(HTML_COMMENTS.sub('', html[position:])))
+    return '\n'.join(part for part in parts if part)
+
+
+def extract_styles(html:str, directory:str, url_prefix:str, min_size:int=512) -> tuple:
+    """
+    Déplace les blocs <style> de la page dans des feuilles de style externes nommées selon l'empreinte
+    de leur contenu (le navigateur les garde en cache tant qu'elles ne changent pas).
+    Les petits blocs et ceux qui dépendent des identifiants aléatoires de folium restent dans la page.
+    Les anciennes feuilles de style générées sont supprimées.
+
+    :param directory: dossier où écrire les feuilles de style
+    :param url_prefix: chemin de ce dossier relativement à la page
+    :return: (la page avec des <link> à la place des blocs extraits, chemins des feuilles de style utilisées)
+    """
+    os.makedirs(directory, exist_ok=True)
+    written = set()
+
+    def extract(match):
+        tag, content = match.group(2).lower(), match.group(3)
+        # les <style> contenus dans un script (chaînes JS) ne sont pas touchés
+        if tag != 'style' or len(content) < min_size or FOLIUM_ID.search(content):
+            return match.group(0)
+        name = "style-{0}.css".format(hashlib.sha256(content.encode('utf-8')).hexdigest()[:12])
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(content)
+        written.add(name)
+        return '<link rel="stylesheet" href="{0}/{1}"/>'.format(url_prefix.rstrip('/'), name)
+
+    html = RAW_BLOCKS.sub(extract, html)
+    for path in glob.glob(os.path.join(directory, 'style-' + '[0-9a-f]'*12 + '.css*')):
+        if os.path.basename(path).split('.css')[0] + '.css' not in written:
+            os.remove(path)
+    return html, [os.path.join(directory, name) for name in sorted(written)]
+
+
+def precompress(path:str) -> dict:
+    """
+    Écrit à côté du fichier ses versions compressées (.gz, et .br si le module brotli est installé)
+
+    :return: tailles en octets {'raw': ..., 'gzip': ..., 'brotli': ... ou None}
+    """
+    with open(path, 'rb') as file:
+        content = file.read()
+    sizes = {'raw': len(content), 'gzip': None, 'brotli': None}
+    compressed = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)} # mtime=0 : même fichier pour le même contenu
+    if brotli is not None:
+        compressed['.br'] = brotli.compress(content, quality=11)
+    for extension, data in compressed.items():
+        with open(path+extension+'.tmp', 'wb') as file:
+            file.write(data)
+        os.replace(path+extension+'.tmp', path+extension)
+        sizes['gzip' if extension == '.gz' else 'brotli'] = len(data)
+    return sizes
+
+
+def print_size_report(rows:list) -> None:
+    """
+    Affiche la taille de chaque fichier généré avant et après minification/compression
+
+    :param rows: liste de (nom du fichier, taille d'origine, taille minifiée, tailles de precompress())
+    """
+    def size(value):
+        return "{0:9.1f} ko".format(value/1024) if value is not None else "        --"
+    print("{0:<30} {1:>12} {2:>12} {3:>12} {4:>12}".format("Fichier", "origine", "minifié", "gzip", "brotli"))
+    for name, original, minified, compressed in rows:
+        print("{0:<30} {1:>12} {2:>12} {3:>12} {4:>12}".format(name, size(original), size(minified), size(compressed['gzip']), size(compressed['brotli'])))
@@ -0,0 +1,309 @@
+# IMPORT
+import random
+import threading
+import time
+import urllib.parse
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class TokenBucket():
+    """
+    Limiteur de débit partagé entre les threads (algorithme du seau à jetons).
+    Chaque requête consomme un jeton, les jetons se rechargent à raison de `rate` par seconde
+    dans la limite de `capacity` jetons.
+    """
+
+    def __init__(self, rate:float, capacity:int=1) -> None:
+        assert rate > 0, f"Le débit ({rate}) doit être strictement positif"
+        assert capacity >= 1, f"La capacité ({capacity}) doit être supérieure ou égale à 1"
+        self._rate = rate # nombre de jetons rechargés par seconde
+        self._capacity = capacity # nombre maximum de jetons dans le seau
+        self._tokens = capacity # le seau est plein au départ
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._last_refill)*self._rate)
+        self._last_refill = now
+
+    def acquire(self) -> None:
+        """
+        Bloque jusqu'à ce qu'un jeton soit disponible puis le consomme
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                # temps nécessaire pour qu'un jeton se recharge
+                wait = (1 - self._tokens)/self._rate
+            time.sleep(wait)
+
+
+class RequestSkipped(requests.RequestException):
+    """
+    La requête n'a pas été envoyée (hôte en panne ou budget de temps épuisé).
+    Ce n'est pas une réponse du serveur : le résultat ne doit pas être mis en cache comme un échec.
+    """
+
+
+class CircuitOpenError(RequestSkipped):
+    """
+    L'hôte a échoué trop de fois de suite : les requêtes échouent immédiatement jusqu'à la prochaine tentative
+    """
+
+
+class DeadlineExceeded(RequestSkipped):
+    """
+    Le budget de temps du cycle de mise à jour est épuisé
+    """
+
+
+class Deadline():
+    """
+    Budget de temps partagé par toutes les requêtes d'un cycle de mise à jour
+    """
+
+    def __init__(self, seconds:float) -> None:
+        self._end = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """
+        Temps restant (en secondes, 0 si le budget est épuisé)
+        """
+        return max(0.0, self._end - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0
+
+    def check(self) -> None:
+        """
+        Lève DeadlineExceeded si le budget est épuisé
+        """
+        if self.expired():
+            raise DeadlineExceeded("Budget de temps du cycle épuisé")
+
+
+class CircuitBreaker():
+    """
+    Disjoncteur d'un hôte : après `failure_threshold` échecs consécutifs, le circuit s'ouvre et les
+    requêtes échouent immédiatement pendant `reset_timeout` secondes. Passé ce délai, une seule requête
+    d'essai est autorisée : si elle réussit le circuit se referme, sinon il se rouvre.
+    """
+
+    def __init__(self, failure_threshold:int, reset_timeout:float) -> None:
+        assert failure_threshold >= 1, f"Le seuil d'échecs ({failure_threshold}) doit être supérieur ou égal à 1"
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0 # nombre d'échecs consécutifs
+        self._opened_at = None # date d'ouverture du circuit (None : circuit fermé)
+        self._trial = False # une requête d'essai est en cours
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Indique si une requête peut partir (et réserve la requête d'essai si le délai d'ouverture est écoulé)
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self._reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def release(self) -> None:
+        """
+        Termine la requête d'essai sans verdict (erreur qui ne vient pas de l'hôte) : une autre requête pourra la refaire
+        """
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self._failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+
+class SessionPool():
+    """
+    Pool de connexions HTTP keep-alive : une requests.Session par hôte, partagée par tous les threads.
+    Les connexions TCP/TLS sont ainsi réutilisées d'une requête (et d'une mise à jour) à l'autre.
+
+    Chaque requête a un délai maximum et est relancée avec un backoff exponentiel aléatoire en cas d'erreur
+    réseau ou de réponse 429/5xx. Chaque hôte a son disjoncteur : un hôte en panne fait échouer immédiatement
+    les requêtes suivantes. start_cycle() fixe un budget de temps commun à toutes les requêtes d'un cycle.
+    """
+
+    RETRY_STATUS = (429, 500, 502, 503, 504) # réponses pour lesquelles on relance la requête
+
+    def __init__(self, pool_maxsize:int=10, headers:dict=None, timeout:float=15, retries:int=2, backoff:float=0.5, max_backoff:float=8,
+                 failure_threshold:int=5, reset_timeout:float=60) -> None:
+        """
+        :param timeout: délai maximum d'une requête (connexion et lecture, en secondes)
+        :param retries: nombre de nouvelles tentatives après un échec
+        :param backoff: délai de base (en secondes) avant une nouvelle tentative, doublé à chaque échec
+        :param max_backoff: délai maximum avant une nouvelle tentative (en secondes)
+        :param failure_threshold: nombre d'échecs consécutifs qui ouvrent le disjoncteur d'un hôte
+        :param reset_timeout: durée (en secondes) pendant laquelle un hôte en panne n'est plus interrogé
+        """
+        self._pool_maxsize = pool_maxsize # nombre de connexions gardées ouvertes par hôte
+        self._headers = headers or {} # en-têtes ajoutés à toutes les requêtes
+        self._timeout = timeout
+        self._retries = retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._sessions = {} # dictionnaire hôte -> session
+        self._breakers = {} # dictionnaire hôte -> disjoncteur
+        self._deadline = None # budget de temps du cycle en cours (None : pas de limite)
+        self._stats = {'requests': 0, 'bytes': 0, 'failures': 0} # compteurs depuis la création (voir stats())
+        self._lock = threading.Lock()
+
+    def start_cycle(self, seconds:float=None) -> None:
+        """
+        Fixe le budget de temps partagé par toutes les requêtes jusqu'au prochain appel (None : pas de limite)
+        """
+        self._deadline = Deadline(seconds) if seconds is not None else None
+
+    def breaker(self, url:str) -> CircuitBreaker:
+        """
+        Retourne le disjoncteur associé à l'hôte de l'URL (le crée si besoin)
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self._failure_threshold, self._reset_timeout)
+            return self._breakers[host]
+
+    def session(self, url:str) -> requests.Session:
+        """
+        Retourne la session associée à l'hôte de l'URL (la crée si besoin)
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_maxsize)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(self._headers)
+                self._sessions[host] = session
+            return self._sessions[host]
+
+    def stats(self) -> dict:
+        """
+        Compteurs depuis la création : requêtes envoyées, octets reçus (pour les réponses lues au fil de l'eau,
+        seulement ceux réellement lus) et échecs (erreurs réseau, réponses 429/5xx, requêtes non envoyées)
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, **counts) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                self._stats[name] += value
+
+    def _count_consumed(self, response:requests.Response) -> None:
+        # réponse lue au fil de l'eau : on compte les morceaux au fur et à mesure qu'ils sont lus
+        # (une lecture interrompue ne compte pas toute la taille annoncée par Content-Length)
+        iter_content = response.iter_content
+        def counted_iter_content(*args, **kwargs):
+            for chunk in iter_content(*args, **kwargs):
+                self._count(bytes=len(chunk))
+                yield chunk
+        response.iter_content = counted_iter_content # utilisé aussi par response.content et response.text
+
+    def _check(self, url:str) -> CircuitBreaker:
+        """
+        Vérifie que la requête peut partir (budget de temps, disjoncteur de l'hôte)
+        """
+        if self._deadline is not None and self._deadline.expired():
+            self._count(failures=1)
+            raise DeadlineExceeded("Budget de temps du cycle épuisé")
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            self._count(failures=1)
+            raise CircuitOpenError("Hôte en panne, requête non envoyée : {0}".format(urllib.parse.urlsplit(url).netloc))
+        return breaker
+
+    def _timeout_for(self, timeout:float) -> float:
+        # le délai d'une requête ne dépasse jamais le budget restant du cycle
+        if self._deadline is not None:
+            return min(timeout, max(self._deadline.remaining(), 0.1))
+        return timeout
+
+    def _sleep_backoff(self, attempt:int) -> None:
+        # backoff exponentiel avec gigue complète : les threads ne relancent pas tous en même temps
+        delay = random.uniform(0, min(self._max_backoff, self._backoff*2**attempt))
+        if self._deadline is not None:
+            delay = min(delay, self._deadline.remaining())
+        time.sleep(delay)
+
+    def get(self, url:str, **kwargs) -> requests.Response:
+        """
+        Équivalent de requests.get mais en passant par la session de l'hôte, avec délai maximum,
+        nouvelles tentatives et disjoncteur. Après la dernière tentative, une réponse 429/5xx est
+        retournée telle quelle (à l'appelant de la traiter) et une erreur réseau est relevée.
+        """
+        timeout = kwargs.pop('timeout', self._timeout)
+        attempt = 0
+        while True:
+            breaker = self._check(url)
+            self._count(requests=1)
+            try:
+                response = self.session(url).get(url, timeout=self._timeout_for(timeout), **kwargs)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                breaker.record_failure()
+                self._count(failures=1)
+                if attempt >= self._retries:
+                    raise
+            except requests.RequestException:
+                # erreur qu'une nouvelle tentative ne corrigera pas (trop de redirections, réponse invalide...)
+                breaker.record_failure()
+                self._count(failures=1)
+                raise
+            except BaseException:
+                # erreur sans rapport avec l'hôte : la requête d'essai éventuelle ne doit pas bloquer le disjoncteur
+                breaker.release()
+                raise
+            else:
+                if kwargs.get('stream'):
+                    self._count_consumed(response)
+                else:
+                    self._count(bytes=len(response.content))
+                if response.status_code not in SessionPool.RETRY_STATUS:
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+                self._count(failures=1)
+                if attempt >= self._retries:
+                    return response
+                response.close()
+            self._sleep_backoff(attempt)
+            attempt += 1
+
+    def close(self) -> None:
+        """
+        Ferme toutes les connexions ouvertes
+        """
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
@@ -0,0 +1,89 @@
+# IMPORT
+import math
+import threading
+import time
+
+
+class PollingPlanner():
+    """
+    Planning des requêtes AIS bateau par bateau : chaque MMSI a sa propre date de prochaine interrogation.
+    - un bateau en route (vitesse, déplacement depuis la dernière interrogation, position AIS récente)
+      est interrogé à chaque mise à jour
+    - un bateau au mouillage, ou dont le transpondeur n'émet plus, est interrogé de moins en moins
+      souvent (délai doublé à chaque réponse identique, entre min_backoff et max_backoff)
+    - un bateau inconnu (jamais interrogé) est toujours à interroger
+    """
+
+    def __init__(self, moving_speed:float, moving_distance:float, dark_fix_age:float, min_backoff:float, max_backoff:float) -> None:
+        """
+        :param moving_speed: vitesse (en noeuds) à partir de laquelle un bateau est considéré en route
+        :param moving_distance: déplacement (en degrés) depuis la dernière interrogation à partir duquel un bateau est en route
+        :param dark_fix_age: âge (en secondes) de la dernière position AIS au delà duquel le transpondeur est considéré éteint
+        :param min_backoff: premier délai (en secondes) avant de réinterroger un bateau immobile
+        :param max_backoff: délai maximum (en secondes) entre deux interrogations d'un même bateau
+        """
+        self._moving_speed = moving_speed
+        self._moving_distance = moving_distance
+        self._dark_fix_age = dark_fix_age
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._states = {} # MMSI -> {'next_poll', 'backoff', 'lat', 'lon'}
+        self._lock = threading.Lock()
+
+    def due(self, mmsi_list:list, now:float=None) -> list:
+        """
+        Retourne les MMSI à interroger maintenant (dans l'ordre de la liste)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return [mmsi for mmsi in mmsi_list if mmsi not in self._states or self._states[mmsi]['next_poll'] <= now]
+
+    @staticmethod
+    def _to_float(value) -> float:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return math.nan
+        return value
+
+    def update(self, mmsi:int, speed, lat, lon, last_position, now:float=None) -> float:
+        """
+        Enregistre la réponse de l'API pour un bateau et planifie sa prochaine interrogation
+
+        :return: délai (en secondes) avant la prochaine interrogation (0 : à la prochaine mise à jour)
+        """
+        now = time.time() if now is None else now
+        speed, lat, lon, last_position = (self._to_float(value) for value in (speed, lat, lon, last_position))
+        with self._lock:
+            state = self._states.get(mmsi)
+            fix_is_recent = not math.isnan(last_position) and now - last_position < self._dark_fix_age
+            has_moved = state is not None and not any(math.isnan(value) for value in (lat, lon, state['lat'], state['lon'])) \
+                        and max(abs(lat - state['lat']), abs(lon - state['lon'])) >= self._moving_distance
+            is_moving = fix_is_recent and ((not math.isnan(speed) and speed >= self._moving_speed) or has_moved)
+            if is_moving:
+                backoff = 0
+            else:
+                previous = state['backoff'] if state is not None else 0
+                backoff = min(self._max_backoff, max(self._min_backoff, previous*2))
+            self._states[mmsi] = {'next_poll': now + backoff, 'backoff': backoff, 'lat': lat, 'lon': lon}
+            return backoff
+
+    def failed(self, mmsi:int, now:float=None) -> float:
+        """
+        Le bateau n'a pas été trouvé : on le réinterroge de moins en moins souvent
+
+        :return: délai (en secondes) avant la prochaine interrogation
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._states.get(mmsi, {'backoff': 0, 'lat': math.nan, 'lon': math.nan})
+            backoff = min(self._max_backoff, max(self._min_backoff, state['backoff']*2))
+            self._states[mmsi] = {'next_poll': now + backoff, 'backoff': backoff, 'lat': state['lat'], 'lon': state['lon']}
+            return backoff
+
+    def forget(self, mmsi:int) -> None:
+        """
+        Le bateau sera interrogé à la prochaine mise à jour
+        """
+        with self._lock:
+            self._states.pop(mmsi, None)
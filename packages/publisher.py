@@ -0,0 +1,154 @@
+# IMPORT
+import hashlib
+import os
+import shutil
+import subprocess
+
+
+class SitePublisher():
+    """
+    Publie le dossier du site généré (source) dans un dépôt git local (destination) puis le pousse :
+    - seuls les fichiers modifiés sont copiés (comparaison de la taille puis de l'empreinte sha256),
+      les fichiers qui n'existent plus dans la source sont supprimés
+    - git est appelé directement (sans shell), identiquement sous Windows et Linux
+    - si rien n'a changé, il n'y a ni commit ni push
+    """
+
+    # résultats de publish()
+    PUBLISHED = 'published' # des changements ont été poussés
+    UNCHANGED = 'unchanged' # le dépôt distant était déjà à jour
+    FAILED = 'failed' # le commit ou le push a échoué : à retenter au prochain cycle
+
+    def __init__(self, source:str, destination:str, remote_name:str, git_url:str, branch:str, user_name:str=None, email:str=None, exclude:tuple=('.git',)) -> None:
+        self._source = source # dossier du site généré
+        self._destination = destination # dépôt git du site
+        self._remote_name = remote_name
+        self._git_url = git_url
+        self._branch = branch
+        self._user_name = user_name # auteur des commits (configuration du dépôt du site)
+        self._email = email
+        self._exclude = set(exclude) # noms de fichiers/dossiers jamais copiés ni supprimés
+        self._hashes = {} # chemin -> (taille, date de modification, sha256) : on ne relit un fichier que s'il a changé
+
+    def git(self, *args, verbose:bool=True) -> subprocess.CompletedProcess:
+        """
+        Lance une commande git dans le dépôt du site et affiche sa sortie
+        """
+        if verbose:
+            print(">>> git " + " ".join(args))
+        result = subprocess.run(['git', *args], cwd=self._destination, capture_output=True, text=True)
+        if verbose and (result.stdout.strip() or result.stderr.strip()):
+            print((result.stdout + result.stderr).rstrip())
+        return result
+
+    def configure_remote(self) -> None:
+        """
+        (Re)définit le remote du dépôt du site
+        """
+        self._init_repository()
+        self.git('remote', 'remove', self._remote_name)
+        self.git('remote', 'add', self._remote_name, self._git_url)
+        self.git('remote', '-v')
+
+    def _init_repository(self) -> None:
+        os.makedirs(self._destination, exist_ok=True)
+        if not os.path.isdir(os.path.join(self._destination, '.git')):
+            self.git('init')
+            self.git('checkout', '-B', self._branch)
+            if self._user_name is not None:
+                self.git('config', 'user.name', self._user_name)
+            if self._email is not None:
+                self.git('config', 'user.email', self._email)
+
+    def _files(self, directory:str) -> set:
+        """
+        Chemins relatifs de tous les fichiers du dossier (hors fichiers exclus et temporaires)
+        """
+        files = set()
+        for root, directories, names in os.walk(directory):
+            directories[:] = [name for name in directories if name not in self._exclude]
+            for name in names:
+                if name in self._exclude or name.endswith('.tmp'):
+                    continue
+                files.add(os.path.relpath(os.path.join(root, name), directory))
+        return files
+
+    def _hash(self, path:str) -> str:
+        stat = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        sha = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                sha.update(chunk)
+        self._hashes[path] = (stat.st_size, stat.st_mtime_ns, sha.hexdigest())
+        return sha.hexdigest()
+
+    def _is_same(self, source:str, destination:str) -> bool:
+        if not os.path.isfile(destination):
+            return False
+        if os.path.getsize(source) != os.path.getsize(destination):
+            return False
+        return self._hash(source) == self._hash(destination)
+
+    def sync(self) -> tuple:
+        """
+        Met le dossier du dépôt à l'identique du dossier source en ne copiant que ce qui a changé
+
+        :return: (nombre de fichiers copiés, nombre de fichiers supprimés)
+        """
+        source_files = self._files(self._source)
+        destination_files = self._files(self._destination)
+        copied = 0
+        for relative_path in sorted(source_files):
+            source = os.path.join(self._source, relative_path)
+            destination = os.path.join(self._destination, relative_path)
+            if self._is_same(source, destination):
+                continue
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy2(source, destination)
+            copied += 1
+        deleted = 0
+        for relative_path in sorted(destination_files - source_files):
+            path = os.path.join(self._destination, relative_path)
+            os.remove(path)
+            self._hashes.pop(path, None)
+            deleted += 1
+            # on supprime les dossiers devenus vides
+            directory = os.path.dirname(path)
+            while directory != self._destination and os.path.isdir(directory) and not os.listdir(directory):
+                os.rmdir(directory)
+                directory = os.path.dirname(directory)
+        return copied, deleted
+
+    def publish(self, message:str) -> str:
+        """
+        Récupère le dépôt distant, synchronise les fichiers, puis commit et push s'il y a des changements
+
+        :return: PUBLISHED si des changements ont été poussés, UNCHANGED si le site était déjà à jour, FAILED en cas d'échec
+        """
+        self._init_repository()
+        if self.git('symbolic-ref', '--short', 'HEAD', verbose=False).stdout.strip() != self._branch:
+            self.git('checkout', self._branch)
+        self.git('pull', '--ff-only', self._remote_name, self._branch)
+        copied, deleted = self.sync()
+        print(f"→ {copied} fichier(s) copié(s), {deleted} fichier(s) supprimé(s)")
+        self.git('add', '--all')
+        if not self.git('status', '--porcelain', verbose=False).stdout.strip():
+            # un commit d'une publication précédente n'a peut-être pas pu être poussé
+            ahead = self.git('rev-list', '--count', f"{self._remote_name}/{self._branch}..HEAD", verbose=False)
+            if ahead.returncode != 0: # la branche distante n'a jamais été poussée : tous les commits locaux sont en attente
+                ahead = self.git('rev-list', '--count', 'HEAD', verbose=False)
+            if ahead.returncode == 0 and int(ahead.stdout.strip() or 0) > 0:
+                return self._push()
+            print("→ Aucun changement à publier")
+            return SitePublisher.UNCHANGED
+        if self.git('commit', '-m', message).returncode != 0:
+            return SitePublisher.FAILED
+        return self._push()
+
+    def _push(self) -> str:
+        if self.git('push', self._remote_name, self._branch).returncode != 0:
+            return SitePublisher.FAILED
+        return SitePublisher.PUBLISHED
@@ -0,0 +1,117 @@
+# IMPORT
+import math
+import threading
+import time
+from datetime import datetime
+
+
+class PipelineScheduler():
+    """
+    Planificateur à cadence fixe en deux étages :
+    - l'étage `fetch` (mise à jour des données) est lancé dans le thread principal à chaque tick,
+      les ticks sont calés sur t0 + k*période (la durée d'un cycle ne décale pas les suivants)
+    - l'étage `publish` (génération et publication du site) tourne dans un thread à part, pendant que
+      le fetch du cycle suivant avance
+
+    Contre-pression : entre les deux étages il n'y a qu'une place. Si la publication est encore en cours
+    quand un nouveau résultat arrive, le résultat en attente est remplacé par le plus récent (on ne publie
+    jamais de données périmées et les cycles ne s'accumulent pas). Si un fetch dure plus d'une période,
+    les ticks manqués sont sautés au lieu d'être rattrapés.
+    """
+
+    def __init__(self, period:float, fetch, publish) -> None:
+        """
+        :param period: période des ticks (en secondes)
+        :param fetch: fonction fetch(numéro du cycle) -> résultat transmis à publish
+        :param publish: fonction publish(résultat)
+        """
+        assert period > 0, f"La période ({period}) doit être strictement positive"
+        self._period = period
+        self._fetch = fetch
+        self._publish = publish
+        self._condition = threading.Condition()
+        self._pending = None # résultat en attente de publication (une seule place)
+        self._has_pending = False
+        self._publishing = False
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._publish_loop, name="publish", daemon=True)
+        self.cycles = 0 # nombre de fetch effectués
+        self.skipped_ticks = 0 # ticks sautés car le fetch précédent a débordé
+        self.dropped_results = 0 # résultats remplacés avant d'avoir été publiés
+
+    def run_forever(self) -> None:
+        """
+        Lance les cycles jusqu'à l'appel de stop() (ou Ctrl+C)
+        """
+        self._worker.start()
+        next_tick = time.monotonic()
+        try:
+            while not self._stopped.is_set():
+                # attente du prochain tick (interrompue immédiatement par stop())
+                if self._stopped.wait(max(0, next_tick - time.monotonic())):
+                    break
+                try:
+                    result = self._fetch(self.cycles)
+                    self._submit(result)
+                except Exception as e:
+                    print("→ Échec de la mise à jour du cycle {0} : {1!r}".format(self.cycles, e))
+                self.cycles += 1
+
+                next_tick += self._period
+                late = time.monotonic() - next_tick
+                if late > 0:
+                    # le fetch a débordé : on saute les ticks manqués pour rester calé sur la grille
+                    missed = math.ceil(late/self._period)
+                    next_tick += missed*self._period
+                    self.skipped_ticks += missed
+                    print(f"→ Mise à jour plus longue que la période : {missed} tick(s) sauté(s)")
+                print("Prochaine mise à jour : {0}".format(datetime.fromtimestamp(time.time() + next_tick - time.monotonic()).strftime("%H:%M:%S")))
+        except KeyboardInterrupt:
+            print("\nArrêt demandé")
+        finally:
+            self.stop()
+            self._worker.join() # on laisse la publication en cours se terminer
+
+    def _submit(self, result) -> None:
+        with self._condition:
+            if self._has_pending:
+                self.dropped_results += 1
+                print("→ Publication précédente encore en cours : le résultat en attente est remplacé par le plus récent")
+            self._pending = result
+            self._has_pending = True
+            self._condition.notify()
+
+    def _publish_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._has_pending and not self._stopped.is_set():
+                    self._condition.wait()
+                if not self._has_pending:
+                    return # arrêt demandé et plus rien à publier
+                result, self._pending, self._has_pending = self._pending, None, False
+                self._publishing = True
+            try:
+                self._publish(result)
+            except Exception as e:
+                print("→ Échec de la publication : {0!r}".format(e))
+            finally:
+                with self._condition:
+                    self._publishing = False
+                    self._condition.notify_all()
+
+    def wait_idle(self, timeout:float=None) -> bool:
+        """
+        Attend que le résultat en attente soit publié
+
+        :return: True si plus rien n'est en cours de publication
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._has_pending and not self._publishing, timeout)
+
+    def stop(self) -> None:
+        """
+        Arrête les ticks. La publication en cours (et celle en attente) se termine dans son thread.
+        """
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
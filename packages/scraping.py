@@ -0,0 +1,50 @@
+# IMPORT
+import codecs
+from html.parser import HTMLParser
+
+
+class FigureImageParser(HTMLParser):
+    """
+    Parseur HTML événementiel (type SAX) qui cherche le premier <img> contenu dans un
+    <figure class="image">, sans construire l'arbre complet de la page comme BeautifulSoup.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.image_url = None # lien de l'image trouvée (None tant qu'on ne l'a pas trouvée)
+        self._figure_depth = 0 # nombre de <figure> ouverts à l'intérieur d'un <figure class="image">
+
+    def handle_starttag(self, tag, attrs):
+        if self.image_url is not None:
+            return
+        if tag == 'figure':
+            classes = (dict(attrs).get('class') or '').split()
+            if self._figure_depth > 0 or 'image' in classes:
+                self._figure_depth += 1
+        elif tag == 'img' and self._figure_depth > 0:
+            self.image_url = dict(attrs).get('src')
+
+    def handle_endtag(self, tag):
+        if tag == 'figure' and self._figure_depth > 0:
+            self._figure_depth -= 1
+
+
+def extract_figure_image(chunks, encoding:str='utf-8'):
+    """
+    Lit les morceaux d'une page HTML au fil de l'eau et s'arrête dès que l'image est trouvée
+
+    :param chunks: itérable de morceaux (bytes) de la page, par exemple response.iter_content()
+    :param encoding: encodage de la page
+    :return: (lien de l'image ou None, nombre d'octets lus, octets lus)
+    """
+    parser = FigureImageParser()
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    content = []
+    bytes_read = 0
+    for chunk in chunks:
+        bytes_read += len(chunk)
+        content.append(chunk)
+        parser.feed(decoder.decode(chunk))
+        if parser.image_url is not None:
+            break
+    return parser.image_url, bytes_read, b''.join(content)
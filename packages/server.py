@@ -1,12 +1,22 @@
 import pandas as pd
-import numpy as np
-from aisexplorer.AIS import AIS
 import folium
+from folium.plugins import FastMarkerCluster
 from tqdm import tqdm
 # on récupère beautifulsoup4 pour parser le html
 from datetime import datetime
 import os
+import time
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from dateutil import tz
 from db import DataBase
+from snapshot import load_snapshot
+from assets import AssetStore
+from publisher import SitePublisher
+from metrics import MetricsRecorder
+from minify import minify_html, collapse_whitespace, extract_styles, precompress, print_size_report
+import templates
 
 class TrackerServer():
     """
@@ -15,8 +25,9 @@ class TrackerServer():
     et de les héberger sur un serveur.
     """
     LIEN_SITE = 'https://pierre-cau.github.io/FleetyTracker/'
-    LOCAL_PATH_TO_BACKUP = os.path.dirname(os.path.abspath(__file__)) + "\Tracker_fleet_YCC"
-    LOCAL_PATH_TO_SITE = os.path.dirname(os.path.abspath(__file__)) + "\..\FLeetyTracker"
+    ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # racine du projet
+    LOCAL_PATH_TO_BACKUP = os.path.join(ROOT_PATH, "Tracker_fleet_YCC") # site généré
+    LOCAL_PATH_TO_SITE = os.path.join(ROOT_PATH, "FLeetyTracker") # dépôt git du site publié
     LIEN_GITHUB = 'https://github.com/pierre-cau/YCC_fleet_tracker'
     
     URL_YCC = 'https://www.yachtclubclassique.com/'
@@ -52,6 +63,47 @@ class TrackerServer():
     MAX_WIDTH = 400 # largeur max de la popup
     MAX_HEIGHT = 400 # hauteur max de la popup
 
+    # colonnes de la sauvegarde utilisées pour générer la carte (les autres ne sont pas chargées)
+    RENDER_COLUMNS = ['Nom du bateau', 'MMSI', 'PAGE_LINK', 'COUNTRY_CODE', 'LAST_POSITION', 'LAT', 'LONG', 'SPEED', 'CAP', 'IMAGE_URL']
+
+    SHIP_ICON_URL = "images/ship.png" # icone des marqueurs (lien relatif à la page)
+
+    # PUBLICATION
+    # 'full' : la carte complète est régénérée à chaque mise à jour
+    # 'incremental' : la page (coquille statique) n'est régénérée que si les données fixes des bateaux changent,
+    #                 à chaque mise à jour on n'écrit que POSITIONS_FILE_NAME que la page relit régulièrement
+    PUBLISH_MODE = 'full'
+    POSITIONS_FILE_NAME = "positions.json" # fichier des positions (mode incrémental)
+    POSITIONS_POLL_SECONDS = 60 # période de relecture des positions par le navigateur (en secondes)
+    STATIC_COLUMNS = ['Nom du bateau', 'MMSI', 'PAGE_LINK', 'COUNTRY_CODE', 'IMAGE_URL'] # colonnes qui imposent de régénérer la page
+
+    # GRANDES FLOTTES
+    # au delà de CLUSTER_THRESHOLD bateaux, les marqueurs sont créés dans le navigateur et regroupés (FastMarkerCluster)
+    # et les popups ne sont plus intégrées à la page : elles sont lues dans POPUPS_FILE_NAME au premier clic
+    CLUSTER_THRESHOLD = 200
+    POPUPS_FILE_NAME = "popups.json" # fichier des popups (mode regroupé)
+
+    # IMAGES
+    # les drapeaux et photos sont téléchargés une seule fois, réduits à leur taille d'affichage et servis depuis le site
+    LOCAL_ASSETS = True
+    ASSETS_DIRECTORY = "images/cache" # dossier des images téléchargées (relatif au dossier du site)
+    ASSETS_INDEX_FILE = "CACHE/assets.json" # lien d'origine -> fichiers locaux
+    TTL_ASSET_FOUND = 30*24*3600 # durée avant de revalider une image téléchargée (en secondes)
+    TTL_ASSET_MISSING = 24*3600 # durée avant de réessayer une image introuvable (en secondes)
+
+    # GÉNÉRATION PARALLÈLE DES POPUPS
+    RENDER_WORKERS = 1 # nombre de processus qui génèrent les popups (1 : dans le processus principal)
+    RENDER_CHUNK_SIZE = 500 # nombre de popups par lot envoyé à un processus
+
+    # FICHIERS GÉNÉRÉS
+    MINIFY_OUTPUT = True # minifie la page et déplace les styles communs dans une feuille de style externe (mise en cache par le navigateur)
+    PRECOMPRESS_OUTPUT = True # écrit à côté de chaque fichier généré ses versions .gz (et .br si le module brotli est installé)
+    CSS_DIRECTORY = "css" # dossier des feuilles de style générées (relatif au dossier du site)
+
+    # budget de taille du fichier HTML généré (au delà, un avertissement est affiché)
+    MAX_HTML_BYTES_BASE = 40_000 # partie fixe (styles, scripts leaflet, fonds de carte, box d'informations)
+    MAX_HTML_BYTES_PER_BOAT = 3_500 # marqueur + popup + entrée de la liste
+
     # focus sur un bateau
     icon_size = (25, 25) # taille des icones
     icon_targeted_size = (35, 35) # taille des icones quand on clique dessus
@@ -76,22 +128,76 @@ class TrackerServer():
                             'SE':'Sweden',
                             }
 
-    def __init__(self, DataBase=None,html_file_name=DEFAULT_HTML_FILE_NAME):
+    def __init__(self, database=None,html_file_name=DEFAULT_HTML_FILE_NAME, publish_mode=PUBLISH_MODE, render_workers=RENDER_WORKERS, local_assets=LOCAL_ASSETS):
         """
         Constructeur de la classe TrackerServer.
+
+        :param database: objet DataBase dont on lit directement les données en mémoire (optionnel)
+        :param publish_mode: 'full' ou 'incremental' (voir PUBLISH_MODE)
+        :param render_workers: nombre de processus qui génèrent les popups (voir RENDER_WORKERS)
+        :param local_assets: servir les images depuis le site plutôt que depuis leurs sites d'origine (voir LOCAL_ASSETS)
         """
+        assert publish_mode in ('full', 'incremental'), f"Mode de publication inconnu : {publish_mode}"
+        self._database = database # base de données en mémoire
         self._html_file_name = html_file_name # nom du fichier HTML
+        self._publish_mode = publish_mode # mode de publication
+        self._render_workers = render_workers # nombre de processus de génération des popups
+        self._assets = AssetStore(os.path.join("Tracker_fleet_YCC", TrackerServer.ASSETS_DIRECTORY),
+                                  TrackerServer.ASSETS_DIRECTORY,
+                                  TrackerServer.ASSETS_INDEX_FILE,
+                                  TrackerServer.TTL_ASSET_FOUND,
+                                  TrackerServer.TTL_ASSET_MISSING) if local_assets else None # cache local des images
+        self._publisher = SitePublisher(TrackerServer.LOCAL_PATH_TO_BACKUP,
+                                        TrackerServer.LOCAL_PATH_TO_SITE,
+                                        TrackerServer.REMOTE_NAME,
+                                        TrackerServer.GIT_URL,
+                                        TrackerServer.BRANCH_NAME,
+                                        user_name=TrackerServer.USERNAME,
+                                        email=TrackerServer.EMAIL) # publication du site (dépôt git)
+        self._shell_signature = None # empreinte des données fixes de la dernière page générée (mode incrémental)
+        self._published_fingerprint = None # empreinte des données de la dernière carte publiée
+        self._skipped_cycles = 0 # nombre de mises à jour sautées car la flotte n'avait pas changé
+        # mesures de la génération et de la publication (dans les mêmes fichiers que celles de la base de données)
+        self._metrics = database.get_metrics() if database is not None else MetricsRecorder(DataBase.METRICS_DIRECTORY)
+        self._cycle = 0 # numéro de la mise à jour publiée (celui de la base de données quand il est fourni)
+
+    def load_from_database(self, database=None)-> bool:
+        """
+        Récupère directement en mémoire les données de la flotte de l'objet DataBase,
+        sans passer par la sauvegarde sur le disque.
+
+        :return: True si le chargement a réussi, False sinon
+        """
+        database = database if database is not None else self._database
+        assert database is not None, "Aucun objet DataBase n'a été fourni au TrackerServer"
+        print("              --- LOAD FROM DATABASE ---   ")
+        if not(database.is_updated()):
+            print("La base de données n'a pas encore été mise à jour → chargement de la dernière sauvegarde")
+            return self.load_last_save()
+        # copie figée des colonnes utiles : la base peut être mise à jour pendant la génération de la carte
+        self.set_tracked_fleet_df(database.get_tracked_fleet_df())
+        return True
+
+    def set_tracked_fleet_df(self, tracked_fleet_df:pd.DataFrame)-> None:
+        """
+        Définit les données de la flotte à afficher (seules les colonnes utiles à la carte sont gardées)
+        """
+        self._last_update = datetime.now()
+        self._tracked_fleet_df = tracked_fleet_df[[column for column in TrackerServer.RENDER_COLUMNS if column in tracked_fleet_df.columns]].copy()
+        print("\nNombre de bateaux présents dans la base de données : ", len(self._tracked_fleet_df))
 
     def load_data(self, date:datetime,print_result=False)-> None:
         """
-        Charge les données AIS à partir d'un fichier csv
+        Charge les données AIS à partir d'une sauvegarde (binaire si disponible, csv sinon).
+        Seules les colonnes utiles à la génération de la carte sont chargées.
         :param date: date de la sauvegarde des données AIS
         """
         self._last_update = date
         print("_________________________________________________________")
         print("► Date de sauvegarde choisie :", date.strftime(DataBase.format_print))
         print("► Chargement des données AIS...")
-        self._tracked_fleet_df = pd.read_csv(DataBase.format_path_saving_data.format(date.strftime(DataBase.FORMAT_DATE_CSV_FILE)))
+        path = DataBase.list_saves()[date]
+        self._tracked_fleet_df = load_snapshot(path, columns=TrackerServer.RENDER_COLUMNS)
         if print_result:
             print("                                 ----- DATAFRAME -----")
             print(self._tracked_fleet_df.tail(10)) # on affiche les 10 dernières lignes du dataframe
@@ -140,10 +246,8 @@ class TrackerServer():
         """
         Retourne la liste des dates des sauvegardes des données AIS
         """
-        list_files = os.listdir(DataBase.path_saving_data)
         # on récupère les dates associées à chaque fichier selon le format de date défini dans la classe
-        list_files = [datetime.strptime(file.split('SAVE__')[1].split('.csv')[0], DataBase.FORMAT_DATE_CSV_FILE) for file in list_files]
-        return list_files  
+        return list(DataBase.list_saves().keys())
 
     def generate_html(self) -> None:
         """
@@ -156,30 +260,38 @@ class TrackerServer():
         # on commence par ranger les bateaux par ordre alphabétique
         tracked_fleet_df = tracked_fleet_df.sort_values(by=['Nom du bateau'])
         tracked_fleet_df = tracked_fleet_df.reset_index(drop=True) # on reset l'index
-        
+        # toutes les colonnes affichées sont calculées d'un coup, les boucles ne font plus que de l'assemblage de texte
+        tracked_fleet_df = self._prepare_render_frame(tracked_fleet_df)
+
+        path = "Tracker_fleet_YCC/"+self._html_file_name
+        if self._publish_mode == 'incremental':
+            signature = self.get_static_signature(tracked_fleet_df)
+            if signature == self._shell_signature and os.path.exists(path):
+                # seules les positions ont changé : la page déjà générée les relira
+                print(" >> Page déjà à jour → écriture des positions uniquement")
+                self.write_positions(tracked_fleet_df)
+                print("--------------------------------------\n")
+                return
+
+        if self._assets is not None:
+            print(" >> Mise à jour des images locales")
+            tracked_fleet_df = self._localize_assets(tracked_fleet_df)
 
         ZOOM = TrackerServer.ZOOM # zoom de la carte par défaut
         MAX_ZOOM = TrackerServer.MAX_ZOOM # zoom max
         MIN_ZOOM = TrackerServer.MIN_ZOOM # zoom min
         ZOOM_LEVEL = TrackerServer.ZOOM_LEVEL # zoom level pour focus sur un bateau
-        NAME = TrackerServer.NAME # nom de la page
+        assert ZOOM_LEVEL > MIN_ZOOM and ZOOM_LEVEL < MAX_ZOOM, f"Le niveau de zoom doit être compris entre 0 et {MAX_ZOOM-1}"
 
         # Pop up des bateaux
         POP_UPS = {} # dictionnaire qui va contenir les popups des bateaux en fonction de leur MMSI
         WIDTH = TrackerServer.WIDTH # largeur de la popup
         HEIGHT = TrackerServer.HEIGHT # hauteur de la popup
-        POSITION_BOAT_SCHEME = TrackerServer.POSITION_BOAT_SCHEME # position du bateau sur le schéma
-        
-        TIME_TO_TURN = TrackerServer.TIME_TO_TURN # temps pour tourner le bateau afin de générer l'animation (en secondes)
-        MAX_WIDTH = TrackerServer.MAX_WIDTH # largeur max de la popup
         MAX_HEIGHT = TrackerServer.MAX_HEIGHT # hauteur max de la popup
 
         # focus sur un bateau
         icon_size = TrackerServer.icon_size # taille des icones
-        icon_targeted_size = TrackerServer.icon_targeted_size # taille des icones quand on clique dessus
-        offset = TrackerServer.offset # offset des icones (longitude, latitude)
 
-        TIME_TO_TURN = TrackerServer.TIME_TO_TURN # temps pour tourner le bateau afin de générer l'animation (en secondes)
         TILE_URL = TrackerServer.TILE_URL # url de layer pour le leaflet
         ATTRIBUTION = TrackerServer.ATTRIBUTION # attribution pour le leaflet
 
@@ -191,257 +303,39 @@ class TrackerServer():
         folium.TileLayer('cartodbdark_matter',name="Dark Matter").add_to(m, name='Dark Matter')
         folium.TileLayer(TILE_URL,attr=ATTRIBUTION,name="Carte Shom").add_to(m, name='Carte Shom')
 
+        # titre de la page, icone et styles communs à tous les bateaux (une seule fois pour toute la page)
+        m.get_root().header.add_child(folium.Element(templates.HEAD.render(name=TrackerServer.NAME)))
+        m.get_root().header.add_child(folium.Element(templates.SHARED_CSS.render(width=WIDTH,
+                                                                                 height=HEIGHT,
+                                                                                 time_to_turn=TrackerServer.TIME_TO_TURN)))
+
         
         print(" >> Création des marqueurs et popups")
         # MARQUEURS + POPUPS
-        for index, row in tqdm(tracked_fleet_df.iterrows(), total=tracked_fleet_df.shape[0], desc="Création des marqueurs et popups...", leave=False):
-            ANGLE_TO_TURN = row['CAP'] - POSITION_BOAT_SCHEME # angle à tourner pour avoir le bateau dans le bon sens
-            last_position = datetime.fromtimestamp(row['LAST_POSITION'])
-            if pd.isna(row['CAP']) :
-                row['CAP'] = 0 # on met 0 si on a pas de cap par défaut pour l'affichage
-
-            if row['PAGE_LINK'] is np.nan :
-                # on ajoute un marker sur la carte
-                HTML = f"""
-                <div style="width: {WIDTH}px;
-                    height: {HEIGHT}px;
-                    overflow-y: auto;
-                    overflow-x: hidden;
-                    padding: 5px;
-                    ">
-                <h3><b>{row['Nom du bateau']}</b> ({row['COUNTRY_CODE']})</h3>
-                <br>
-                <!-- on ajoute une image du bateau si on peut -->
-                <img src="{row['IMAGE_URL']}" alt="{row['Nom du bateau']}" 
-                    style="width:100%;
-                    max-width: 300px; 
-                    height: auto;
-                    border-radius: 5px;
-                    border: 1px solid #ddd;
-                    padding: 5px;
-                    margin-bottom: 10px;
-                    /* GREY */
-                    display: block;
-                    margin-left: auto;
-                    margin-right: auto;
-                        "/>
-
-                <p style="font-size: 14px;">
-                    <!-- on crée une box qui aura à gauche le cap et à droite le schéma du bateau -->
-                    <div style="width: 100%;
-                        border: 1px solid #ddd;
-                        border-radius: 5px;
-                        padding: 5px;
-                        margin-bottom: 10px;
-                        /* GREY */
-                        background-color: #f2f2f2;
-                        ">
-                    <div style="float: left;
-                        position: relative;
-                        max-width: {int(WIDTH/1.5)}px;
-                        height: 15px;
-                        display: block;
-                        margin-left: auto;
-                        margin-right: auto;
-                        padding: 5px;
-                        ">
-                    <b>Vitesse : </b> {row['SPEED']} noeuds<br>
-                    <b>Cap : </b> {row['CAP']}°<br>
-                    <b>Latitude : </b> {row['LAT']}°<br>
-                    <b>Longitude : </b> {row['LONG']}°<br>
-                    <b>Dernière position : </b> {last_position}<br>
-                    </div>
-                    <!-- on affiche le schéma du bateau au centre de la div, tournée de ANGLE_TO_TURN pour faire le cap -->
-                    <img class='tourne' src="images/boat.png" alt="boat" 
-                        style="width: 100%; 
-                        position: relative;
-                        max-width: {int(WIDTH/3.5)}px; 
-                        height: auto; 
-                        transform: rotate({ANGLE_TO_TURN}deg); 
-                        display: block; 
-                        margin-left: auto; 
-                        margin-right: 5%;
-                        "/>
-                    </div>
-                </p>
-
-                <button 
-                    onclick="window.open('https://www.marinetraffic.com/en/ais/details/ships/mmsi:{row['MMSI']}')"
-                    style="background-color: #4CAF50; /* Green */
-                    border: none;
-                    color: white;
-                    padding: 15px 32px;
-                    text-align: center;
-                    text-decoration: none;
-                    /* on centre le bouton */
-                    display: block;
-                    margin-left: auto;
-                    margin-right: auto;
-                    font-size: 16px;
-                    cursor: pointer;
-                    border-radius: 12px;
-                    box-shadow: 0 0 2px 1px rgba(0, 0, 0, 0.2);
-                ">
-                    Voir sur Marine Traffic</button>
-                </div> 
-                """
-                HTML +="""
-                    <style>
-                    @-moz-keyframes spin {
-                    100% { -moz-transform: rotate(-360deg); }
-                    }
-                    @-webkit-keyframes spin {
-                    100% { -webkit-transform: rotate(-360deg); }
-                    }
-                    @keyframes spin {
-                    100% { -webkit-transform: rotate(-360deg); transform: rotate(-360deg); }
-                    }
-                """
-                HTML += f"""
-                .tourne {{
-                -webkit-animation-name: spin;
-                -webkit-animation-duration: {TIME_TO_TURN}s;
-                -webkit-animation-iteration-count: 1;
-                -webkit-animation-timing-function: ease-out;
-                -moz-animation-name: spin;
-                -moz-animation-duration: {TIME_TO_TURN}s;
-                -moz-animation-iteration-count: 1;
-                -moz-animation-timing-function: ease-out;
-                animation-name: spin;
-                animation-duration: {TIME_TO_TURN}s;
-                animation-iteration-count: 1;
-                animation-timing-function: ease-out;
-                }}
-                </style>
-                """
-            
-            else : # on ajoute un petit bouton en bas sous forme de livre qui permet d'afficher les informations du bateau en redirigeant vers la page du musée maritime de La Rochelle
-                HTML = f"""
-                <div style="width: {WIDTH}px;
-                    height: {HEIGHT}px;
-                    overflow-y: auto;
-                    overflow-x: hidden;
-                    padding: 5px;
-                    ">
-                <h3><b>{row['Nom du bateau']}</b> ({row['COUNTRY_CODE']})</h3>
-                <br>
-                <img src="{row['IMAGE_URL']}" alt="{row['Nom du bateau']}" 
-                    style="width:100%;
-                    max-width: 300px; 
-                    height: auto;
-                    border-radius: 5px;
-                    border: 1px solid #ddd;
-                    padding: 5px;
-                    margin-bottom: 10px;
-                    display: block;
-                    margin-left: auto;
-                    margin-right: auto;
-                    "/>
-
-                <p style="font-size: 14px;">
-                    <!-- on crée une box qui aura à gauche le cap et à droite le schéma du bateau -->
-                    <div style="width: 100%;
-                        border: 1px solid #ddd;
-                        border-radius: 5px;
-                        padding: 5px;
-                        margin-bottom: 10px;
-                        /* GREY */
-                        background-color: #f2f2f2;
-                        ">
-                    <div style="float: left;
-                        position: relative;
-                        max-width: {int(WIDTH/1.5)}px;
-                        height: 15px;
-                        display: block;
-                        margin-left: auto;
-                        margin-right: auto;
-                        padding: 5px;
-                        ">
-                    <b>Vitesse : </b> {row['SPEED']} noeuds<br>
-                    <b>Cap : </b> {row['CAP']}°<br>
-                    <b>Latitude : </b> {row['LAT']}°<br>
-                    <b>Longitude : </b> {row['LONG']}°<br>
-                    <b>Dernière position : </b> {last_position}<br>
-                    </div>
-                    <!-- on affiche le schéma du bateau au centre de la div, tournée de ANGLE_TO_TURN pour faire le cap -->
-                    <img class='tourne' src="images/boat.png" alt="boat" 
-                        style="width: 100%; 
-                        position: relative;
-                        max-width: {int(WIDTH/3.5)}px; 
-                        height: auto; 
-                        transform: rotate({ANGLE_TO_TURN}deg); 
-                        display: block; 
-                        margin-left: auto; 
-                        margin-right: 5%;
-                        "/>
-                    </div>
-                </p>
-
-                <a href="{row['PAGE_LINK']}" target="_blank" title='En apprendre plus sur le site du musée maritime de La Rochelle'>
-                    <img src="images/idea.png" alt="Livre"
-                    style="
-                    width: 50px;
-                    height: auto;
-                    border-radius: 50%;
-                    border: 1px solid #ddd;
-                    padding: 5px;
-                    margin-bottom: 10px;
-                    box-shadow: 0 0 2px 1px rgba(0, 0, 0, 0.2);
-                    display: block;
-                    margin-left: auto;
-                    margin-right: auto;">
-                </a>
-
-        
-                <button 
-                    onclick="window.open('https://www.marinetraffic.com/en/ais/details/ships/mmsi:{row['MMSI']}')"
-                    style="background-color: #4CAF50; /* Green */
-                    border: none;
-                    color: white;
-                    padding: 15px 32px;
-                    text-align: center;
-                    text-decoration: none;
-                    /* on centre le bouton */
-                    display: block;
-                    margin-left: auto;
-                    margin-right: auto;
-                    font-size: 16px;
-                    cursor: pointer;
-                    border-radius: 12px;
-                    box-shadow: 0 0 2px 1px rgba(0, 0, 0, 0.2);
-                ">
-                    Voir sur Marine Traffic</button>
-                </div>
-                """    
-                HTML +="""
-                    <style>
-                    @-moz-keyframes spin {
-                    100% { -moz-transform: rotate(-360deg); }
-                    }
-                    @-webkit-keyframes spin {
-                    100% { -webkit-transform: rotate(-360deg); }
-                    }
-                    @keyframes spin {
-                    100% { -webkit-transform: rotate(-360deg); transform: rotate(-360deg); }
-                    }
-                """
-                HTML += f"""
-                .tourne {{
-                -webkit-animation-name: spin;
-                -webkit-animation-duration: {TIME_TO_TURN}s;
-                -webkit-animation-iteration-count: 1;
-                -webkit-animation-timing-function: ease-out;
-                -moz-animation-name: spin;
-                -moz-animation-duration: {TIME_TO_TURN}s;
-                -moz-animation-iteration-count: 1;
-                -moz-animation-timing-function: ease-out;
-                animation-name: spin;
-                animation-duration: {TIME_TO_TURN}s;
-                animation-iteration-count: 1;
-                animation-timing-function: ease-out;
-                }}
-                </style>
-                """
+        records = tracked_fleet_df.to_dict('records')
+        MARKERS = {} # nom de la variable leaflet du marqueur de chaque bateau, en fonction de son MMSI
+        clustered = len(records) > TrackerServer.CLUSTER_THRESHOLD # grande flotte : marqueurs regroupés et popups chargées au clic
+        if clustered:
+            print(f" >> Plus de {TrackerServer.CLUSTER_THRESHOLD} bateaux → marqueurs regroupés et popups chargées à la demande")
+        popups_html = self.render_popups(records)
+        if not clustered:
+            # icône commune à tous les marqueurs, déclarée une seule fois dans la page
+            # (folium intègre l'image en base64 : on la remplace par un lien relatif vers la même image)
+            ship_icon = folium.features.CustomIcon('Tracker_fleet_YCC/images/ship.png',
+                                                   icon_size=icon_size,
+                                                   popup_anchor=(0, -5),
+                                                   icon_anchor=(0, 0),
+                                                   shadow_image=None,
+                                                   )
+            ship_icon.options['icon_url'] = TrackerServer.SHIP_ICON_URL
+            ship_icon.add_to(m)
+            # les popups ne sont plus lues dans un fichier : on supprime celui d'une ancienne carte regroupée
+            self.remove_output(TrackerServer.POPUPS_FILE_NAME)
+        for row, HTML in tqdm(zip(records, popups_html), total=len(records), desc="Création des marqueurs et popups...", leave=False):
+            if clustered:
+                POP_UPS[int(row['MMSI'])] = HTML
+                MARKERS[row['MMSI']] = None # le marqueur est créé par le navigateur
+                continue
 
             popup = folium.Popup(lazy=True, html=HTML, width=WIDTH, max_height=MAX_HEIGHT)
             POP_UPS[row['MMSI']] = popup.get_name()
@@ -449,16 +343,26 @@ class TrackerServer():
             marker = folium.Marker(
                 location=[row['LAT'], row['LONG']],
                 popup=popup,
-                icon=folium.features.CustomIcon('Tracker_fleet_YCC/images/ship.png', 
-                                                icon_size=icon_size, 
-                                                popup_anchor=(0, -5), 
-                                                icon_anchor=(0, 0),
-                                                shadow_image=None,
-                                                ),
                 id='marker-{}'.format(row['MMSI']),
                 )
+            marker.add_child(folium.Marker.SetIcon(marker, ship_icon)) # le marqueur reprend l'icône commune
             marker.add_to(m)
-                
+            MARKERS[row['MMSI']] = marker.get_name()
+
+        if clustered:
+            self.write_json(TrackerServer.POPUPS_FILE_NAME, POP_UPS)
+            # une ligne par bateau [lat, lon, mmsi] : le marqueur et sa popup sont créés par le navigateur (CLUSTER_CALLBACK)
+            callback = templates.CLUSTER_CALLBACK.render(icon_url=TrackerServer.SHIP_ICON_URL,
+                                                         icon_size=icon_size,
+                                                         width=WIDTH,
+                                                         max_height=MAX_HEIGHT,
+                                                         popups_url=TrackerServer.POPUPS_FILE_NAME,
+                                                         )
+            FastMarkerCluster([[row['LAT'], row['LONG'], int(row['MMSI'])] for row in records],
+                              callback=callback,
+                              name='Bateaux',
+                              ).add_to(m)
+
         # on affiche la carte
         folium.LayerControl().add_to(m, name='Layer Control')
 
@@ -473,373 +377,288 @@ class TrackerServer():
         
         print(" >> Création de la box d'informations")
         # BOX D'INFORMATIONS
-        HTML = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-        <meta charset="utf-8">
-        <title>{TrackerServer.NAME}</title>
-        <link rel="icon" type="image/png" href="images\Logo_FleetyTrack\BG_blanc65\Logo_fleetytrack_BGW65_round.svg" width="100%">
-        </head>
-        <div id="box" style="width: min-content;
-            position: absolute;
-            /* on le met au dessus de la carte */
-            z-index: 999;
-            /* on le met en haut à droite */
-            top: 20%;
-            left: 20px;
-            /* on lui donne une bordure gris foncé */
-            border: 1px solid #ddd;
-            border-radius: 10px;
-            /* on lui donne une ombre grise comme une popup */
-            box-shadow: 0 0 2px 1px #ddd;
-            background-color: white;
-            padding: 5px;
-            ">
-            <img onclick="window.open('{TrackerServer.URL_YCC}')"
-                class=zoomable1 src="images\logo.png" alt="logo"
-                style="width: 50%; 
-                    height: auto; 
-                    display: block; 
-                    margin-left: auto; 
-                    margin-right: auto; 
-                    margin-top:5px;
-                    border-radius: 50%;"/>
-            <div id="track_container" style="overflow-y: scroll; height: 200px; width: max-content; margin-left: auto; margin-right: auto; margin-top:5px; margin-bottom:10px">
-        """
-
-        for index, row in tracked_fleet_df.iterrows(): # on parcourt tous les bateaux
-            assert ZOOM_LEVEL > MIN_ZOOM and ZOOM_LEVEL < MAX_ZOOM, f"Le niveau de zoom doit être compris entre 0 et {MAX_ZOOM-1}"
-            HTML += f"""
-            <!-- on ajoute le nom du bateau à la liste. Quand on click dessus on déclenche la fonction setView() définie plus bas -->
-                <a class="zoomable2 trackerbox-container-item" onclick="printTrack('{row['Nom du bateau']}','{index}'); setView({row['LAT']}, {row['LONG']}, {ZOOM_LEVEL},{index});">
-                    <!-- on met le nom du bateau à gauche et le drapeau à droite -->
-                    <p style="float: left;
-                        margin-top: 8px;
-                        margin-left: 5px;
-                        margin-right: auto;
-                        font-size: 15px;
-                        font-family: Georgia, serif;">{row['Nom du bateau']}</p>
-                    <img src="{dictionnary_country[row['COUNTRY_CODE']]}" alt="drapeau" 
-                    style="  width: auto;
-                            height: 25px;
-                            display: block;
-                            margin-left: auto;
-                            margin-right: 15px;
-                            float: right;
-                            border-radius: 20%;
-                            margin-top: 5px;
-                            margin-bottom: auto;
-                            ">
-                """
-            if not(pd.isna(row['PAGE_LINK'])): # si le bateau a une page web on ajoute un lien vers cette page : 
-                    HTML += f"""
-                    <img id="is_mmr_{index}" class="is_mrr" src="images/logo_mmr.png" alt="logo_mmr"/>
-                        """
-            HTML += f"""
-                </a>
-            
-                <script>
-                function printTrack(NAME, index) {{
-                    console.log('... Tracking sur ' + NAME +' ('+ index+ ') ...');
-                }}
-
-                function setView(lat, long, zoom,index) {{
-                    console.log('setView(' + lat + ', ' + long + ', ' + zoom + ')');
-                    // on descend un peu les coordonnées cible pour que la popup soit bien centrée sur la carte 
-                    lat = lat + {offset[1]} ;
-                    long = long + {offset[0]} ;
-                    {m.get_name()}.setView([lat, long], zoom);
-                    // On cherche tous les éléments avec la classe leaflet-marker-icon leaflet-zoom-animated leaflet-interactive
-                    // On les met dans une liste
-                    var list_markers = document.getElementsByClassName('leaflet-marker-icon leaflet-zoom-animated leaflet-interactive');
-                    // on récupère le marker qui a le même index que le bateau 
-                    var marker = list_markers[index];
-
-                    // si trageted_marker est défini, on le met à jour 
-                    if (typeof targeted_marker !== 'undefined') {{
-                    
-                        // on change la source de l'image de targeted_marker pour qu'il reprenne l'image ship.png 
-                        targeted_marker.src = 'images/ship.png';
-                        // on change la taille de l'image 
-                        targeted_marker.style.width = '{icon_size[0]}'+'px';
-                        targeted_marker.style.height = '{icon_size[1]}'+'px';
-                        // on redefini le targeted_marker 
-                        targeted_marker = marker;
-                        // on défini la source de l'image de targeted_marker pour qu'il prenne l'image logo.png
-                        targeted_marker.src = 'images/logo.png';
-                        // on change la taille de l'image
-                        targeted_marker.style.width = '{icon_targeted_size[0]}'+'px';
-                        targeted_marker.style.height = '{icon_targeted_size[1]}'+'px'; 
-
-                    }} else {{
-                    
-                        // si targeted_marker n'est pas défini, on le défini
-                        targeted_marker = marker;
-                        // on défini la source de l'image de targeted_marker pour qu'il prenne l'image logo.png
-                        targeted_marker.src = 'images/logo.png';
-                        // on change la taille de l'image
-                        targeted_marker.style.width = '{icon_targeted_size[0]}'+'px';
-                        targeted_marker.style.height = '{icon_targeted_size[1]}'+'px';
-                    }};
-                }}
-
-                </script>
-                <style>
-                .hoverable:hover {{
-                    background-color: #ddd;
-                }}
-                .zoomable1:hover {{
-                    /* on fait un effet de zoom */
-                    transform: scale(1.1);
-                    /* on rajoute une ombre grise */
-                    box-shadow: 0 0 2px 1px #ddd;
-                }}
-                .zoomable2:hover {{
-                    /* on fait un effet de zoom */
-                    transform: scale(1.05);
-                    /* on rajoute une ombre grise */
-                    box-shadow: 0 0 2px 1px #ddd;
-                }}
-                </style>
-            """
-
-        HTML += f"""
-            </div>
-            <p class="trackbox-container-footer">
-            <b>Nombre de bateaux : </b> {len(tracked_fleet_df)}<br>
-            <b>Dernière mise à jour de la carte : </b> {today}<br>
-            </p>
-        </div>
-        """
-        WIDTH = 5
-        HTML+= f"""
-
-        <!-- on ajoute le logo en bas à droite de la carte -->
-        <div class="zoomable1 signature" onclick="window.open('{TrackerServer.LIEN_GITHUB}')">
-                <img src="images\Logo_FleetyTrack\sansBG\Logo_fleetytrack_sansBG.svg" alt="logo" style="
-                    width: auto;
-                    float: left;
-                    margin-left: 5px;
-                    padding: 5px;
-                    height: inherit;">
-                <img src="images/fleetytrack_logopowered.png" alt='poweredby' style="
-                    float:right;
-                    height:inherit;
-                    width:auto;">
-        </div>
-
-
-        <style>
-        /* on cible les screen de moins de plus de 600px de large */
-        @media only screen and (min-width: 700px) {{
-            .signature {{
-                height: 120px;
-                position: absolute;
-                margin-right: 5px;
-                margin-bottom: 20px;
-                background-color: rgba(255, 255, 255, 0.5);
-                box-shadow: 0 0 2px 1px #ddd;
-                border-radius: 5%;
-                display: block;
-                z-index: 1000;
-                width: fit-content;
-                bottom: 0;
-                right: 0;
-                }}
-
-            .is_mrr {{
-                 width: auto;
-                 height: 25px;
-                 display: block;
-                 margin-left: auto;
-                 margin-right: 10px;
-                 float: right;
-                 border-radius: 20%;
-                 margin-top: 5%;
-                 margin-bottom: auto;
-                }}
-
-            .trackerbox-container-footer {{
-                font-size: 13px;
-                padding : 10px;
-                height: 70px;
-                font-family: Georgia, serif;
-                }}   
-            .trackerbox-container-item {{
-                color: #000;
-                text-decoration: none;
-                display: block;
-                height: 45px;
-                padding: 5px;
-                border-radius: 5px;
-                border: 1px solid #ddd;
-                margin-bottom: 5px;
-                text-align: left;
-                /* on rajoute une ombre grise */
-                box-shadow: 0 0 2px 1px #ddd;
-                }}        
-            
-        }}
-        @media only screen and (max-width: 700px) {{
-            .signature {{
-                height: 40px;
-                position: absolute;
-                margin-right: 5px;
-                margin-bottom: 20px;
-                background-color: rgba(255, 255, 255, 0.5);
-                box-shadow: 0 0 2px 1px #ddd;
-                border-radius: 5%;
-                display: block;
-                z-index: 1000;
-                width: fit-content;
-                bottom: 0;
-                right: 0;
-                }}
-            .is_mrr {{
-                 width: auto;
-                 height: 25px;
-                 display: block;
-                 margin-left: auto;
-                 margin-right: 10px;
-                 float: right;
-                 border-radius: 20%;
-                 margin-top: 5%;
-                 margin-bottom: auto;
-                }}
-
-            .trackerbox-container-footer {{
-                font-size: 13px;
-                padding : 10px;
-                height: 70px;
-                font-family: Georgia, serif;
-                }}  
-
-            .trackerbox-container-item {{
-                color: #000;
-                text-decoration: none;
-                display: block;
-                height: 45px;
-                padding: 5px;
-                border-radius: 5px;
-                border: 1px solid #ddd;
-                margin-bottom: 5px;
-                text-align: left;
-                /* on rajoute une ombre grise */
-                box-shadow: 0 0 2px 1px #ddd;
-                }}
-            
-        }}
-        </style>
-            
-        </html>
-
-        
-"""
+        # la liste est envoyée au navigateur sous forme d'un tableau JSON compact : les fonctions JS ne sont écrites qu'une fois
+        flags = dict(zip(tracked_fleet_df['COUNTRY_CODE'], tracked_fleet_df['FLAG_URL']))
+        boats = [{'index': index,
+                  'name': row['Nom du bateau'],
+                  'lat': row['LAT'],
+                  'lon': row['LONG'],
+                  'flag': row['COUNTRY_CODE'],
+                  'mmr': row['IS_MMR'], # si le bateau a une page web on ajoute le logo du musée
+                  'mmsi': int(row['MMSI']),
+                  'marker': MARKERS[row['MMSI']],
+                  } for index, row in enumerate(records)]
+        HTML = templates.SIDEBAR.render(boats=boats,
+                                        flags=flags,
+                                        today=today,
+                                        zoom_level=ZOOM_LEVEL,
+                                        offset=TrackerServer.offset,
+                                        icon_size=icon_size,
+                                        icon_targeted_size=TrackerServer.icon_targeted_size,
+                                        map_name=m.get_name(),
+                                        url_ycc=TrackerServer.URL_YCC,
+                                        lien_github=TrackerServer.LIEN_GITHUB,
+                                        )
 
         # on ajoute la box à la carte
         m.get_root().html.add_child(folium.Element(HTML))
+        if self._publish_mode == 'incremental':
+            # script qui relit régulièrement les positions et déplace les marqueurs existants
+            m.get_root().html.add_child(folium.Element(templates.POSITIONS_POLLER.render(positions_url=TrackerServer.POSITIONS_FILE_NAME,
+                                                                                         poll_seconds=TrackerServer.POSITIONS_POLL_SECONDS)))
         print("\n--------------------------------------")
         print(f">>> {len(tracked_fleet_df)} bateaux ajoutés à la carte <<<")
         # on sauvegarde la carte
-        m.save("Tracker_fleet_YCC/"+self._html_file_name)
+        m.save(path)
         print("\n... Carte sauvegardée ...")
+        self.optimize_outputs(path)
+        self.check_html_size(path, len(tracked_fleet_df))
+        if self._publish_mode == 'incremental':
+            self._shell_signature = signature
+            self.write_positions(tracked_fleet_df)
         print("--------------------------------------\n")
     
+    def render_popups(self, records:list) -> list:
+        """
+        Génère le HTML des popups des bateaux, dans l'ordre des lignes.
+        Avec plusieurs processus (render_workers > 1), les bateaux sont répartis par lots de
+        RENDER_CHUNK_SIZE et les lots sont réassemblés dans l'ordre.
+
+        :param records: lignes du dataframe préparé par _prepare_render_frame (to_dict('records'))
+        :return: liste du HTML de chaque popup
+        """
+        params = [dict(name=row['Nom du bateau'],
+                       country_code=row['COUNTRY_CODE'],
+                       image_url=row['IMAGE_URL'],
+                       image_webp=row['IMAGE_WEBP'],
+                       speed=row['SPEED'],
+                       cap=row['CAP_DISPLAY'],
+                       lat=row['LAT'],
+                       long=row['LONG'],
+                       last_position=row['LAST_POSITION_STR'],
+                       angle_to_turn=row['ANGLE_TO_TURN'],
+                       page_link=row['PAGE_LINK_URL'],
+                       mmsi=row['MMSI'],
+                       ) for row in records]
+        chunk_size = TrackerServer.RENDER_CHUNK_SIZE
+        if self._render_workers <= 1 or len(params) <= chunk_size:
+            popups = templates.render_popups(params)
+        else:
+            chunks = [params[i:i+chunk_size] for i in range(0, len(params), chunk_size)]
+            with ProcessPoolExecutor(max_workers=self._render_workers) as executor:
+                # map renvoie les résultats dans l'ordre des lots
+                popups = [html for chunk in executor.map(templates.render_popups, chunks) for html in chunk]
+        if TrackerServer.MINIFY_OUTPUT:
+            popups = [collapse_whitespace(html) for html in popups]
+        return popups
+
+    def _prepare_render_frame(self, tracked_fleet_df:pd.DataFrame) -> pd.DataFrame:
+        """
+        Calcule en une fois (opérations sur des colonnes entières) toutes les colonnes d'affichage :
+        - LAST_POSITION_STR : date de la dernière position (heure locale, comme datetime.fromtimestamp)
+        - ANGLE_TO_TURN : angle à tourner pour avoir le bateau dans le bon sens sur le schéma
+        - CAP_DISPLAY : cap affiché (0 si on n'a pas de cap)
+        - FLAG_URL : lien du drapeau du pays (NaN si le pays n'est pas dans dictionnary_country)
+        - IS_MMR / PAGE_LINK_URL : le bateau a-t-il une page sur le site du musée maritime, et son lien (None sinon)
+        """
+        df = tracked_fleet_df.copy()
+        last_position = pd.to_datetime(df['LAST_POSITION'], unit='s', utc=True).dt.tz_convert(tz.tzlocal())
+        df['LAST_POSITION_STR'] = last_position.dt.strftime('%Y-%m-%d %H:%M:%S')
+        df['ANGLE_TO_TURN'] = df['CAP'] - TrackerServer.POSITION_BOAT_SCHEME # NaN si on n'a pas de cap
+        df['CAP_DISPLAY'] = df['CAP'].astype(object).where(df['CAP'].notna(), 0)
+        df['FLAG_URL'] = df['COUNTRY_CODE'].map(TrackerServer.dictionnary_country)
+        df['IS_MMR'] = df['PAGE_LINK'].notna()
+        df['PAGE_LINK_URL'] = df['PAGE_LINK'].astype(object).where(df['IS_MMR'], None)
+        df['IMAGE_WEBP'] = None # variante WebP de la photo (voir _localize_assets)
+        return df
+
+    def _localize_assets(self, tracked_fleet_df:pd.DataFrame) -> pd.DataFrame:
+        """
+        Remplace les liens des drapeaux et des photos par ceux des miniatures locales
+        (chaque image distincte n'est traitée qu'une fois)
+        """
+        df = tracked_fleet_df.copy()
+        flags = self._assets.localize(df['FLAG_URL'].unique(), 'flag')
+        df['FLAG_URL'] = df['FLAG_URL'].map(lambda url: flags[url]['src'] if url in flags else url)
+        photos = self._assets.localize(df['IMAGE_URL'].unique(), 'photo')
+        df['IMAGE_WEBP'] = df['IMAGE_URL'].map(lambda url: photos[url]['webp'] if url in photos else None)
+        df['IMAGE_URL'] = df['IMAGE_URL'].map(lambda url: photos[url]['src'] if url in photos else url)
+        return df
+
+    @staticmethod
+    def fingerprint(tracked_fleet_df:pd.DataFrame, columns:list) -> str:
+        """
+        Empreinte stable (sha256) du contenu des colonnes données, ligne par ligne dans l'ordre du dataframe
+        """
+        columns = [column for column in columns if column in tracked_fleet_df.columns]
+        hashes = pd.util.hash_pandas_object(tracked_fleet_df[columns], index=False)
+        return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+    def get_static_signature(self, tracked_fleet_df:pd.DataFrame) -> str:
+        """
+        Empreinte des données fixes des bateaux (STATIC_COLUMNS, dans l'ordre d'affichage) :
+        tant qu'elle ne change pas, la page générée reste valable en mode incrémental.
+        """
+        return TrackerServer.fingerprint(tracked_fleet_df, TrackerServer.STATIC_COLUMNS)
+
+    def get_fingerprint(self) -> str:
+        """
+        Empreinte de toutes les données utilisées pour générer la carte (RENDER_COLUMNS)
+        """
+        tracked_fleet_df = self._tracked_fleet_df.sort_values(by=['Nom du bateau']).reset_index(drop=True)
+        return TrackerServer.fingerprint(tracked_fleet_df, TrackerServer.RENDER_COLUMNS)
+
+    def get_skipped_cycles(self) -> int:
+        """
+        Retourne le nombre de mises à jour sautées (ni génération ni publication) car la flotte n'avait pas changé
+        """
+        return self._skipped_cycles
+
+    def update_site(self, database=None, tracked_fleet_df:pd.DataFrame=None, cycle:int=None) -> bool:
+        """
+        Récupère les données de la base, puis génère et publie la carte seulement si
+        les données affichées ont changé depuis la dernière publication.
+
+        :param tracked_fleet_df: copie des données de la flotte à publier (si elle est fournie, la base n'est pas lue :
+                                 utile quand la base est mise à jour en parallèle de la publication)
+        :param cycle: numéro de la mise à jour de la base dont viennent les données (DataBase.get_cycle()) : les
+                      métriques de la génération et de la publication portent le même numéro que celles de la mise à jour
+        :return: True si le site a été publié, False si la mise à jour a été sautée ou si la publication a échoué
+        """
+        if tracked_fleet_df is not None:
+            self.set_tracked_fleet_df(tracked_fleet_df)
+        elif not(self.load_from_database(database)):
+            return False
+        fingerprint = self.get_fingerprint()
+        if fingerprint == self._published_fingerprint:
+            self._skipped_cycles += 1
+            print(f"\n>>> Flotte inchangée depuis la dernière publication → génération et publication sautées ({self._skipped_cycles} mises à jour sautées) <<<\n")
+            return False
+        self._cycle = cycle if cycle is not None else self._cycle + 1
+        with self._metrics.stage('render', self._cycle, http=self._assets) as stage:
+            self.generate_html()
+            stage.extra['boats'] = len(self._tracked_fleet_df)
+        with self._metrics.stage('publish', self._cycle) as stage:
+            published = self.publish_site()
+            if not published: # l'échec du push est signalé par publish_site, pas par une exception
+                stage.ok = False
+                stage.add(failures=1)
+        print("  " + self._metrics.summary(['render', 'publish']))
+        if published:
+            # en cas d'échec l'empreinte n'est pas retenue : la même flotte sera republiée au prochain cycle
+            self._published_fingerprint = fingerprint
+        return published
+
+    def write_positions(self, tracked_fleet_df:pd.DataFrame) -> str:
+        """
+        Écrit le fichier des positions relu par la page en mode incrémental :
+        {"updated": date, "boats": {mmsi: [lat, lon, vitesse, cap, dernière position, angle du schéma]}}
+
+        :return: chemin du fichier écrit
+        """
+        if 'LAST_POSITION_STR' not in tracked_fleet_df.columns:
+            tracked_fleet_df = self._prepare_render_frame(tracked_fleet_df)
+        columns = tracked_fleet_df[['LAT', 'LONG', 'SPEED', 'CAP_DISPLAY', 'LAST_POSITION_STR', 'ANGLE_TO_TURN']].astype(object)
+        columns = columns.where(columns.notna(), None) # NaN n'est pas du JSON valide
+        boats = dict(zip(tracked_fleet_df['MMSI'].astype('int64').tolist(), columns.values.tolist()))
+        positions = {'updated': datetime.now().strftime("%d/%m/%Y %H:%M:%S"), 'boats': boats}
+        return self.write_json(TrackerServer.POSITIONS_FILE_NAME, positions)
+
+    def write_json(self, file_name:str, data) -> str:
+        """
+        Écrit un fichier JSON compact à côté de la page, lu par le navigateur
+
+        :return: chemin du fichier écrit
+        """
+        path = "Tracker_fleet_YCC/"+file_name
+        # écriture atomique : la page ne lit jamais un fichier à moitié écrit
+        with open(path+'.tmp', 'w', encoding='utf-8') as file:
+            json.dump(data, file, separators=(',', ':'), ensure_ascii=False)
+        os.replace(path+'.tmp', path)
+        print(f"{file_name} écrit ({os.path.getsize(path)/1024:.1f} ko)")
+        if TrackerServer.PRECOMPRESS_OUTPUT:
+            precompress(path)
+        return path
+
+    def remove_output(self, file_name:str) -> None:
+        """
+        Supprime un fichier écrit à côté de la page (et ses versions compressées) qui ne sert plus :
+        il disparaît aussi du site à la prochaine publication
+        """
+        path = "Tracker_fleet_YCC/"+file_name
+        for extension in ('', '.gz', '.br'):
+            if os.path.isfile(path+extension):
+                os.remove(path+extension)
+
+    def optimize_outputs(self, path:str) -> None:
+        """
+        Étape après la génération de la page : minification (HTML, CSS, JS), extraction des styles
+        dans une feuille de style externe nommée selon son contenu, puis compression (gzip/brotli)
+        des fichiers. Affiche la taille de chaque fichier avant et après.
+        """
+        original_size = os.path.getsize(path)
+        outputs = [path]
+        if TrackerServer.MINIFY_OUTPUT:
+            with open(path, 'r', encoding='utf-8') as file:
+                html = file.read()
+            html, stylesheets = extract_styles(minify_html(html),
+                                               os.path.join("Tracker_fleet_YCC", TrackerServer.CSS_DIRECTORY),
+                                               TrackerServer.CSS_DIRECTORY)
+            with open(path+'.tmp', 'w', encoding='utf-8') as file:
+                file.write(html)
+            os.replace(path+'.tmp', path)
+            outputs += stylesheets
+
+        rows = []
+        for output in outputs:
+            size = os.path.getsize(output)
+            compressed = precompress(output) if TrackerServer.PRECOMPRESS_OUTPUT else {'raw': size, 'gzip': None, 'brotli': None}
+            rows.append((os.path.basename(output), original_size if output == path else None, size, compressed))
+        print_size_report(rows)
+
+    def check_html_size(self, path:str, nb_boats:int) -> bool:
+        """
+        Vérifie que la taille du fichier HTML généré reste dans le budget prévu
+        (MAX_HTML_BYTES_BASE + MAX_HTML_BYTES_PER_BOAT par bateau) et prévient sinon.
+
+        :return: True si la taille est dans le budget, False sinon
+        """
+        size = os.path.getsize(path)
+        budget = TrackerServer.MAX_HTML_BYTES_BASE + TrackerServer.MAX_HTML_BYTES_PER_BOAT*nb_boats
+        print(f"Taille de la carte : {size/1024:.1f} ko ({size/max(nb_boats, 1)/1024:.2f} ko / bateau)")
+        if size > budget:
+            print(f"-- ATTENTION : la carte dépasse le budget de taille ({size} > {budget} octets), du code est peut-être dupliqué pour chaque bateau --")
+            return False
+        return True
+
     def config_git(self):
-        """Configure le git pour pouvoir push le site sur le serveur
+        """Configure le git du dépôt du site pour pouvoir push le site sur le serveur
         """
         print("\n------------ CONFIG GIT ------------------")
-        prefix = ">>> "
-        
-        # on supprime le remote site si il existe
-        COMMANDE = f"git remote rm {TrackerServer.REMOTE_NAME}"
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-
-        COMMANDE = f"git remote -v"
-        print(prefix+COMMANDE)
-        print("")
-        os.system(COMMANDE)
-
-        # on ajoute le remote site
-        COMMANDE = f"git remote add {TrackerServer.REMOTE_NAME} {TrackerServer.GIT_URL}"
-        print("\n"+prefix+COMMANDE)
-        os.system(COMMANDE)
-
-        COMMANDE = f"git remote -v"
-        print(prefix+COMMANDE)
-        print("")
-        os.system(COMMANDE)
-
+        self._publisher.configure_remote()
         print("--------------------------------------\n")
         return self
 
-    def publish_site(self)-> str:
-        """Publie le site sur le serveur
+    def publish_site(self)-> bool:
+        """Publie le site sur le serveur : seuls les fichiers modifiés sont copiés dans le dépôt du site,
+        et il n'y a ni commit ni push si rien n'a changé
         Returns:
-            str: [lien du site]
+            bool: True si le site en ligne est à jour (publié ou déjà à jour), False si la publication a échoué
         """
         print("\n------------ PUBLISH SITE ------------------")
-        prefix = "\n>>> "
-        # on init un dépot git
-        COMMANDE = f"cd {TrackerServer.LOCAL_PATH_TO_SITE} && git init"
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-
-        # on se met dans la branche
-        COMMANDE = f"cd {TrackerServer.LOCAL_PATH_TO_SITE} && git checkout {TrackerServer.BRANCH_NAME}"
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-
-        # on print le status du dépot git
-        COMMANDE = f"cd {TrackerServer.LOCAL_PATH_TO_SITE} && git status"
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-        
-        # on supprime tous les fichiers et dossiers présents dans le dossier du dépot git
-        COMMANDE = f'cd {TrackerServer.LOCAL_PATH_TO_SITE} && del /f /q "index.html" && del /f /q "README.md" && del /f /q "LICENSE" && rmdir /s /q "images" && rmdir /s /q "DATA_SAVES"'
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-
-        # on copie colle tous les fichers du dossier backup dans le dossier du dépot git
-        COMMANDE = f'copy {TrackerServer.LOCAL_PATH_TO_BACKUP} {TrackerServer.LOCAL_PATH_TO_SITE} /y'
-        # on copie colle tous les sous dossiers du dossier backup dans le dossier du dépot git
-        COMMANDE += f' && xcopy {TrackerServer.LOCAL_PATH_TO_BACKUP} {TrackerServer.LOCAL_PATH_TO_SITE} /e /y'
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-        # on affiche le contenu du dossier
-        COMMANDE = f"cd {TrackerServer.LOCAL_PATH_TO_SITE} && tree /f"
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-
-        # on ajoute tous les fichiers du dossier du dépot git
-        COMMANDE = f"cd {TrackerServer.LOCAL_PATH_TO_SITE} && git add ."
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-
-        # on pull les fichiers du dossier du dépot git
-        COMMANDE = f"cd {TrackerServer.LOCAL_PATH_TO_SITE} && git pull {TrackerServer.REMOTE_NAME} {TrackerServer.BRANCH_NAME}"
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-
-        # on commit les fichiers du dossier du dépot git
-        COMMANDE = f'cd {TrackerServer.LOCAL_PATH_TO_SITE} && git commit -m "Update FleetyTracker {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}"'
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-
-        # on push les fichiers du dossier du dépot git
-        COMMANDE = f"cd {TrackerServer.LOCAL_PATH_TO_SITE} && git push {TrackerServer.REMOTE_NAME} {TrackerServer.BRANCH_NAME}"
-        print(prefix+COMMANDE)
-        os.system(COMMANDE)
-
+        start = time.perf_counter()
+        result = self._publisher.publish(f"Update FleetyTracker {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
 
         print("\n--------------------------------------")
-        print(f">>> Site publié à l'adresse : {TrackerServer.LIEN_SITE} <<<")
+        if result == SitePublisher.PUBLISHED:
+            print(f">>> Site publié à l'adresse : {TrackerServer.LIEN_SITE} ({time.perf_counter() - start:.1f} s) <<<")
+        elif result == SitePublisher.UNCHANGED:
+            print(f">>> Site déjà à jour : {TrackerServer.LIEN_SITE} <<<")
+        else:
+            print(f">>> Échec de la publication de {TrackerServer.LIEN_SITE}, nouvelle tentative à la prochaine mise à jour <<<")
         print("--------------------------------------\n")
 
-        return TrackerServer.LIEN_SITE
-
+        return result != SitePublisher.FAILED
 
 if __name__ == "__main__":
 
@@ -0,0 +1,127 @@
+# IMPORT
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+
+# types explicites des colonnes d'une sauvegarde ('str' : chaînes de caractères)
+# une colonne absente de cette table garde le type déduit de ses valeurs (voir snapshot_dtype)
+SNAPSHOT_DTYPES = {'Nom du bateau': 'str',
+                   'Numero de voile': 'str',
+                   'Nom skipper/armateur': 'str',
+                   'Prenom skipper/armateur': 'str',
+                   'Numero du skipper/armateur': 'Int64',
+                   'Num Licence': 'str',
+                   'MMSI': 'Int64',
+                   'PAGE_LINK': 'str',
+                   'COUNTRY_CODE': 'str',
+                   'SHIP_ID': 'int64',
+                   'LAST_POSITION': 'float64',
+                   'LAT': 'float64',
+                   'LONG': 'float64',
+                   'SPEED': 'float64',
+                   'CAP': 'float64',
+                   'IMAGE_URL': 'str',
+                   }
+
+SNAPSHOT_EXTENSIONS = ('.npz', '.csv') # extensions des sauvegardes, par ordre de préférence au chargement
+
+
+def snapshot_dtype(column:str, series:pd.Series) -> str:
+    """
+    Type sous lequel une colonne est sauvegardée : celui de SNAPSHOT_DTYPES, sinon celui de ses valeurs
+    (une colonne numérique ajoutée sans être déclarée n'est pas convertie en chaînes de caractères)
+    """
+    if column in SNAPSHOT_DTYPES:
+        return SNAPSHOT_DTYPES[column]
+    if pd.api.types.is_bool_dtype(series):
+        return 'str' if series.isna().any() else 'bool'
+    if pd.api.types.is_integer_dtype(series):
+        return 'Int64' if series.isna().any() or isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else 'int64'
+    if pd.api.types.is_float_dtype(series):
+        return 'float64'
+    return 'str'
+
+
+def save_snapshot(df:pd.DataFrame, path:str) -> None:
+    """
+    Sauvegarde un dataframe dans un fichier .npz en colonnes binaires :
+    - colonnes numériques → tableaux typés (+ masque des valeurs manquantes pour les entiers nullables)
+    - colonnes texte → codes entiers + table des chaînes distinctes
+    Le type de chaque colonne est enregistré dans le fichier (__dtypes__).
+    """
+    dtypes = [snapshot_dtype(column, df[column]) for column in df.columns]
+    arrays = {'__columns__': np.array(list(df.columns), dtype=str),
+              '__dtypes__': np.array(dtypes, dtype=str)}
+    for i, (column, dtype) in enumerate(zip(df.columns, dtypes)):
+        key = f"c{i}" # les noms de colonnes contiennent des espaces et des '/', on les indexe par position
+        series = df[column]
+        if dtype == 'Int64':
+            series = series.astype('Int64')
+            arrays[key] = series.fillna(0).to_numpy(dtype='int64')
+            arrays[key+'_na'] = series.isna().to_numpy()
+        elif dtype != 'str':
+            arrays[key] = series.to_numpy(dtype=dtype)
+        else:
+            codes, strings = pd.factorize(series) # les valeurs manquantes ont le code -1
+            arrays[key] = codes.astype('int32')
+            arrays[key+'_strings'] = np.array([str(string) for string in strings], dtype=str)
+    np.savez(path, **arrays)
+
+
+def load_snapshot(path:str, columns:list=None) -> pd.DataFrame:
+    """
+    Charge une sauvegarde (.npz ou .csv) avec des types explicites
+
+    :param columns: colonnes à charger (toutes par défaut). Avec le format .npz, les autres
+                    colonnes ne sont même pas lues sur le disque.
+    """
+    if path.endswith('.csv'):
+        # une ancienne sauvegarde peut ne pas avoir toutes les colonnes demandées : on ne lit que celles du fichier
+        file_columns = list(pd.read_csv(path, nrows=0).columns)
+        usecols = file_columns if columns is None else [column for column in file_columns if column in columns]
+        dtypes = {column: (object if dtype == 'str' else dtype) for column, dtype in SNAPSHOT_DTYPES.items() if column in usecols}
+        return pd.read_csv(path, usecols=usecols, dtype=dtypes)
+
+    with np.load(path) as data:
+        all_columns = list(data['__columns__'])
+        # les sauvegardes antérieures à __dtypes__ n'ont de types que pour les colonnes déclarées à l'époque
+        dtypes = list(data['__dtypes__']) if '__dtypes__' in data else [SNAPSHOT_DTYPES.get(column, 'str') for column in all_columns]
+        data_frame = {}
+        for i, (column, dtype) in enumerate(zip(all_columns, dtypes)):
+            if columns is not None and column not in columns:
+                continue
+            key = f"c{i}"
+            if dtype == 'Int64':
+                data_frame[column] = pd.array(data[key], dtype='Int64')
+                data_frame[column][data[key+'_na']] = pd.NA
+            elif dtype != 'str':
+                data_frame[column] = data[key]
+            else:
+                data_frame[column] = pd.Categorical.from_codes(data[key], categories=pd.Index(data[key+'_strings'], dtype=object)).astype(object)
+    return pd.DataFrame(data_frame, columns=[column for column in all_columns if column in data_frame])
+
+
+def list_saves(directories:list, date_format:str) -> dict:
+    """
+    Retourne un dictionnaire date -> chemin de la sauvegarde à charger (le format binaire est préféré au csv)
+
+    :param directories: dossiers des sauvegardes (les dossiers absents sont ignorés)
+    """
+    saves = {}
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for file in os.listdir(directory):
+            name, extension = os.path.splitext(file)
+            if not file.startswith('SAVE__') or extension not in SNAPSHOT_EXTENSIONS:
+                continue
+            try:
+                date = datetime.strptime(name.split('SAVE__')[1], date_format)
+            except ValueError:
+                continue
+            # on garde le fichier dont l'extension est la plus prioritaire
+            if date not in saves or SNAPSHOT_EXTENSIONS.index(extension) < SNAPSHOT_EXTENSIONS.index(os.path.splitext(saves[date])[1]):
+                saves[date] = os.path.join(directory, file)
+    return saves
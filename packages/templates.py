@@ -0,0 +1,490 @@
+# IMPORT
+from jinja2 import Template
+
+# Les templates sont compilés une seule fois, à l'import du module, puis rendus pour chaque bateau.
+# Les styles communs à tous les bateaux sont regroupés dans SHARED_CSS (ajouté une seule fois à la page).
+
+
+SHARED_CSS = Template("""
+<style>
+/* ----- POPUPS ----- */
+.popup-boat {
+    width: {{ width }}px;
+    height: {{ height }}px;
+    overflow-y: auto;
+    overflow-x: hidden;
+    padding: 5px;
+}
+.popup-boat-img {
+    width: 100%;
+    max-width: 300px;
+    height: auto;
+    border-radius: 5px;
+    border: 1px solid #ddd;
+    padding: 5px;
+    margin-bottom: 10px;
+    display: block;
+    margin-left: auto;
+    margin-right: auto;
+}
+.popup-text {
+    font-size: 14px;
+}
+.popup-info-box {
+    width: 100%;
+    border: 1px solid #ddd;
+    border-radius: 5px;
+    padding: 5px;
+    margin-bottom: 10px;
+    background-color: #f2f2f2;
+}
+.popup-info {
+    float: left;
+    position: relative;
+    max-width: {{ (width/1.5)|int }}px;
+    height: 15px;
+    display: block;
+    margin-left: auto;
+    margin-right: auto;
+    padding: 5px;
+}
+.popup-scheme {
+    width: 100%;
+    position: relative;
+    max-width: {{ (width/3.5)|int }}px;
+    height: auto;
+    display: block;
+    margin-left: auto;
+    margin-right: 5%;
+}
+.popup-mmr-link {
+    width: 50px;
+    height: auto;
+    border-radius: 50%;
+    border: 1px solid #ddd;
+    padding: 5px;
+    margin-bottom: 10px;
+    box-shadow: 0 0 2px 1px rgba(0, 0, 0, 0.2);
+    display: block;
+    margin-left: auto;
+    margin-right: auto;
+}
+.popup-mt-button {
+    background-color: #4CAF50; /* Green */
+    border: none;
+    color: white;
+    padding: 15px 32px;
+    text-align: center;
+    text-decoration: none;
+    display: block;
+    margin-left: auto;
+    margin-right: auto;
+    font-size: 16px;
+    cursor: pointer;
+    border-radius: 12px;
+    box-shadow: 0 0 2px 1px rgba(0, 0, 0, 0.2);
+}
+@-moz-keyframes spin {
+    100% { -moz-transform: rotate(-360deg); }
+}
+@-webkit-keyframes spin {
+    100% { -webkit-transform: rotate(-360deg); }
+}
+@keyframes spin {
+    100% { -webkit-transform: rotate(-360deg); transform: rotate(-360deg); }
+}
+.tourne {
+    -webkit-animation-name: spin;
+    -webkit-animation-duration: {{ time_to_turn }}s;
+    -webkit-animation-iteration-count: 1;
+    -webkit-animation-timing-function: ease-out;
+    -moz-animation-name: spin;
+    -moz-animation-duration: {{ time_to_turn }}s;
+    -moz-animation-iteration-count: 1;
+    -moz-animation-timing-function: ease-out;
+    animation-name: spin;
+    animation-duration: {{ time_to_turn }}s;
+    animation-iteration-count: 1;
+    animation-timing-function: ease-out;
+}
+
+/* ----- BOX D'INFORMATIONS ----- */
+#box {
+    width: min-content;
+    position: absolute;
+    /* on le met au dessus de la carte */
+    z-index: 999;
+    top: 20%;
+    left: 20px;
+    border: 1px solid #ddd;
+    border-radius: 10px;
+    /* on lui donne une ombre grise comme une popup */
+    box-shadow: 0 0 2px 1px #ddd;
+    background-color: white;
+    padding: 5px;
+}
+.trackerbox-logo {
+    width: 50%;
+    height: auto;
+    display: block;
+    margin-left: auto;
+    margin-right: auto;
+    margin-top: 5px;
+    border-radius: 50%;
+}
+#track_container {
+    overflow-y: scroll;
+    height: 200px;
+    width: max-content;
+    margin-left: auto;
+    margin-right: auto;
+    margin-top: 5px;
+    margin-bottom: 10px;
+}
+.trackerbox-item-name {
+    float: left;
+    margin-top: 8px;
+    margin-left: 5px;
+    margin-right: auto;
+    font-size: 15px;
+    font-family: Georgia, serif;
+}
+.trackerbox-item-flag {
+    width: auto;
+    height: 25px;
+    display: block;
+    margin-left: auto;
+    margin-right: 15px;
+    float: right;
+    border-radius: 20%;
+    margin-top: 5px;
+    margin-bottom: auto;
+}
+.signature-logo {
+    width: auto;
+    float: left;
+    margin-left: 5px;
+    padding: 5px;
+    height: inherit;
+}
+.signature-powered {
+    float: right;
+    height: inherit;
+    width: auto;
+}
+.hoverable:hover {
+    background-color: #ddd;
+}
+.zoomable1:hover {
+    /* on fait un effet de zoom */
+    transform: scale(1.1);
+    /* on rajoute une ombre grise */
+    box-shadow: 0 0 2px 1px #ddd;
+}
+.zoomable2:hover {
+    /* on fait un effet de zoom */
+    transform: scale(1.05);
+    /* on rajoute une ombre grise */
+    box-shadow: 0 0 2px 1px #ddd;
+}
+.signature {
+    position: absolute;
+    margin-right: 5px;
+    margin-bottom: 20px;
+    background-color: rgba(255, 255, 255, 0.5);
+    box-shadow: 0 0 2px 1px #ddd;
+    border-radius: 5%;
+    display: block;
+    z-index: 1000;
+    width: fit-content;
+    bottom: 0;
+    right: 0;
+}
+.is_mrr {
+    width: auto;
+    height: 25px;
+    display: block;
+    margin-left: auto;
+    margin-right: 10px;
+    float: right;
+    border-radius: 20%;
+    margin-top: 5%;
+    margin-bottom: auto;
+}
+.trackerbox-container-footer {
+    font-size: 13px;
+    padding : 10px;
+    height: 70px;
+    font-family: Georgia, serif;
+}
+.trackerbox-container-item {
+    color: #000;
+    text-decoration: none;
+    display: block;
+    height: 45px;
+    padding: 5px;
+    border-radius: 5px;
+    border: 1px solid #ddd;
+    margin-bottom: 5px;
+    text-align: left;
+    /* on rajoute une ombre grise */
+    box-shadow: 0 0 2px 1px #ddd;
+}
+/* on cible les écrans de plus de 700px de large */
+@media only screen and (min-width: 700px) {
+    .signature {
+        height: 120px;
+    }
+}
+@media only screen and (max-width: 700px) {
+    .signature {
+        height: 40px;
+    }
+}
+</style>
+""")
+
+
+POPUP = Template("""
+<div class="popup-boat">
+<h3><b>{{ name }}</b> ({{ country_code }})</h3>
+<br>
+{# on ajoute une image du bateau si on peut (en WebP si le navigateur le gère) #}
+<picture>
+    {% if image_webp %}<source srcset="{{ image_webp }}" type="image/webp">{% endif %}
+    <img class="popup-boat-img" src="{{ image_url }}" alt="{{ name }}"/>
+</picture>
+<p class="popup-text">
+    {# on crée une box qui aura à gauche le cap et à droite le schéma du bateau #}
+    <div class="popup-info-box">
+    <div class="popup-info">
+    {# les champs data-field sont mis à jour par POSITIONS_POLLER quand la carte est publiée en mode incrémental #}
+    <b>Vitesse : </b> <span data-field="speed">{{ speed }}</span> noeuds<br>
+    <b>Cap : </b> <span data-field="cap">{{ cap }}</span>°<br>
+    <b>Latitude : </b> <span data-field="lat">{{ lat }}</span>°<br>
+    <b>Longitude : </b> <span data-field="lon">{{ long }}</span>°<br>
+    <b>Dernière position : </b> <span data-field="last_position">{{ last_position }}</span><br>
+    </div>
+    {# on affiche le schéma du bateau tourné de angle_to_turn pour faire le cap #}
+    <img class="tourne popup-scheme" data-field="angle" src="images/boat.png" alt="boat" style="transform: rotate({{ angle_to_turn }}deg);"/>
+    </div>
+</p>
+{% if page_link %}
+{# petit bouton en forme de livre qui redirige vers la page du musée maritime de La Rochelle #}
+<a href="{{ page_link }}" target="_blank" title='En apprendre plus sur le site du musée maritime de La Rochelle'>
+    <img class="popup-mmr-link" src="images/idea.png" alt="Livre">
+</a>
+{% endif %}
+<button class="popup-mt-button" onclick="window.open('https://www.marinetraffic.com/en/ais/details/ships/mmsi:{{ mmsi }}')">
+    Voir sur Marine Traffic</button>
+</div>
+""")
+
+
+SIDEBAR = Template("""
+<div id="box">
+    <img onclick="window.open('{{ url_ycc }}')" class="zoomable1 trackerbox-logo" src="images/logo.png" alt="logo"/>
+    {# la liste des bateaux est construite dans le navigateur à partir de FLEET (voir le script plus bas) #}
+    <div id="track_container"></div>
+    <p class="trackerbox-container-footer">
+    <b>Nombre de bateaux : </b> {{ boats|length }}<br>
+    <b>Dernière mise à jour de la carte : </b> <span id="trackerbox-update">{{ today }}</span><br>
+    </p>
+</div>
+
+{# on ajoute le logo en bas à droite de la carte #}
+<div class="zoomable1 signature" onclick="window.open('{{ lien_github }}')">
+    <img class="signature-logo" src="images/Logo_FleetyTrack/sansBG/Logo_fleetytrack_sansBG.svg" alt="logo">
+    <img class="signature-powered" src="images/fleetytrack_logopowered.png" alt='poweredby'>
+</div>
+
+<script>
+// données de la liste : [{name, lat, lon, index, flag, mmr, mmsi, marker}], le drapeau est un code pays de FLAGS
+var FLEET = {{ boats|tojson }};
+var FLAGS = {{ flags|tojson }};
+// marqueurs créés par le navigateur (mode regroupé), en fonction du MMSI
+var FLEET_MARKERS = {};
+
+function getMarker(boat) {
+    return FLEET_MARKERS[boat.mmsi] || (boat.marker && window[boat.marker]);
+}
+
+function printTrack(NAME, index) {
+    console.log('... Tracking sur ' + NAME +' ('+ index+ ') ...');
+}
+
+function setView(lat, long, zoom, boat) {
+    console.log('setView(' + lat + ', ' + long + ', ' + zoom + ')');
+    // on descend un peu les coordonnées cible pour que la popup soit bien centrée sur la carte
+    lat = lat + {{ offset[1] }} ;
+    long = long + {{ offset[0] }} ;
+    {{ map_name }}.setView([lat, long], zoom);
+    // on récupère le marqueur du bateau par son MMSI (indépendant de l'ordre des marqueurs dans la page)
+    // dans une grappe de marqueurs, l'élément n'existe pas encore : on ne le met pas en valeur
+    var marker = getMarker(boat);
+    marker = marker && marker.getElement();
+    if (!marker) {
+        return;
+    };
+
+    // si targeted_marker est défini, on lui redonne l'image ship.png
+    if (typeof targeted_marker !== 'undefined') {
+        targeted_marker.src = 'images/ship.png';
+        targeted_marker.style.width = '{{ icon_size[0] }}'+'px';
+        targeted_marker.style.height = '{{ icon_size[1] }}'+'px';
+    };
+    // on redéfini le targeted_marker et on lui donne l'image logo.png
+    targeted_marker = marker;
+    targeted_marker.src = 'images/logo.png';
+    targeted_marker.style.width = '{{ icon_targeted_size[0] }}'+'px';
+    targeted_marker.style.height = '{{ icon_targeted_size[1] }}'+'px';
+}
+
+// on ajoute le nom de chaque bateau à la liste. Quand on click dessus on déclenche la fonction setView()
+(function () {
+    var container = document.getElementById('track_container');
+    FLEET.forEach(function (boat) {
+        var item = document.createElement('a');
+        item.className = 'zoomable2 trackerbox-container-item';
+        item.onclick = function () {
+            printTrack(boat.name, boat.index);
+            setView(boat.lat, boat.lon, {{ zoom_level }}, boat);
+        };
+        // on met le nom du bateau à gauche et le drapeau à droite
+        var name = document.createElement('p');
+        name.className = 'trackerbox-item-name';
+        name.textContent = boat.name;
+        item.appendChild(name);
+        var flag = document.createElement('img');
+        flag.className = 'trackerbox-item-flag';
+        flag.src = FLAGS[boat.flag];
+        flag.alt = 'drapeau';
+        item.appendChild(flag);
+        if (boat.mmr) {
+            var mmr = document.createElement('img');
+            mmr.id = 'is_mmr_' + boat.index;
+            mmr.className = 'is_mrr';
+            mmr.src = 'images/logo_mmr.png';
+            mmr.alt = 'logo_mmr';
+            item.appendChild(mmr);
+        };
+        container.appendChild(item);
+    });
+})();
+</script>
+""")
+
+
+POSITIONS_POLLER = Template("""
+<script>
+// mode incrémental : la page n'est générée qu'une fois, seules les positions sont relues régulièrement
+// format de {{ positions_url }} : {"updated": date, "boats": {mmsi: [lat, lon, vitesse, cap, dernière position, angle]}}
+var FLEET_POSITIONS = {};
+
+function applyPositions(data) {
+    FLEET_POSITIONS = data.boats;
+    FLEET.forEach(function (boat) {
+        var position = FLEET_POSITIONS[boat.mmsi];
+        var marker = getMarker(boat);
+        if (!position || !marker) {
+            return;
+        };
+        boat.lat = position[0];
+        boat.lon = position[1];
+        marker.setLatLng([boat.lat, boat.lon]);
+        // si la popup est déjà ouverte on la met à jour tout de suite
+        if (marker.isPopupOpen()) {
+            updatePopup(boat, marker.getPopup());
+        };
+    });
+    document.getElementById('trackerbox-update').textContent = data.updated;
+}
+
+function updatePopup(boat, popup) {
+    var position = FLEET_POSITIONS[boat.mmsi];
+    var element = popup.getElement();
+    if (!position || !element) {
+        return;
+    };
+    var fields = {lat: position[0], lon: position[1], speed: position[2], cap: position[3], last_position: position[4]};
+    for (var field in fields) {
+        var span = element.querySelector('[data-field="' + field + '"]');
+        if (span) {
+            span.textContent = fields[field];
+        };
+    };
+    var scheme = element.querySelector('[data-field="angle"]');
+    if (scheme && position[5] !== null) {
+        scheme.style.transform = 'rotate(' + position[5] + 'deg)';
+    };
+}
+
+function pollPositions() {
+    fetch('{{ positions_url }}', {cache: 'no-store'})
+        .then(function (response) { return response.ok ? response.json() : null; })
+        .then(function (data) { if (data) { applyPositions(data); }; })
+        .catch(function (error) { console.log('positions indisponibles : ' + error); });
+}
+
+window.addEventListener('load', function () {
+    // les popups sont construites à l'ouverture (lazy) : on les remet à jour à chaque ouverture
+    FLEET.forEach(function (boat) {
+        var marker = getMarker(boat);
+        if (marker) {
+            marker.on('popupopen', function (event) { updatePopup(boat, event.popup); });
+            // popup chargée à la demande (mode regroupé)
+            marker.on('popupcontentloaded', function (event) { updatePopup(boat, event.popup); });
+        };
+    });
+    pollPositions();
+    setInterval(pollPositions, {{ poll_seconds*1000 }});
+});
+</script>
+""")
+
+
+CLUSTER_CALLBACK = Template("""
+(function () {
+    // popups de tous les bateaux, lues une seule fois au premier clic
+    var popupsRequest = null;
+
+    function loadPopup(marker, popup, mmsi) {
+        if (popupsRequest === null) {
+            popupsRequest = fetch('{{ popups_url }}').then(function (response) { return response.json(); });
+        };
+        popupsRequest.then(function (popups) {
+            popup.setContent(popups[mmsi] || '');
+            marker.fire('popupcontentloaded', {popup: popup});
+        }).catch(function (error) {
+            popupsRequest = null;
+            popup.setContent('Informations indisponibles');
+        });
+    }
+
+    // appelée par FastMarkerCluster pour chaque ligne [lat, lon, mmsi]
+    return function (row) {
+        var mmsi = row[2];
+        var icon = L.icon({iconUrl: '{{ icon_url }}', iconSize: {{ icon_size|list|tojson }}, iconAnchor: [0, 0], popupAnchor: [0, -5]});
+        var marker = L.marker(new L.LatLng(row[0], row[1]), {icon: icon});
+        var popup = L.popup({maxWidth: '100%', width: {{ width }}, maxHeight: {{ max_height }}}).setContent('...');
+        marker.bindPopup(popup);
+        marker.on('popupopen', function () { loadPopup(marker, popup, mmsi); });
+        FLEET_MARKERS[mmsi] = marker;
+        return marker;
+    };
+})()
+""")
+
+
+def render_popups(params:list) -> list:
+    """
+    Rend la popup de chaque bateau (un dictionnaire de paramètres de POPUP par bateau).
+    Fonction de module pour pouvoir être envoyée à un processus séparé.
+    """
+    return [POPUP.render(**popup_params) for popup_params in params]
+
+
+HEAD = Template("""
+<title>{{ name }}</title>
+<link rel="icon" type="image/png" href="images/Logo_FleetyTrack/BG_blanc65/Logo_fleetytrack_BGW65_round.svg">
+""")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# les modules du projet s'importent comme dans main.py (from db import DataBase)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'packages'))
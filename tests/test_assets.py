@@ -0,0 +1,87 @@
+import io
+import os
+import threading
+import pytest
+from assets import AssetStore
+
+
+class FakeResponse():
+    def __init__(self, status_code:int, content:bytes=b"", headers:dict=None) -> None:
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise ValueError(self.status_code)
+
+
+class FakePool():
+    """
+    Répond 304 aux requêtes conditionnelles, 200 avec l'image sinon
+    """
+
+    def __init__(self) -> None:
+        self.requests = []
+
+    def get(self, url:str, headers:dict=None, **kwargs) -> FakeResponse:
+        self.requests.append(headers or {})
+        if headers:
+            return FakeResponse(304)
+        return FakeResponse(200, b"PNG", {'Content-Type': 'image/png', 'ETag': '"v1"'})
+
+
+def test_missing_local_file_is_downloaded_again(tmp_path, monkeypatch):
+    monkeypatch.setattr('assets.Image', None) # pas de miniatures : on ne teste que le téléchargement
+    http = FakePool()
+    store = AssetStore(str(tmp_path / 'img'), 'img', str(tmp_path / 'index.json'), ttl_found=0, ttl_missing=0, http=http)
+    url = "https://example.org/boat.png"
+    store.localize([url], 'photo')
+    name = store._index.get(url)['value']
+    assert open(store._path(name), 'rb').read() == b"PNG"
+
+    # l'entrée est périmée et le fichier local a disparu : la requête ne doit pas être conditionnelle
+    os.remove(store._path(name))
+    links = store.localize([url], 'photo')
+    assert http.requests[-1] == {}
+    assert open(store._path(name), 'rb').read() == b"PNG"
+    assert links[url]['src'].endswith(name)
+
+    # le fichier existe : on revalide, le 304 garde l'image
+    store.localize([url], 'photo')
+    assert http.requests[-1] == {'If-None-Match': '"v1"'}
+    assert open(store._path(name), 'rb').read() == b"PNG"
+
+
+class SameImagePool():
+    """
+    Sert la même image (PNG) à tous les liens, après un rendez-vous entre les threads pour qu'ils écrivent en même temps
+    """
+
+    def __init__(self, content:bytes, nb_workers:int) -> None:
+        self._content = content
+        self._barrier = threading.Barrier(nb_workers, timeout=5)
+
+    def get(self, url:str, **kwargs) -> FakeResponse:
+        try:
+            self._barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        return FakeResponse(200, self._content, {'Content-Type': 'image/png'})
+
+
+@pytest.mark.parametrize('run', range(5))
+def test_concurrent_duplicates_are_written_once(tmp_path, run):
+    Image = pytest.importorskip('PIL.Image')
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 800), (20, 60, 120)).save(buffer, format='PNG')
+    nb_workers = 4
+    store = AssetStore(str(tmp_path / 'img'), 'img', str(tmp_path / 'index.json'), ttl_found=3600, ttl_missing=3600,
+                       nb_workers=nb_workers, http=SameImagePool(buffer.getvalue(), nb_workers))
+    urls = [f"https://example.org/boat-{i}.png" for i in range(nb_workers)]
+    links = store.localize(urls, 'photo')
+    # les 4 liens pointent vers les mêmes fichiers locaux, sans fichier temporaire abandonné
+    assert len({link['src'] for link in links.values()}) == 1
+    assert all(link['src'].startswith('img/') and link['webp'] for link in links.values())
+    files = [name for _, _, names in os.walk(tmp_path / 'img') for name in names]
+    assert len(files) == 3 and not any(name.endswith('.tmp') for name in files)
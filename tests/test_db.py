@@ -0,0 +1,104 @@
+import io
+import os
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+import pytest
+import requests
+from db import DataBase
+
+
+def ais_record(mmsi:int) -> dict:
+    return {'MMSI': str(mmsi), 'CODE2': 'FR', 'SHIP_ID': '42', 'LAST_POS': int(time.time()),
+            'LAT': 46.15, 'LON': -1.15, 'SPEED': 0.0, 'COURSE': 90}
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path) # caches, historique et métriques sont relatifs au dossier courant
+    database = DataBase(nb_workers=2)
+    database._tracked_fleet_df = pd.DataFrame({'MMSI': [111, 222], 'Nom du bateau': ['FOUND', 'ERROR']})
+    return database
+
+
+def test_fallback_error_string_drops_only_that_boat(database):
+    # le lot n'a rien retourné pour 222 : il est redemandé seul, et le client répond par un message d'erreur
+    database._fetch_ais_batch = lambda mmsi_list: {mmsi: ais_record(mmsi) for mmsi in mmsi_list if mmsi == 111}
+    database._fetch_ais = lambda mmsi: "Error 403 : Forbidden"
+    database.request_update_API(complete_update=True, trace_on_log=False)
+    assert database.get_tracked_fleet_df()['MMSI'].tolist() == [111]
+
+
+@pytest.mark.parametrize('result', ["Error", [], ["E"], [ais_record(111)]])
+def test_first_ais_record(result):
+    if isinstance(result, list) and result and isinstance(result[0], dict):
+        assert DataBase.first_ais_record(result) == result[0]
+    else:
+        with pytest.raises(ValueError):
+            DataBase.first_ais_record(result)
+
+
+def test_background_save_errors_are_reported(database, capsys, monkeypatch):
+    def failing_write(tracked_fleet_df, date, cycle=None):
+        raise OSError(f"disque plein (cycle {cycle})")
+    database._write_save = failing_write
+    monkeypatch.setattr(DataBase, 'SAVE_IN_BACKGROUND', True)
+    # deux sauvegardes de suite : la première n'est plus dans _pending_save mais son erreur est tout de même affichée
+    database._cycle = 1
+    database.saveDB()
+    database._cycle = 2
+    database.saveDB()
+    database.wait_for_save()
+    database._save_executor.shutdown(wait=True) # les callbacks sont exécutés avant la fin du thread d'écriture
+    output = capsys.readouterr().out
+    assert "disque plein (cycle 1)" in output and "disque plein (cycle 2)" in output
+
+
+def test_binary_snapshots_are_kept_out_of_the_site(database, monkeypatch):
+    monkeypatch.setattr(DataBase, 'MAX_NUMBER_OF_FILES', 2)
+    os.makedirs(DataBase.path_saving_data)
+    fleet = database.get_tracked_fleet_df().assign(LAST_POSITION=int(time.time()), LAT=46.15, LONG=-1.15, SPEED=0.0, CAP=90.0)
+    date = datetime(2024, 5, 1, 12, 0, 0)
+    for minutes in range(3):
+        database._write_save(fleet, date + timedelta(minutes=minutes))
+    # le dossier publié ne contient que les exports csv, la rotation s'applique aux deux formats
+    assert sorted(os.listdir(DataBase.path_saving_data)) == ['SAVE__01_05_2024_12_01_00.csv', 'SAVE__01_05_2024_12_02_00.csv']
+    assert sorted(os.listdir(DataBase.path_snapshots)) == ['SAVE__01_05_2024_12_01_00.npz', 'SAVE__01_05_2024_12_02_00.npz']
+    assert database.get_save_path(date + timedelta(minutes=2)).endswith('.npz')
+
+
+def test_old_binary_snapshots_are_moved_out_of_the_site(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(DataBase.path_saving_data)
+    for extension in ('.npz', '.csv'):
+        open(os.path.join(DataBase.path_saving_data, 'SAVE__01_05_2024_12_00_00' + extension), 'w').close()
+    DataBase.move_snapshots_out_of_site()
+    assert os.listdir(DataBase.path_saving_data) == ['SAVE__01_05_2024_12_00_00.csv']
+    assert os.listdir(DataBase.path_snapshots) == ['SAVE__01_05_2024_12_00_00.npz']
+
+
+class MissingPagePool():
+    """
+    Répond 404 à toutes les requêtes
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+
+    def get(self, url, **kwargs):
+        self.requests += 1
+        response = requests.Response()
+        response.status_code = 404
+        response.url = url
+        response.raw = io.BytesIO(b"Not Found")
+        return response
+
+
+def test_missing_museum_page_is_cached(database):
+    database._http = MissingPagePool()
+    database._image_cache_hits = 0
+    url = DataBase.PAGE_URL_TEMPLATE.format('disparu')
+    assert database.get_image_from_page_link(url, 42) == DataBase.DEFAULT_BOAT_IMG_URL
+    # l'échec est gardé en cache : la page n'est pas redemandée avant TTL_IMAGE_MISSING
+    assert database.get_image_from_page_link(url, 42) == DataBase.DEFAULT_BOAT_IMG_URL
+    assert database._http.requests == 1
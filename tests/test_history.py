@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+import pandas as pd
+from history import HistoryStore
+
+
+def fleet(now, lat, speed, last_position):
+    return pd.DataFrame({'Nom du bateau': ['Alpha', 'Bravo', 'Charlie'],
+                         'MMSI': pd.array([227000001, 227000002, None], dtype='Int64'), # Charlie n'a pas de MMSI
+                         'Skipper': ['A', 'B', 'C'],
+                         'LAST_POSITION': [int((now - last_position).timestamp())]*3,
+                         'LAT': [lat, 48.0, 49.0],
+                         'LONG': [-3.0, -4.0, -5.0],
+                         'SPEED': [speed, 0.0, 1.0],
+                         'CAP': [90.0, None, 180.0]})
+
+
+def test_append_and_query_round_trip(tmp_path):
+    path = str(tmp_path / 'HISTORY' / 'history.sqlite')
+    now = datetime.now().replace(microsecond=0)
+    store = HistoryStore(path, retention_days=30)
+    assert store.append(fleet(now, 47.0, 6.5, timedelta(minutes=10)), now) == 2
+    # même point AIS à la mise à jour suivante : pas de doublon
+    assert store.append(fleet(now, 47.0, 6.5, timedelta(minutes=10)), now + timedelta(minutes=5)) == 0
+    assert store.append(fleet(now, 47.1, 7.0, timedelta(0)), now + timedelta(minutes=10)) == 2
+    store.close()
+
+    # les données sont relues depuis le fichier SQLite
+    store = HistoryStore(path, retention_days=30)
+    track = store.get_track(227000001)
+    assert list(track.columns) == HistoryStore.TRACK_COLUMNS
+    assert track['LAT'].tolist() == [47.0, 47.1]
+    assert track['SPEED'].tolist() == [6.5, 7.0]
+    assert track['LAST_POSITION'].tolist() == [int((now - timedelta(minutes=10)).timestamp()), int(now.timestamp())]
+    assert track['CAP'].tolist() == [90.0, 90.0]
+    assert store.get_track(227000002)['CAP'].isna().all()
+    assert store.get_track(227000001, since=now - timedelta(minutes=1))['LAT'].tolist() == [47.1]
+    assert store.get_boat(227000001) == {'Nom du bateau': 'Alpha', 'MMSI': 227000001, 'Skipper': 'A'}
+    assert store.get_boat(999) is None
+    store.close()
+
+
+def test_retention_drops_old_positions(tmp_path):
+    now = datetime.now().replace(microsecond=0)
+    store = HistoryStore(str(tmp_path / 'history.sqlite'), retention_days=1)
+    store.append(fleet(now, 47.0, 6.5, timedelta(days=3)), now - timedelta(days=2))
+    store.append(fleet(now, 47.1, 6.5, timedelta(0)), now)
+    assert store.get_track(227000001)['LAT'].tolist() == [47.1]
+    store.close()
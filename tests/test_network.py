@@ -0,0 +1,94 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from network import SessionPool, CircuitBreaker
+
+PAGE = b"x" * 100000
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:{0}/".format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+def test_streamed_bytes_are_counted_as_read(url):
+    pool = SessionPool()
+    # lecture interrompue après 2 morceaux : seuls les octets lus sont comptés, pas le Content-Length
+    response = pool.get(url, stream=True)
+    chunks = response.iter_content(8192)
+    next(chunks), next(chunks)
+    response.close()
+    assert pool.stats()['bytes'] == 2*8192
+
+    # réponse lue en entier via .content
+    pool.get(url, stream=True).content
+    assert pool.stats()['bytes'] == 2*8192 + len(PAGE)
+    pool.close()
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow() and not breaker.is_open()
+    breaker.record_failure()
+    assert breaker.is_open() and not breaker.allow()
+
+
+def test_breaker_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() # requête d'essai
+    assert not breaker.allow() # une seule à la fois
+
+
+def test_breaker_failed_trial_reopens_then_recovers():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    for i in range(3):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure() # l'essai échoue : le circuit se rouvre sans attendre 3 échecs
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success() # l'essai réussit : le circuit se referme
+    assert not breaker.is_open() and breaker.allow() and breaker.allow()
+
+
+@pytest.mark.parametrize('error', [requests.TooManyRedirects, requests.exceptions.ChunkedEncodingError, KeyError])
+def test_trial_error_never_blocks_the_host(url, monkeypatch, error):
+    pool = SessionPool(retries=0, failure_threshold=1, reset_timeout=0.05)
+    session = pool.session(url)
+    real_get = session.get
+    def failing_get(*args, **kwargs):
+        raise error("erreur pendant la requête d'essai")
+    monkeypatch.setattr(session, 'get', failing_get)
+    pool.breaker(url).record_failure() # hôte en panne
+    time.sleep(0.06)
+    with pytest.raises(error): # la requête d'essai échoue sur une erreur autre que ConnectionError/Timeout
+        pool.get(url)
+    # l'hôte est de nouveau interrogé après le délai : l'essai raté n'a pas laissé le disjoncteur bloqué
+    monkeypatch.setattr(session, 'get', real_get)
+    time.sleep(0.06)
+    assert pool.get(url).status_code == 200
+    assert not pool.breaker(url).is_open()
+    pool.close()
@@ -0,0 +1,55 @@
+from polling import PollingPlanner
+
+
+NOW = 1_700_000_000.0
+
+
+def planner():
+    # en route à partir de 1 noeud ou 0.01° de déplacement, transpondeur éteint après 1h, délai de 60s à 600s
+    return PollingPlanner(moving_speed=1, moving_distance=0.01, dark_fix_age=3600, min_backoff=60, max_backoff=600)
+
+
+def test_unknown_boat_is_always_due():
+    assert planner().due([1, 2, 3], NOW) == [1, 2, 3]
+
+
+def test_moving_boat_is_polled_every_update():
+    polling = planner()
+    assert polling.update(1, 12.5, 47.0, -3.0, NOW - 30, NOW) == 0
+    assert polling.due([1], NOW) == [1]
+    # vitesse nulle mais position qui change : le bateau est en route
+    assert polling.update(1, 0, 47.05, -3.0, NOW + 10, NOW + 20) == 0
+
+
+def test_stopped_boat_backs_off_until_max():
+    polling = planner()
+    delays = [polling.update(1, 0.2, 47.0, -3.0, NOW - 30, NOW + 1000*i) for i in range(6)]
+    assert delays == [60, 120, 240, 480, 600, 600]
+    assert polling.due([1], NOW + 5000) == []
+    assert polling.due([1], NOW + 5000 + 600) == [1]
+
+
+def test_boat_starting_again_resets_backoff():
+    polling = planner()
+    polling.update(1, 0, 47.0, -3.0, NOW - 30, NOW)
+    polling.update(1, 0, 47.0, -3.0, NOW - 30, NOW + 60)
+    assert polling.update(1, 8, 47.0, -3.0, NOW + 100, NOW + 180) == 0
+    assert polling.update(1, 0, 47.0, -3.0, NOW + 100, NOW + 190) == 60
+
+
+def test_stale_position_backs_off_even_at_speed():
+    polling = planner()
+    # dernière position AIS vieille de 2h : la vitesse affichée n'est plus significative
+    assert polling.update(1, 15, 47.0, -3.0, NOW - 7200, NOW) == 60
+    assert polling.update(1, 15, 47.5, -3.0, NOW - 7200, NOW + 60) == 120
+    # position absente ou illisible : transpondeur considéré éteint
+    assert polling.update(2, 15, 47.0, -3.0, None, NOW) == 60
+    assert polling.update(3, '12.5', 47.0, -3.0, 'n/a', NOW) == 60
+
+
+def test_failed_and_forget():
+    polling = planner()
+    assert [polling.failed(1, NOW + i) for i in range(5)] == [60, 120, 240, 480, 600]
+    assert polling.due([1, 2], NOW + 10) == [2]
+    polling.forget(1)
+    assert polling.due([1, 2], NOW + 10) == [1, 2]
@@ -0,0 +1,80 @@
+import contextlib
+import io
+import os
+import subprocess
+import pytest
+from publisher import SitePublisher
+
+
+def git(directory, *args) -> str:
+    return subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.org', *args],
+                          cwd=directory, capture_output=True, text=True, check=True).stdout
+
+
+def write(path, content:str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+@pytest.fixture
+def publisher(tmp_path):
+    # dépôt distant (nu), site généré (source) et dépôt local du site (destination)
+    remote = tmp_path / 'remote.git'
+    git(tmp_path, 'init', '--bare', '-b', 'main', str(remote))
+    source = tmp_path / 'site'
+    write(str(source / 'index.html'), "<html>v1</html>")
+    publisher = SitePublisher(str(source), str(tmp_path / 'repository'), 'origin', str(remote), 'main',
+                              user_name='test', email='test@example.org')
+    with contextlib.redirect_stdout(io.StringIO()):
+        publisher.configure_remote()
+    return publisher
+
+
+def publish(publisher:SitePublisher) -> str:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return publisher.publish("Update")
+
+
+def test_sync_deletes_stale_files(publisher):
+    write(os.path.join(publisher._destination, 'popups.json'), "{}")
+    write(os.path.join(publisher._destination, 'images', 'cache', 'ab', 'old.png'), "png")
+    assert publisher.sync() == (1, 2)
+    assert sorted(publisher._files(publisher._destination)) == ['index.html']
+    # les dossiers vidés sont supprimés, le dépôt git est conservé
+    assert not os.path.exists(os.path.join(publisher._destination, 'images'))
+    assert os.path.isdir(os.path.join(publisher._destination, '.git'))
+
+
+def test_nothing_changed_means_no_commit(publisher, tmp_path):
+    assert publish(publisher) == SitePublisher.PUBLISHED
+    commits = git(tmp_path / 'remote.git', 'rev-list', '--count', 'main')
+    assert publish(publisher) == SitePublisher.UNCHANGED
+    assert git(tmp_path / 'remote.git', 'rev-list', '--count', 'main') == commits
+    write(os.path.join(publisher._source, 'index.html'), "<html>v2</html>")
+    assert publish(publisher) == SitePublisher.PUBLISHED
+    assert int(git(tmp_path / 'remote.git', 'rev-list', '--count', 'main')) == int(commits) + 1
+
+
+def test_diverged_history_fails(publisher, tmp_path):
+    assert publish(publisher) == SitePublisher.PUBLISHED
+    # quelqu'un réécrit l'historique du dépôt distant : pull --ff-only puis push échouent
+    other = tmp_path / 'other'
+    git(tmp_path, 'clone', str(tmp_path / 'remote.git'), str(other))
+    git(other, 'commit', '--amend', '-m', "Réécriture")
+    git(other, 'push', '--force', 'origin', 'main')
+    write(os.path.join(publisher._source, 'index.html'), "<html>v2</html>")
+    assert publish(publisher) == SitePublisher.FAILED
+    # rien n'a changé depuis, mais le commit local n'est toujours pas poussé : c'est encore un échec
+    assert publish(publisher) == SitePublisher.FAILED
+
+
+def test_rejected_push_is_retried_without_new_changes(publisher, tmp_path):
+    hook = tmp_path / 'remote.git' / 'hooks' / 'pre-receive'
+    write(str(hook), "#!/bin/sh\nexit 1\n")
+    os.chmod(hook, 0o755)
+    assert publish(publisher) == SitePublisher.FAILED
+    # le serveur accepte de nouveau les push : le commit resté en local est poussé au cycle suivant
+    os.remove(hook)
+    assert publish(publisher) == SitePublisher.PUBLISHED
+    assert git(tmp_path / 'remote.git', 'rev-list', '--count', 'main').strip() == '1'
@@ -0,0 +1,39 @@
+import time
+from scheduler import PipelineScheduler
+
+
+def test_slow_publish_keeps_only_the_latest_result():
+    published = []
+    def publish(result):
+        time.sleep(0.25) # la publication dure plus de 2 périodes
+        published.append(result)
+    def fetch(cycle):
+        if cycle == 6:
+            scheduler.stop()
+        return cycle
+    scheduler = PipelineScheduler(0.05, fetch, publish)
+    scheduler.run_forever()
+    # les résultats arrivés pendant une publication se remplacent : pas de file d'attente
+    assert scheduler.dropped_results > 0
+    assert len(published) + scheduler.dropped_results == scheduler.cycles
+    assert published == sorted(published) and published[0] == 0
+    assert published[-1] == scheduler.cycles - 1 # le dernier résultat est publié avant l'arrêt
+
+
+def test_overrunning_fetch_skips_missed_ticks():
+    period = 0.1
+    starts = []
+    def fetch(cycle):
+        starts.append(time.monotonic())
+        if cycle == 1:
+            time.sleep(2.5*period) # déborde sur les ticks 2 et 3
+        if cycle == 3:
+            scheduler.stop()
+        return cycle
+    scheduler = PipelineScheduler(period, fetch, lambda result: None)
+    scheduler.run_forever()
+    assert scheduler.skipped_ticks == 2
+    # les ticks restent calés sur la grille t0 + k*période : pas de rattrapage en rafale
+    ticks = [(start - starts[0])/period for start in starts]
+    assert [round(tick) for tick in ticks] == [0, 1, 4, 5]
+    assert all(abs(tick - round(tick)) < 0.3 for tick in ticks)
@@ -0,0 +1,110 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import pandas as pd
+import pytest
+from server import TrackerServer
+from publisher import SitePublisher
+from db import DataBase
+
+SITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Tracker_fleet_YCC')
+SAVE = os.path.join(SITE, 'DATA_SAVES', 'SAVE__22_08_2023_20_47_18.csv')
+
+
+@pytest.fixture
+def fleet(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # fichiers statiques du site (icônes, logos, styles) utilisés par la carte
+    shutil.copytree(SITE, 'Tracker_fleet_YCC', ignore=shutil.ignore_patterns('DATA_SAVES', 'cache', '*.xcf'))
+    return pd.read_csv(SAVE)
+
+
+def generate(fleet:pd.DataFrame, publish_mode:str='full') -> TrackerServer:
+    site = TrackerServer(html_file_name='test.html', publish_mode=publish_mode, local_assets=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        site.set_tracked_fleet_df(fleet)
+        site.generate_html()
+    return site
+
+
+def page_size(fleet:pd.DataFrame, publish_mode:str) -> int:
+    generate(fleet, publish_mode)
+    return os.path.getsize(os.path.join('Tracker_fleet_YCC', 'test.html'))
+
+
+@pytest.mark.parametrize('publish_mode', ['full', 'incremental'])
+def test_generated_page_size(fleet, publish_mode):
+    # si du code est à nouveau dupliqué pour chaque bateau, le coût d'un bateau dépasse le budget configuré
+    # (la partie fixe de la page n'intervient pas : une modification du gabarit ne casse pas le test)
+    small, large = fleet.head(10).copy(), fleet
+    per_boat = (page_size(large, publish_mode) - page_size(small, publish_mode))/(len(large) - len(small))
+    assert per_boat <= TrackerServer.MAX_HTML_BYTES_PER_BOAT, f"{per_boat:.0f} octets par bateau"
+    site = generate(fleet, publish_mode)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert site.check_html_size(os.path.join('Tracker_fleet_YCC', 'test.html'), len(fleet))
+
+
+def test_ship_icon_is_declared_once(fleet):
+    generate(fleet)
+    with open(os.path.join('Tracker_fleet_YCC', 'test.html'), encoding='utf-8') as file:
+        html = file.read()
+    assert html.count('L.icon(') == 1
+    assert html.count('.setIcon(') == len(fleet)
+    assert 'base64' not in html
+
+
+def test_popups_file_removed_when_not_clustered(fleet, monkeypatch):
+    popups_path = os.path.join('Tracker_fleet_YCC', TrackerServer.POPUPS_FILE_NAME)
+    monkeypatch.setattr(TrackerServer, 'CLUSTER_THRESHOLD', 10)
+    generate(fleet)
+    assert os.path.isfile(popups_path)
+    # la flotte repasse sous le seuil : les popups sont dans la page, l'ancien fichier ne doit pas être publié
+    monkeypatch.setattr(TrackerServer, 'CLUSTER_THRESHOLD', 200)
+    generate(fleet)
+    assert not os.path.exists(popups_path) and not os.path.exists(popups_path + '.gz')
+
+
+class FakePublisher():
+    """
+    Publication factice : retourne les résultats prévus dans l'ordre
+    """
+
+    def __init__(self, *results) -> None:
+        self.results = list(results)
+        self.calls = 0
+
+    def publish(self, message:str) -> str:
+        self.calls += 1
+        return self.results.pop(0)
+
+
+def test_unchanged_fleet_is_not_published_twice(fleet):
+    site = TrackerServer(html_file_name='test.html', local_assets=False)
+    site._publisher = FakePublisher(SitePublisher.PUBLISHED)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert site.update_site(tracked_fleet_df=fleet)
+        assert not site.update_site(tracked_fleet_df=fleet)
+    assert site._publisher.calls == 1 and site.get_skipped_cycles() == 1
+
+
+def test_failed_publish_is_retried_with_the_same_fleet(fleet):
+    site = TrackerServer(html_file_name='test.html', local_assets=False)
+    site._publisher = FakePublisher(SitePublisher.FAILED, SitePublisher.PUBLISHED)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert not site.update_site(tracked_fleet_df=fleet)
+        # la flotte n'a pas changé mais rien n'est en ligne : la publication est retentée
+        assert site.update_site(tracked_fleet_df=fleet)
+    assert site._publisher.calls == 2 and site.get_skipped_cycles() == 0
+
+
+def test_failed_publish_is_recorded_in_metrics(fleet):
+    site = TrackerServer(html_file_name='test.html', local_assets=False)
+    site._publisher = FakePublisher(SitePublisher.FAILED)
+    with contextlib.redirect_stdout(io.StringIO()):
+        site.update_site(tracked_fleet_df=fleet, cycle=7)
+    with open(os.path.join(DataBase.METRICS_DIRECTORY, 'metrics.jsonl'), encoding='utf-8') as file:
+        lines = [json.loads(line) for line in file]
+    publish = [line for line in lines if line['stage'] == 'publish']
+    assert publish[-1]['cycle'] == 7 and not publish[-1]['ok'] and publish[-1]['failures'] == 1
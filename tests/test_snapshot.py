@@ -0,0 +1,31 @@
+import os
+import numpy as np
+import pandas as pd
+from snapshot import save_snapshot, load_snapshot
+
+SAVE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Tracker_fleet_YCC', 'DATA_SAVES', 'SAVE__22_08_2023_20_47_18.csv')
+
+
+def test_round_trip_keeps_every_column_type(tmp_path):
+    fleet = load_snapshot(SAVE)
+    # colonnes ajoutées sans être déclarées dans SNAPSHOT_DTYPES
+    fleet['POLL_DELAY'] = np.arange(len(fleet), dtype='int64')
+    fleet['DISTANCE'] = np.linspace(0, 1, len(fleet))
+    fleet['NOTE'] = 'ok'
+    path = str(tmp_path / 'SAVE.npz')
+    save_snapshot(fleet, path)
+    loaded = load_snapshot(path)
+    assert loaded['POLL_DELAY'].dtype == 'int64'
+    assert loaded['DISTANCE'].dtype == 'float64'
+    assert loaded['NOTE'].tolist() == fleet['NOTE'].tolist()
+    assert loaded['MMSI'].dtype == 'Int64'
+    pd.testing.assert_frame_equal(loaded[['LAT', 'LONG', 'SHIP_ID']], fleet[['LAT', 'LONG', 'SHIP_ID']])
+
+
+def test_csv_without_requested_column(tmp_path):
+    # ancienne sauvegarde sans la colonne IMAGE_URL
+    path = str(tmp_path / 'SAVE.csv')
+    pd.read_csv(SAVE).drop(columns=['IMAGE_URL']).to_csv(path, index=False)
+    loaded = load_snapshot(path, columns=['Nom du bateau', 'MMSI', 'IMAGE_URL'])
+    assert list(loaded.columns) == ['Nom du bateau', 'MMSI']
+    assert loaded['MMSI'].dtype == 'Int64'